@@ -0,0 +1,330 @@
+import os
+import sys
+import json
+import time
+import queue
+import shutil
+import argparse
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from extractor_text import setup_driver
+from session import process_document
+from metrics import Metrics, print_sink, write_prometheus
+from pagerange import parse_ranges
+from compression import COMPRESSION_PROFILES
+from pagecheck import CHECK_ACTIONS
+from manifest import MANIFEST_NAME
+from renderer import rebuild_pdf_from_cache
+
+
+def read_jobs(path):
+    """
+    Lê a lista de documentos: uma linha por documento no formato
+    "<url> [nome do pdf]". Linhas vazias ou começando com # são ignoradas.
+    Sem nome, o PDF vira documento_<n>.
+    """
+    jobs = []
+    with open(path, encoding="utf-8") as f:
+        for line in f:
+            line = line.strip()
+            if not line or line.startswith("#"):
+                continue
+            parts = line.split(None, 1)
+            nome = parts[1].strip() if len(parts) > 1 else f"documento_{len(jobs) + 1}"
+            jobs.append({"url": parts[0], "nome": nome})
+    return jobs
+
+
+def reset_driver(driver):
+    """
+    Deixa um navegador do pool pronto para o próximo documento sem
+    reiniciá-lo: fecha abas extras, limpa storage e cookies e volta para
+    about:blank.
+    """
+    handles = driver.window_handles
+    for handle in handles[1:]:
+        driver.switch_to.window(handle)
+        driver.close()
+    driver.switch_to.window(handles[0])
+    try:
+        driver.execute_script("window.localStorage.clear(); window.sessionStorage.clear();")
+    except Exception:
+        pass
+    driver.delete_all_cookies()
+    driver.get("about:blank")
+
+
+class DriverPool:
+    """
+    Conjunto fixo de navegadores mantidos abertos entre documentos. Cada
+    trabalho pega um navegador com `acquire` e o devolve com `release`, que
+    o reinicia só se ele estiver quebrado (ex.: após um timeout). Se o
+    navegador novo não abrir, o pool fica com um a menos; sem nenhum,
+    `acquire` gera RuntimeError em vez de esperar para sempre.
+    """
+
+    def __init__(self, size):
+        self.size = size
+        self._idle = queue.Queue()
+        self._lock = threading.Lock()
+        print(f"🔧 Iniciando {size} navegadores...")
+        with ThreadPoolExecutor(max_workers=size) as pool:
+            for driver in pool.map(lambda _: setup_driver(), range(size)):
+                self._idle.put(driver)
+
+    def acquire(self):
+        driver = self._idle.get()
+        if driver is None:
+            # Devolve o aviso para os outros trabalhos que estão esperando
+            self._idle.put(None)
+            raise RuntimeError("Nenhum navegador disponível: todos falharam ao reiniciar")
+        return driver
+
+    def release(self, driver, healthy=True):
+        if healthy:
+            try:
+                reset_driver(driver)
+            except Exception as e:
+                print(f"⚠️ Falha ao limpar o navegador, reiniciando: {e}")
+                healthy = False
+        if not healthy:
+            try:
+                driver.quit()
+            except Exception:
+                pass
+            try:
+                driver = setup_driver()
+            except Exception as e:
+                self._shrink(e)
+                return
+        self._idle.put(driver)
+
+    def _shrink(self, error):
+        with self._lock:
+            self.size -= 1
+            size = self.size
+        print(f"⚠️ Falha ao reiniciar o navegador, o pool segue com {size}: {error}")
+        if size == 0:
+            self._idle.put(None)
+
+    def close(self):
+        while not self._idle.empty():
+            try:
+                driver = self._idle.get_nowait()
+                if driver is not None:
+                    driver.quit()
+            except Exception:
+                pass
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+
+
+def run_job(pool, job, pasta, timeout, manter_png=False, vetorial=True, shards=1, metrics=None, paginas=None,
+            perfil=None, tamanho_alvo_mb=None, verificar="flag", escala=1):
+    """
+    Processa um documento com um navegador do pool. Se passar de `timeout`
+    segundos, o navegador é encerrado (o que interrompe o trabalho) e
+    substituído por um novo. Retorna o resultado para o relatório.
+    Se o trabalho falhar, a pasta oculta com as páginas é apagada, a menos
+    que `manter_png` esteja ligado ou haja um manifesto para retomar.
+    As métricas do documento vão para `metrics`, se informado, e
+    `paginas`, `perfil`, `tamanho_alvo_mb`, `verificar` e `escala` vão
+    para o process_document.
+    """
+    result = {"url": job["url"], "nome": job["nome"], "status": "ok",
+              "tipo": None, "pdf": None, "paginas": None, "verificacao": None, "erro": None}
+    try:
+        driver = pool.acquire()
+    except RuntimeError as e:
+        result.update(status="erro", erro=str(e), segundos=0)
+        print(f"❌ {job['nome']}: {result['erro']}")
+        return result
+    timed_out = threading.Event()
+
+    def kill():
+        timed_out.set()
+        try:
+            driver.quit()
+        except Exception:
+            pass
+
+    watchdog = threading.Timer(timeout, kill)
+    watchdog.daemon = True
+    start = time.monotonic()
+    watchdog.start()
+    pasta_paginas = os.path.join(pasta, f".{job['nome']}_paginas")
+    try:
+        result.update(process_document(job["url"], job["nome"], pasta, manter_png=manter_png,
+                                       vetorial=vetorial, driver=driver, pasta_paginas=pasta_paginas,
+                                       shards=shards, metrics=metrics, paginas=paginas, perfil=perfil,
+                                       tamanho_alvo_mb=tamanho_alvo_mb, verificar=verificar, escala=escala))
+    except Exception as e:
+        result["status"] = "timeout" if timed_out.is_set() else "erro"
+        result["erro"] = f"{type(e).__name__}: {e}"
+        print(f"❌ {job['nome']}: {result['erro']}")
+        if not manter_png and not os.path.exists(os.path.join(pasta_paginas, MANIFEST_NAME)):
+            shutil.rmtree(pasta_paginas, ignore_errors=True)
+    finally:
+        watchdog.cancel()
+        result["segundos"] = round(time.monotonic() - start, 2)
+        pool.release(driver, healthy=not timed_out.is_set())
+    return result
+
+
+def run_batch(jobs, pasta="output", workers=2, timeout=1800, manter_png=False, vetorial=True, shards=1,
+              pasta_metricas=None, paginas=None, perfil=None, tamanho_alvo_mb=None, verificar="flag", escala=1):
+    """
+    Executa `jobs` (dicts com url e nome) sobre um pool de `workers`
+    navegadores e devolve o relatório com o resultado de cada documento.
+
+    Com `pasta_metricas`, grava nela as métricas de cada documento em
+    <nome>.json e as de todo o lote em scribd.prom (formato textfile do
+    Prometheus). `paginas` (ex.: "1-50,120") vale para todos os
+    documentos, a menos que o job traga as suas em "paginas"; `perfil` e
+    `tamanho_alvo_mb` controlam a compressão dos PDFs e `verificar`, as
+    páginas em branco ou repetidas; `escala` é a das capturas de texto
+    (ver process_document).
+    """
+    os.makedirs(pasta, exist_ok=True)
+    workers = max(1, min(workers, len(jobs)))
+    start = time.monotonic()
+    collectors = [Metrics(job=job["nome"], sinks=[print_sink]) for job in jobs]
+
+    def run(k):
+        result = run_job(pool, jobs[k], pasta, timeout, manter_png, vetorial, shards, collectors[k],
+                         jobs[k].get("paginas", paginas), perfil, tamanho_alvo_mb, verificar, escala)
+        if pasta_metricas:
+            collectors[k].write_json(os.path.join(pasta_metricas, f"{jobs[k]['nome']}.json"))
+        return result
+
+    with DriverPool(workers) as pool, ThreadPoolExecutor(max_workers=workers) as executor:
+        results = list(executor.map(run, range(len(jobs))))
+
+    if pasta_metricas:
+        write_prometheus(os.path.join(pasta_metricas, "scribd.prom"), collectors)
+        print(f"📈 Métricas salvas em {pasta_metricas}")
+
+    return {
+        "total": len(results),
+        "ok": sum(1 for r in results if r["status"] == "ok"),
+        "erros": sum(1 for r in results if r["status"] == "erro"),
+        "timeouts": sum(1 for r in results if r["status"] == "timeout"),
+        "segundos": round(time.monotonic() - start, 2),
+        "documentos": results,
+    }
+
+
+def run_from_cache(jobs, pasta="output", perfil=None, tamanho_alvo_mb=None):
+    """
+    Refaz os PDFs de `jobs` só com as páginas do cache de páginas, sem
+    abrir navegador (ver renderer.rebuild_pdf_from_cache). Documentos que
+    não estão completos no cache entram no relatório como erro.
+    """
+    os.makedirs(pasta, exist_ok=True)
+    start = time.monotonic()
+    target_bytes = int(tamanho_alvo_mb * 1024 * 1024) if tamanho_alvo_mb else None
+    results = []
+    for job in jobs:
+        result = {"url": job["url"], "nome": job["nome"], "status": "ok",
+                  "tipo": "cache", "pdf": None, "paginas": None, "verificacao": None, "erro": None}
+        job_start = time.monotonic()
+        pdf_path = os.path.join(pasta, f"{job['nome']}.pdf")
+        try:
+            if rebuild_pdf_from_cache(job["url"], pdf_path, profile=perfil, target_bytes=target_bytes):
+                result["pdf"] = pdf_path
+            else:
+                result["status"] = "erro"
+                result["erro"] = "documento não está completo no cache"
+        except Exception as e:
+            result["status"] = "erro"
+            result["erro"] = f"{type(e).__name__}: {e}"
+            print(f"❌ {job['nome']}: {result['erro']}")
+        result["segundos"] = round(time.monotonic() - job_start, 2)
+        results.append(result)
+
+    return {
+        "total": len(results),
+        "ok": sum(1 for r in results if r["status"] == "ok"),
+        "erros": sum(1 for r in results if r["status"] == "erro"),
+        "timeouts": 0,
+        "segundos": round(time.monotonic() - start, 2),
+        "documentos": results,
+    }
+
+
+def print_report(report):
+    print("\n📊 Resumo do lote")
+    for r in report["documentos"]:
+        icon = "✅" if r["status"] == "ok" else "❌"
+        detalhe = r["pdf"] if r["status"] == "ok" else r["erro"]
+        print(f"{icon} {r['nome']} [{r['status']}, {r['segundos']}s] {detalhe}")
+        verificacao = r.get("verificacao")
+        if verificacao and (verificacao["em_branco"] or verificacao["duplicadas"]):
+            print(f"   🧹 {len(verificacao['em_branco'])} em branco, {len(verificacao['duplicadas'])} repetidas, "
+                  f"{len(verificacao['removidas'])} removidas")
+    print(f"🏁 {report['ok']} de {report['total']} concluídos, {report['erros']} erros, "
+          f"{report['timeouts']} timeouts em {report['segundos']}s")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Baixa vários documentos do Scribd sem interface gráfica.")
+    parser.add_argument("lista", help='arquivo com um documento por linha: "<url> [nome do pdf]"')
+    parser.add_argument("--pasta", default="output", help="pasta de saída dos PDFs")
+    parser.add_argument("--workers", type=int, default=2, help="número de navegadores em paralelo")
+    parser.add_argument("--timeout", type=float, default=1800, help="tempo máximo por documento, em segundos")
+    parser.add_argument("--manter-png", action="store_true", help="mantém as páginas após gerar o PDF")
+    parser.add_argument("--raster", action="store_true", help="documentos de texto como imagens em vez de PDF vetorial")
+    parser.add_argument("--shards", type=int, default=1,
+                        help="divide cada documento entre N navegadores extras (documentos grandes)")
+    parser.add_argument("--relatorio", help="salva o relatório em JSON neste caminho")
+    parser.add_argument("--metricas", help="pasta para as métricas de cada documento (JSON e Prometheus)")
+    parser.add_argument("--paginas", help='só estas páginas (ex.: "1-50,120" ou "300-" até o fim); atualiza os PDFs que já existem')
+    parser.add_argument("--perfil", choices=list(COMPRESSION_PROFILES),
+                        help="recomprime as páginas do PDF com este perfil")
+    parser.add_argument("--tamanho-alvo", type=float, help="tamanho máximo desejado de cada PDF, em MB")
+    parser.add_argument("--verificar", choices=list(CHECK_ACTIONS) + ["nao"], default="flag",
+                        help="páginas em branco ou repetidas: registrar (flag), remover (drop), "
+                             "capturar de novo (recapture) ou não verificar (nao)")
+    parser.add_argument("--escala", type=float, default=1,
+                        help="escala das capturas de documentos de texto no modo raster (2 = 192 DPI)")
+    parser.add_argument("--do-cache", action="store_true",
+                        help="refaz os PDFs só com as páginas já guardadas no cache, sem navegador")
+    args = parser.parse_args(argv)
+
+    if args.paginas:
+        try:
+            parse_ranges(args.paginas)
+        except ValueError as e:
+            print(f"❌ {e}")
+            return 1
+
+    jobs = read_jobs(args.lista)
+    if not jobs:
+        print("❌ Nenhum documento na lista.")
+        return 1
+
+    if args.do_cache:
+        report = run_from_cache(jobs, pasta=args.pasta, perfil=args.perfil, tamanho_alvo_mb=args.tamanho_alvo)
+    else:
+        report = run_batch(jobs, pasta=args.pasta, workers=args.workers, timeout=args.timeout,
+                           manter_png=args.manter_png, vetorial=not args.raster, shards=args.shards,
+                           pasta_metricas=args.metricas, paginas=args.paginas, perfil=args.perfil,
+                           tamanho_alvo_mb=args.tamanho_alvo,
+                           verificar=None if args.verificar == "nao" else args.verificar, escala=args.escala)
+    print_report(report)
+
+    if args.relatorio:
+        with open(args.relatorio, "w", encoding="utf-8") as f:
+            json.dump(report, f, ensure_ascii=False, indent=2)
+        print(f"📝 Relatório salvo em {args.relatorio}")
+
+    return 0 if report["ok"] == report["total"] else 1
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,574 @@
+import io
+import os
+import sys
+import json
+import time
+import shutil
+import argparse
+import platform
+import tempfile
+import threading
+import statistics
+import subprocess
+import multiprocessing
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import urlsplit, parse_qs
+
+from PIL import Image, ImageDraw
+
+from compression import COMPRESSION_PROFILES
+
+PAGE_WIDTH = 800
+PAGE_HEIGHT = 1035
+
+LOREM = ("Lorem ipsum dolor sit amet consectetur adipiscing elit sed do eiusmod tempor "
+         "incididunt ut labore et dolore magna aliqua ut enim ad minim veniam quis nostrud").split()
+
+# Recursos "de terceiros" que a página de teste referencia; o caminho imita
+# o domínio para casar com os padrões do blocking.py
+THIRD_PARTY = [
+    ("script", "/tp/www.googletagmanager.com/gtm.js"),
+    ("script", "/tp/www.google-analytics.com/analytics.js"),
+    ("script", "/tp/securepubads.g.doubleclick.net/tag/js/gpt.js"),
+    ("script", "/tp/static.hotjar.com/c/hotjar.js"),
+    ("img", "/tp/www.facebook.com/tr?id=1"),
+    ("img", "/tp/banner.gif"),
+    ("link", "/tp/fonts.googleapis.com/css?family=Roboto"),
+]
+
+# Imita o lazy loading do Scribd: o conteúdo de cada outer_page_* só é
+# inserido quando a página se aproxima da área visível
+FIXTURE_HTML = """<!DOCTYPE html>
+<html><head><meta charset="utf-8"><title>Documento de teste</title>
+{third_party}
+<style>
+body {{ margin: 0; background: #ddd; }}
+div.outer_page_container {{ width: {width}px; margin: 0 auto; }}
+div[id^='outer_page_'] {{ position: relative; width: {width}px; height: {height}px;
+                          margin: 20px 0; background: #fff; overflow: hidden; }}
+img.absimg {{ position: absolute; left: 0; top: 0; width: {width}px; height: {height}px; }}
+div.text_layer {{ position: absolute; left: 40px; top: 40px; right: 40px;
+                  font: 16px/24px Arial, sans-serif; color: #111; }}
+</style></head>
+<body>
+<div class="modal">Assine para continuar</div>
+<div id="document_container">
+{pages}
+</div>
+<script>
+const kind = "{kind}";
+// Carregamentos interrompidos (ex.: pelo window.stop() do hardcore_block)
+// são refeitos após um intervalo, como o leitor do Scribd faz
+function load(page) {{
+    const i = Number(page.id.replace('outer_page_', ''));
+    const retry = () => setTimeout(() => load(page), 200);
+    if (kind === 'scan') {{
+        const img = document.createElement('img');
+        img.className = 'absimg';
+        img.onerror = () => {{ img.remove(); retry(); }};
+        img.src = '/img/' + i + '.jpg';
+        page.appendChild(img);
+    }} else {{
+        fetch('/layer/' + i).then(r => r.text()).then(html => {{
+            const layer = document.createElement('div');
+            layer.className = 'text_layer';
+            layer.innerHTML = html;
+            page.appendChild(layer);
+        }}).catch(retry);
+    }}
+}}
+const io = new IntersectionObserver(entries => {{
+    for (const entry of entries) {{
+        if (!entry.isIntersecting) continue;
+        io.unobserve(entry.target);
+        load(entry.target);
+    }}
+}}, {{rootMargin: '300px 0px'}});
+document.querySelectorAll("div[id^='outer_page_']").forEach(p => io.observe(p));
+</script>
+</body></html>
+"""
+
+
+def page_lines(i, count=30):
+    """
+    Linhas de texto determinísticas da página `i` (mesmo conteúdo em todas
+    as execuções, para que os resultados sejam comparáveis).
+    """
+    lines = []
+    for n in range(count):
+        start = (i * 7 + n * 3) % len(LOREM)
+        words = [LOREM[(start + k) % len(LOREM)] for k in range(9)]
+        lines.append(f"{i+1}.{n+1} " + " ".join(words))
+    return lines
+
+
+def make_page_image(i, width=PAGE_WIDTH, height=PAGE_HEIGHT, quality=85):
+    """
+    JPEG de uma página "escaneada": fundo levemente acinzentado com as
+    linhas de texto da página desenhadas em preto.
+    """
+    img = Image.new("L", (width, height), 244)
+    draw = ImageDraw.Draw(img)
+    for n, line in enumerate(page_lines(i)):
+        draw.text((40, 40 + n * 30), line, fill=20)
+    buffer = io.BytesIO()
+    img.save(buffer, format="JPEG", quality=quality)
+    return buffer.getvalue()
+
+
+class FixtureServer:
+    """
+    Servidor HTTP local que se passa pelo Scribd: /scan e /text servem um
+    documento com `pages` páginas (img.absimg ou div.text_layer, carregadas
+    sob demanda), /img/<n>.jpg as imagens das páginas e /tp/... recursos de
+    terceiros. Cada requisição de conteúdo espera `latency` segundos e cada
+    recurso de terceiros, `third_party_latency`.
+    """
+
+    def __init__(self, latency=0.05, third_party_latency=0.3, width=PAGE_WIDTH, height=PAGE_HEIGHT):
+        self.latency = latency
+        self.third_party_latency = third_party_latency
+        self.width = width
+        self.height = height
+        self._images = {}
+        self._lock = threading.Lock()
+        self.requests = 0
+        self.bytes_sent = 0
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def log_message(self, *args):
+                pass
+
+            def do_GET(self):
+                server.handle(self)
+
+        self.httpd = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+        self.httpd.daemon_threads = True
+        self._thread = threading.Thread(target=self.httpd.serve_forever, daemon=True)
+
+    def __enter__(self):
+        self._thread.start()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.httpd.shutdown()
+        self.httpd.server_close()
+
+    @property
+    def base_url(self):
+        host, port = self.httpd.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def url(self, kind, pages):
+        return f"{self.base_url}/{kind}?pages={pages}"
+
+    def image(self, i):
+        with self._lock:
+            if i not in self._images:
+                self._images[i] = make_page_image(i, self.width, self.height)
+            return self._images[i]
+
+    def render_document(self, kind, pages):
+        tags = {
+            "script": '<script src="{}"></script>',
+            "img": '<img src="{}" width="1" height="1">',
+            "link": '<link rel="stylesheet" href="{}">',
+        }
+        third_party = "\n".join(tags[tag].format(path) for tag, path in THIRD_PARTY)
+        containers = "\n".join(
+            f'<div class="outer_page_container"><div id="outer_page_{i}"></div></div>'
+            for i in range(pages)
+        )
+        return FIXTURE_HTML.format(third_party=third_party, pages=containers, kind=kind,
+                                   width=self.width, height=self.height)
+
+    def render_layer(self, i):
+        return "".join(f"<div><span>{line}</span></div>" for line in page_lines(i))
+
+    def handle(self, request):
+        parts = urlsplit(request.path)
+        path = parts.path
+        with self._lock:
+            self.requests += 1
+
+        if path in ("/scan", "/text"):
+            pages = int(parse_qs(parts.query).get("pages", ["10"])[0])
+            body, content_type = self.render_document(path[1:], pages).encode("utf-8"), "text/html; charset=utf-8"
+        elif path.startswith("/img/"):
+            time.sleep(self.latency)
+            body, content_type = self.image(int(path[5:].split(".")[0])), "image/jpeg"
+        elif path.startswith("/layer/"):
+            time.sleep(self.latency)
+            body, content_type = self.render_layer(int(path[7:])).encode("utf-8"), "text/html; charset=utf-8"
+        elif path.startswith("/tp/"):
+            time.sleep(self.third_party_latency)
+            body, content_type = b"/* terceiros */" + b" " * 50000, "application/javascript"
+        else:
+            request.send_error(404)
+            return
+
+        request.send_response(200)
+        request.send_header("Content-Type", content_type)
+        request.send_header("Content-Length", str(len(body)))
+        request.send_header("Cache-Control", "no-store")
+        request.end_headers()
+        request.wfile.write(body)
+        with self._lock:
+            self.bytes_sent += len(body)
+
+
+def peak_rss_mb():
+    """
+    Pico de memória residente do processo atual, em MB, ou None se não
+    houver como medir nesta plataforma (no Windows é preciso o psutil).
+    """
+    try:
+        import resource
+    except ImportError:
+        try:
+            import psutil
+        except ImportError:
+            return None
+        info = psutil.Process().memory_info()
+        return round(getattr(info, "peak_wset", info.rss) / 1024 / 1024, 1)
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # ru_maxrss vem em KB no Linux e em bytes no macOS
+    return round(peak / 1024 / (1024 if sys.platform == "darwin" else 1), 1)
+
+
+def folder_bytes(path):
+    if os.path.isfile(path):
+        return os.path.getsize(path)
+    total = 0
+    for root, _, files in os.walk(path):
+        for name in files:
+            total += os.path.getsize(os.path.join(root, name))
+    return total
+
+
+def make_text_capture(i, width=PAGE_WIDTH, height=PAGE_HEIGHT):
+    """
+    Imagem RGB de uma página de texto como o screenshot do extract_text:
+    fundo branco, texto antialiasado e um destaque colorido a cada 5 páginas.
+    """
+    img = Image.new("RGB", (width, height), "white")
+    draw = ImageDraw.Draw(img)
+    if i % 5 == 4:
+        draw.rectangle((40, height // 2, width - 40, height // 2 + 200), fill=(70, 120, 200))
+    for n, line in enumerate(page_lines(i)):
+        draw.text((40, 40 + n * 30), line, fill=(17, 17, 17))
+    return img
+
+
+def write_page_images(folder, pages, width=PAGE_WIDTH, height=PAGE_HEIGHT, kind="scan"):
+    """
+    Gera `pages` imagens de página em `folder`, como as que o
+    extract_images ("scan", JPEG) ou o extract_text ("text", PNG)
+    deixariam, para medir a montagem do PDF sem navegador.
+    """
+    os.makedirs(folder, exist_ok=True)
+    paths = []
+    for i in range(pages):
+        if kind == "text":
+            path = os.path.join(folder, f"page_{i+1:03}.png")
+            make_text_capture(i, width, height).save(path)
+        else:
+            path = os.path.join(folder, f"page_{i+1:03}.jpg")
+            with open(path, "wb") as f:
+                f.write(make_page_image(i, width, height))
+        paths.append(path)
+    return paths
+
+
+# Cada etapa roda num processo novo (ver run_stage) e devolve
+# (páginas processadas, caminho cujo tamanho conta como bytes escritos).
+
+def stage_detect(params):
+    from extractor_text import detect_document_type
+    tipo = detect_document_type(params["url"])
+    if tipo != params["expected"]:
+        raise RuntimeError(f"tipo detectado {tipo!r}, esperado {params['expected']!r}")
+    return None, None
+
+
+def stage_page_load(params):
+    from extractor_text import setup_driver, hardcore_block
+    from blocking import apply_block_profile
+    from lazyload import wait_for_pages
+    from metrics import count
+    from netcapture import NetworkRecorder
+
+    driver = setup_driver()
+    try:
+        recorder = NetworkRecorder(driver).start()
+        if params["block_profile"]:
+            apply_block_profile(driver, params["block_profile"])
+        driver.get(params["url"])
+        hardcore_block(driver)
+        report = wait_for_pages(driver)
+        stats = recorder.stats()
+        count("network_requests", stats["requests"])
+        count("network_blocked", stats["blocked"])
+        count("network_bytes", stats["bytes_loaded"])
+        return report["loaded"], None
+    finally:
+        driver.quit()
+
+
+def stage_extract_images(params):
+    from extractor_scan import extract_images
+    paths = extract_images(params["url"], params["folder"], cache=False)
+    return len(paths), params["folder"]
+
+
+def stage_extract_text(params):
+    from extractor_text import extract_text
+    paths = extract_text(params["url"], output_folder=params["folder"], cache=False,
+                         batch_size=params["batch_size"], scale=params.get("scale", 1))
+    return len(paths), params["folder"]
+
+
+def stage_save_images_to_pdf(params):
+    from renderer import save_images_to_pdf
+    paths = write_page_images(params["folder"], params["pages"], kind=params.get("kind", "scan"))
+    output_path = os.path.join(params["folder"], "saida.pdf")
+    # Só a montagem do PDF entra na medida; as imagens já existem
+    params["started"] = time.perf_counter()
+    save_images_to_pdf(paths, output_path, profile=params.get("profile"))
+    return len(paths), output_path
+
+
+def stage_save_text_to_pdf(params):
+    from renderer import save_text_to_pdf
+    paths = write_page_images(params["folder"], params["pages"])
+    output_path = os.path.join(params["folder"], "saida.pdf")
+    params["started"] = time.perf_counter()
+    # Cache de OCR vazio, para medir o OCR de fato
+    save_text_to_pdf(paths, output_path, cache_dir=os.path.join(params["folder"], "ocr"))
+    return len(paths), output_path
+
+
+STAGES = {
+    "detect_document_type": stage_detect,
+    "page_load": stage_page_load,
+    "extract_images": stage_extract_images,
+    "extract_text": stage_extract_text,
+    "save_images_to_pdf": stage_save_images_to_pdf,
+    "save_text_to_pdf": stage_save_text_to_pdf,
+}
+
+
+def _stage_worker(name, params, results):
+    from metrics import Metrics
+    metrics = Metrics(job=name)
+    try:
+        with metrics.activate():
+            params["started"] = time.perf_counter()
+            pages, output = STAGES[name](params)
+            seconds = time.perf_counter() - params["started"]
+        results.put({
+            "ok": True,
+            "seconds": seconds,
+            "pages": pages,
+            "bytes_written": folder_bytes(output) if output else 0,
+            "peak_rss_mb": peak_rss_mb(),
+            "counters": metrics.to_dict()["counters"],
+        })
+    except BaseException as e:
+        results.put({"ok": False, "error": f"{type(e).__name__}: {e}"})
+
+
+def run_stage(name, params, timeout=900):
+    """
+    Executa a etapa `name` num processo separado, para que o pico de
+    memória medido seja só dela, e retorna o resultado da execução.
+    """
+    context = multiprocessing.get_context("spawn")
+    results = context.Queue()
+    process = context.Process(target=_stage_worker, args=(name, params, results))
+    process.start()
+    try:
+        result = results.get(timeout=timeout)
+    except Exception:
+        result = {"ok": False, "error": f"sem resposta em {timeout}s"}
+    process.join(10)
+    if process.is_alive():
+        process.terminate()
+    return result
+
+
+def summarize(name, pages, runs):
+    """
+    Junta as repetições de uma etapa: mediana do tempo, maior pico de
+    memória e páginas/s calculadas sobre a mediana.
+    """
+    ok = [r for r in runs if r["ok"]]
+    summary = {"stage": name, "pages": pages, "runs": len(runs), "failures": len(runs) - len(ok)}
+    if not ok:
+        summary["error"] = runs[-1]["error"]
+        return summary
+    seconds = statistics.median(r["seconds"] for r in ok)
+    rss = [r["peak_rss_mb"] for r in ok if r["peak_rss_mb"] is not None]
+    done = ok[-1]["pages"]
+    summary.update({
+        "seconds": round(seconds, 3),
+        "seconds_min": round(min(r["seconds"] for r in ok), 3),
+        "seconds_max": round(max(r["seconds"] for r in ok), 3),
+        "pages_per_s": round(done / seconds, 2) if done and seconds else None,
+        "peak_rss_mb": max(rss) if rss else None,
+        "bytes_written": ok[-1]["bytes_written"],
+        "counters": ok[-1]["counters"],
+    })
+    return summary
+
+
+def stage_params(name, server, pages, args):
+    if name == "detect_document_type":
+        return [("scan", {"url": server.url("scan", pages), "expected": "scan"}),
+                ("text", {"url": server.url("text", pages), "expected": "text"})]
+    if name == "page_load":
+        return [("sem bloqueio", {"url": server.url("scan", pages), "block_profile": None}),
+                ("com bloqueio", {"url": server.url("scan", pages), "block_profile": "scan"})]
+    if name == "extract_images":
+        return [(None, {"url": server.url("scan", pages)})]
+    if name == "extract_text":
+        # Com mais de uma escala, o rótulo indica a escala de cada variação
+        return [(f"batch {size}" + (f", {scale:g}x" if args.escalas != [1] else ""),
+                 {"url": server.url("text", pages), "batch_size": size, "scale": scale})
+                for size in args.batch_size for scale in args.escalas]
+    if name == "save_images_to_pdf" and args.perfis:
+        # Tamanho x tempo de cada perfil de compressão, para scans e capturas de texto
+        return [(f"{kind} {profile}", {"pages": pages, "kind": kind,
+                                       "profile": None if profile == "original" else profile})
+                for kind in ("scan", "text") for profile in args.perfis]
+    return [(None, {"pages": pages})]
+
+
+def environment():
+    try:
+        commit = subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True,
+                                cwd=os.path.dirname(os.path.abspath(__file__))).stdout.strip() or None
+    except OSError:
+        commit = None
+    return {
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "cpus": os.cpu_count(),
+        "commit": commit,
+    }
+
+
+def run_benchmarks(args):
+    results = []
+    with FixtureServer(latency=args.latencia, third_party_latency=args.latencia_terceiros) as server:
+        print(f"🧪 Servidor de teste em {server.base_url}")
+        for pages in args.paginas:
+            for name in args.etapas:
+                for variant, params in stage_params(name, server, pages, args):
+                    label = f"{name} [{variant}]" if variant else name
+                    runs = []
+                    for n in range(args.repeticoes):
+                        folder = tempfile.mkdtemp(prefix="bench_")
+                        try:
+                            params = dict(params, folder=folder)
+                            print(f"⏱️ {label}: {pages} páginas, execução {n+1} de {args.repeticoes}")
+                            runs.append(run_stage(name, params, timeout=args.timeout))
+                        finally:
+                            shutil.rmtree(folder, ignore_errors=True)
+                    summary = summarize(label, pages, runs)
+                    results.append(summary)
+                    print_result(summary)
+    return {
+        "environment": environment(),
+        "config": {
+            "paginas": args.paginas,
+            "latencia": args.latencia,
+            "latencia_terceiros": args.latencia_terceiros,
+            "repeticoes": args.repeticoes,
+            "batch_size": args.batch_size,
+            "perfis": args.perfis,
+            "escalas": args.escalas,
+        },
+        "results": results,
+    }
+
+
+def print_result(summary):
+    if "error" in summary:
+        print(f"❌ {summary['stage']} ({summary['pages']} páginas): {summary['error']}")
+        return
+    rate = f", {summary['pages_per_s']} páginas/s" if summary["pages_per_s"] else ""
+    rss = f", pico {summary['peak_rss_mb']} MB" if summary["peak_rss_mb"] is not None else ""
+    print(f"✅ {summary['stage']} ({summary['pages']} páginas): {summary['seconds']}s{rate}{rss}, "
+          f"{summary['bytes_written'] / 1024 / 1024:.1f} MB escritos")
+
+
+def compare(current, baseline, tolerance=0.2):
+    """
+    Compara com um resultado anterior (mesma etapa e número de páginas) e
+    retorna as regressões: tempo ou pico de memória acima de
+    (1 + `tolerance`) vezes o anterior.
+    """
+    previous = {(r["stage"], r["pages"]): r for r in baseline["results"] if "error" not in r}
+    regressions = []
+    for result in current["results"]:
+        before = previous.get((result["stage"], result["pages"]))
+        if before is None or "error" in result:
+            continue
+        for field in ("seconds", "peak_rss_mb"):
+            old, new = before.get(field), result.get(field)
+            if old and new and new > old * (1 + tolerance):
+                regressions.append({"stage": result["stage"], "pages": result["pages"], "field": field,
+                                    "before": old, "after": new, "change": round(new / old - 1, 3)})
+    return regressions
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(
+        description="Mede o desempenho dos extratores e do renderer contra um Scribd falso local.")
+    parser.add_argument("--paginas", type=int, nargs="+", default=[20], help="número(s) de páginas do documento")
+    parser.add_argument("--etapas", nargs="+", choices=list(STAGES), default=list(STAGES),
+                        help="etapas a medir")
+    parser.add_argument("--latencia", type=float, default=0.05, help="atraso por imagem/texto de página, em segundos")
+    parser.add_argument("--latencia-terceiros", type=float, default=0.3,
+                        help="atraso por recurso de terceiros (analytics, anúncios), em segundos")
+    parser.add_argument("--repeticoes", type=int, default=3, help="execuções por etapa (vale a mediana)")
+    parser.add_argument("--batch-size", type=int, nargs="+", default=[4],
+                        help="tamanho(s) de lote da captura no extract_text")
+    parser.add_argument("--escalas", type=float, nargs="+", default=[1],
+                        help="escala(s) da captura no extract_text (ex.: 1 2 3)")
+    parser.add_argument("--perfis", nargs="+", choices=["original"] + list(COMPRESSION_PROFILES), default=[],
+                        help="mede o save_images_to_pdf com cada perfil de compressão")
+    parser.add_argument("--timeout", type=float, default=900, help="tempo máximo por execução, em segundos")
+    parser.add_argument("--saida", help="salva os resultados em JSON neste caminho")
+    parser.add_argument("--comparar", help="JSON de uma execução anterior para detectar regressões")
+    parser.add_argument("--tolerancia", type=float, default=0.2,
+                        help="piora relativa aceita antes de acusar regressão (0.2 = 20%%)")
+    args = parser.parse_args(argv)
+
+    report = run_benchmarks(args)
+
+    if args.saida:
+        with open(args.saida, "w", encoding="utf-8") as f:
+            json.dump(report, f, ensure_ascii=False, indent=2)
+        print(f"📝 Resultados salvos em {args.saida}")
+
+    if args.comparar:
+        with open(args.comparar, encoding="utf-8") as f:
+            baseline = json.load(f)
+        regressions = compare(report, baseline, args.tolerancia)
+        for r in regressions:
+            print(f"🐢 {r['stage']} ({r['pages']} páginas): {r['field']} {r['before']} -> {r['after']} "
+                  f"(+{r['change']:.0%})")
+        if regressions:
+            return 1
+        print("✅ Nenhuma regressão em relação à execução anterior")
+
+    failures = sum(r["failures"] for r in report["results"])
+    return 1 if failures else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
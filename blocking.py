@@ -0,0 +1,59 @@
+from netcapture import MAX_TOTAL_BUFFER, MAX_RESOURCE_BUFFER
+
+# Padrões no formato do CDP Network.setBlockedURLs ("*" casa qualquer trecho).
+# "common" vale para qualquer documento; os outros perfis somam a ele o que
+# aquele tipo de documento não usa.
+BLOCK_PRESETS = {
+    "common": [
+        "*google-analytics.com*", "*googletagmanager.com*", "*googlesyndication.com*",
+        "*doubleclick.net*", "*googleadservices.com*", "*adservice.google.*",
+        "*facebook.net*", "*facebook.com/tr*", "*connect.facebook.net*",
+        "*amazon-adsystem.com*", "*adnxs.com*", "*criteo.*", "*taboola.com*", "*outbrain.com*",
+        "*scorecardresearch.com*", "*quantserve.com*", "*hotjar.com*", "*segment.io*",
+        "*segment.com/analytics*", "*newrelic.com*", "*nr-data.net*", "*sentry.io*",
+        "*optimizely.com*", "*branch.io*", "*braze.com*", "*onetrust.com*", "*cookielaw.org*",
+        "*youtube.com/embed*", "*.mp4*", "*.webm*",
+    ],
+    # Scan: o conteúdo são as imagens das páginas; fontes e ícones não servem
+    "scan": [
+        "*.woff*", "*.ttf*", "*.otf*", "*.eot*", "*fonts.googleapis.com*", "*fonts.gstatic.com*",
+        "*.gif*", "*.svg*",
+    ],
+    # Texto: fontes são necessárias para renderizar o text_layer
+    "text": [
+        "*.gif*",
+    ],
+}
+
+
+def block_patterns(profile):
+    """
+    Lista de padrões de um perfil ("common", "scan", "text") ou, se
+    `profile` já for uma lista, ela mesma somada ao "common".
+    """
+    if profile is None:
+        return []
+    if isinstance(profile, str):
+        extra = BLOCK_PRESETS[profile] if profile != "common" else []
+    else:
+        extra = list(profile)
+    return BLOCK_PRESETS["common"] + extra
+
+
+def apply_block_profile(driver, profile):
+    """
+    Bloqueia, via CDP, as requisições que casam com o perfil `profile`.
+    Deve ser chamado antes do driver.get para valer desde o carregamento.
+    Retorna os padrões aplicados (lista vazia se o CDP não estiver disponível).
+    """
+    patterns = block_patterns(profile)
+    try:
+        driver.execute_cdp_cmd("Network.enable", {
+            "maxTotalBufferSize": MAX_TOTAL_BUFFER,
+            "maxResourceBufferSize": MAX_RESOURCE_BUFFER,
+        })
+        driver.execute_cdp_cmd("Network.setBlockedURLs", {"urls": patterns})
+    except Exception as e:
+        print(f"⚠️ Bloqueio de requisições indisponível: {str(e)[:100]}")
+        return []
+    return patterns
@@ -0,0 +1,210 @@
+import os
+import json
+import shutil
+import socket
+import threading
+from netcapture import enable_performance_log
+from metrics import timed, count
+
+# Navegador e driver que funcionaram da última vez; as próximas execuções
+# começam por eles e só refazem a busca se o lançamento falhar
+DRIVER_CACHE_PATH = os.path.join(os.getcwd(), "cache", "driver.json")
+
+USER_AGENT = "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36"
+
+# Onde procurar os navegadores quando eles não estão no PATH
+BROWSER_PATHS = {
+    "edge": [
+        r"C:\Program Files (x86)\Microsoft\Edge\Application\msedge.exe",
+        r"C:\Program Files\Microsoft\Edge\Application\msedge.exe",
+        "/Applications/Microsoft Edge.app/Contents/MacOS/Microsoft Edge",
+        "/opt/microsoft/msedge/msedge",
+    ],
+    "chrome": [
+        r"C:\Program Files\Google\Chrome\Application\chrome.exe",
+        r"C:\Program Files (x86)\Google\Chrome\Application\chrome.exe",
+        "/Applications/Google Chrome.app/Contents/MacOS/Google Chrome",
+        "/opt/google/chrome/chrome",
+    ],
+}
+BROWSER_COMMANDS = {
+    "edge": ["msedge", "microsoft-edge", "microsoft-edge-stable"],
+    "chrome": ["google-chrome", "google-chrome-stable", "chromium", "chromium-browser", "chrome"],
+}
+DRIVER_COMMANDS = {"edge": "msedgedriver", "chrome": "chromedriver"}
+DRIVER_HOSTS = {"edge": "msedgedriver.azureedge.net", "chrome": "googlechromelabs.github.io"}
+
+_online = {}
+
+
+def browser_installed(browser):
+    if any(shutil.which(name) for name in BROWSER_COMMANDS[browser]):
+        return True
+    return any(os.path.exists(path) for path in BROWSER_PATHS[browser])
+
+
+def is_online(host, timeout=1.5):
+    """
+    True se `host` aceita conexão na porta 443. O resultado fica guardado
+    no processo para não pagar o timeout a cada navegador aberto.
+    """
+    if host not in _online:
+        try:
+            socket.create_connection((host, 443), timeout=timeout).close()
+            _online[host] = True
+        except OSError:
+            _online[host] = False
+    return _online[host]
+
+
+def edge_options():
+    from selenium.webdriver.edge.options import Options
+
+    options = Options()
+    options.add_argument("--headless")
+    options.add_argument("--disable-gpu")
+    options.add_argument("--no-sandbox")
+    options.add_argument("--disable-dev-shm-usage")
+    options.add_argument("--disable-web-security")
+    options.add_argument("--allow-running-insecure-content")
+    options.add_argument("--disable-features=VizDisplayCompositor")
+    options.add_argument(f"--user-agent={USER_AGENT}")
+    enable_performance_log(options, "ms")
+    return options
+
+
+def chrome_options():
+    from selenium.webdriver.chrome.options import Options as ChromeOptions
+
+    options = ChromeOptions()
+    options.add_argument("--headless")
+    options.add_argument("--disable-gpu")
+    options.add_argument("--no-sandbox")
+    options.add_argument("--disable-dev-shm-usage")
+    enable_performance_log(options, "goog")
+    return options
+
+
+def launch(browser, driver_path=None):
+    """
+    Abre o navegador `browser` ("edge" ou "chrome") com o driver em
+    `driver_path` (ou o que o Selenium encontrar, se None).
+    """
+    # O selenium só é carregado quando um navegador é de fato aberto
+    from selenium import webdriver
+    from selenium.webdriver.edge.service import Service as EdgeService
+
+    if browser == "edge":
+        service = EdgeService(executable_path=driver_path) if driver_path else EdgeService()
+        driver = webdriver.Edge(service=service, options=edge_options())
+    else:
+        from selenium.webdriver.chrome.service import Service as ChromeService
+        service = ChromeService(executable_path=driver_path) if driver_path else ChromeService()
+        driver = webdriver.Chrome(service=service, options=chrome_options())
+    driver.set_window_size(1920, 2000)
+    return driver
+
+
+def _manager_path(browser, cached):
+    if browser == "edge":
+        from webdriver_manager.microsoft import EdgeChromiumDriverManager as Manager
+    else:
+        from webdriver_manager.chrome import ChromeDriverManager as Manager
+    return Manager(cache_valid_range=30).install() if cached else Manager().install()
+
+
+def driver_candidates():
+    """
+    Formas de obter um driver, da mais barata para a mais cara, cada uma
+    como (nome, navegador, função que retorna o caminho do driver ou None).
+    As que o ambiente não suporta (navegador ausente, sem internet) já
+    ficam de fora, em vez de custarem um timeout cada.
+    """
+    candidates = []
+    for browser, label in (("edge", "Edge"), ("chrome", "Chrome")):
+        if not browser_installed(browser):
+            print(f"⏭️ {label} não encontrado, pulando")
+            continue
+        system_driver = shutil.which(DRIVER_COMMANDS[browser])
+        if system_driver:
+            candidates.append((f"{label}: driver do sistema", browser, lambda path=system_driver: path))
+        candidates.append((f"{label}: WebDriver Manager (cache)", browser,
+                           lambda browser=browser: _manager_path(browser, cached=True)))
+        if is_online(DRIVER_HOSTS[browser]):
+            candidates.append((f"{label}: WebDriver Manager (fresh)", browser,
+                               lambda browser=browser: _manager_path(browser, cached=False)))
+            if not system_driver:
+                # Selenium Manager, embutido no Selenium, baixa o driver sozinho
+                candidates.append((f"{label}: Selenium Manager", browser, lambda: None))
+        else:
+            print(f"⏭️ Sem acesso a {DRIVER_HOSTS[browser]}, pulando o download do driver do {label}")
+    if not candidates:
+        # Instalação fora dos caminhos conhecidos: deixa o Selenium procurar
+        candidates.append(("Edge: Selenium Manager", "edge", lambda: None))
+    return candidates
+
+
+def load_driver_choice(path=DRIVER_CACHE_PATH):
+    try:
+        with open(path, encoding="utf-8") as f:
+            choice = json.load(f)
+    except (OSError, ValueError):
+        return None
+    driver_path = choice.get("driver_path")
+    if choice.get("browser") not in ("edge", "chrome") or (driver_path and not os.path.exists(driver_path)):
+        return None
+    return choice
+
+
+def save_driver_choice(choice, path=DRIVER_CACHE_PATH):
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    # Vários navegadores do pool podem gravar ao mesmo tempo
+    tmp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump(choice, f, ensure_ascii=False, indent=2)
+    os.replace(tmp_path, path)
+
+
+def forget_driver_choice(path=DRIVER_CACHE_PATH):
+    try:
+        os.remove(path)
+    except OSError:
+        pass
+
+
+@timed("driver_startup")
+def setup_driver():
+    """
+    Cria e retorna uma instância do WebDriver (Edge, ou Chrome como
+    fallback). O navegador e o driver que funcionarem são guardados em
+    DRIVER_CACHE_PATH e usados direto nas próximas chamadas; a busca
+    completa só é refeita se eles deixarem de abrir.
+    """
+    choice = load_driver_choice()
+    if choice:
+        try:
+            driver = launch(choice["browser"], choice.get("driver_path"))
+            print(f"✅ Navegador inicializado via {choice['method']} (salvo)")
+            return driver
+        except Exception as e:
+            print(f"⚠️ Driver salvo não abriu mais, procurando de novo: {str(e)[:100]}...")
+            count("driver_fallbacks")
+            forget_driver_choice()
+
+    print("🔧 Inicializando navegador...")
+    for method_name, browser, resolve in driver_candidates():
+        try:
+            print(f"🔄 Tentando: {method_name}")
+            driver_path = resolve()
+            driver = launch(browser, driver_path)
+        except Exception as e:
+            print(f"❌ Falhou {method_name}: {str(e)[:100]}...")
+            count("driver_fallbacks")
+            continue
+        if driver_path is None:
+            driver_path = getattr(driver.service, "path", None)
+        save_driver_choice({"browser": browser, "driver_path": driver_path, "method": method_name})
+        print(f"✅ Navegador inicializado com sucesso via {method_name}")
+        return driver
+
+    raise RuntimeError("❌ Todos os métodos de inicialização falharam")
@@ -0,0 +1,319 @@
+import os
+import json
+import atexit
+import time
+import shutil
+import hashlib
+import threading
+
+CACHE_DIR = os.path.join(os.getcwd(), "cache", "pages")
+CACHE_MAX_BYTES = 2 * 1024 ** 3
+
+# Temporários de gravação mais velhos que isso são de processos que morreram
+STALE_TMP_SECONDS = 3600
+
+
+class PageCache:
+    """
+    Cache em disco, endereçado por conteúdo, para imagens de página e
+    screenshots. Cada arquivo é guardado uma vez em blobs/<sha256> e o
+    índice associa chaves (URL da imagem, página capturada) ao hash, junto
+    com ETag/Last-Modified para revalidação condicional. O tamanho total é
+    limitado a `max_bytes`, removendo os blobs usados há mais tempo (LRU).
+
+    O índice é gravado em index.json a cada mudança, no máximo uma vez a
+    cada `save_interval` segundos (e no `save` final). Blobs que o índice
+    em disco não conhece (ex.: o processo morreu antes de gravá-lo) são
+    reincorporados na abertura, para continuarem sujeitos à remoção LRU.
+    """
+
+    def __init__(self, cache_dir=CACHE_DIR, max_bytes=CACHE_MAX_BYTES, save_interval=1.0):
+        self.cache_dir = cache_dir
+        self.max_bytes = max_bytes
+        self.save_interval = save_interval
+        self.blob_dir = os.path.join(cache_dir, "blobs")
+        self.index_path = os.path.join(cache_dir, "index.json")
+        self.hits = 0
+        self.misses = 0
+        self.revalidations = 0
+        self.evictions = 0
+        self._lock = threading.RLock()
+        self._last_save = time.monotonic()
+        self._dirty = False
+        os.makedirs(self.blob_dir, exist_ok=True)
+        self._load()
+        self._sync_blobs()
+
+    def _load(self):
+        self.entries = {}
+        self.blobs = {}
+        self.documents = {}
+        self.document_text = {}
+        if not os.path.exists(self.index_path):
+            return
+        try:
+            with open(self.index_path, encoding="utf-8") as f:
+                data = json.load(f)
+        except (OSError, ValueError) as e:
+            print(f"⚠️ Índice do cache ilegível, reconstruindo a partir dos blobs: {e}")
+            return
+        self.entries = data.get("entries", {})
+        self.blobs = data.get("blobs", {})
+        self.documents = data.get("documents", {})
+        self.document_text = data.get("document_text", {})
+
+    def _sync_blobs(self):
+        """
+        Acerta o índice com o que está em blobs/: blobs sem registro entram
+        com o horário de modificação como último uso, registros sem blob
+        saem, e temporários de gravações interrompidas são apagados.
+        """
+        on_disk = set()
+        for name in os.listdir(self.blob_dir):
+            path = os.path.join(self.blob_dir, name)
+            try:
+                if name.endswith(".tmp"):
+                    # Outro processo pode estar gravando este agora
+                    if time.time() - os.path.getmtime(path) > STALE_TMP_SECONDS:
+                        os.remove(path)
+                    continue
+                if name not in self.blobs:
+                    self.blobs[name] = {"size": os.path.getsize(path), "atime": os.path.getmtime(path)}
+                    self._dirty = True
+            except OSError:
+                continue
+            on_disk.add(name)
+        for sha256 in [sha256 for sha256 in self.blobs if sha256 not in on_disk]:
+            del self.blobs[sha256]
+            self._dirty = True
+        if self._dirty:
+            self._drop_orphans()
+            self._evict()
+            self.save()
+
+    def save(self):
+        with self._lock:
+            if not self._dirty:
+                return
+            data = {"entries": self.entries, "blobs": self.blobs, "documents": self.documents,
+                    "document_text": self.document_text}
+            tmp_path = f"{self.index_path}.{os.getpid()}.tmp"
+            with open(tmp_path, "w", encoding="utf-8") as f:
+                json.dump(data, f)
+            os.replace(tmp_path, self.index_path)
+            self._last_save = time.monotonic()
+            self._dirty = False
+
+    def _changed(self):
+        # Chamado com o lock; grava o índice se o último save já passou do intervalo
+        self._dirty = True
+        if time.monotonic() - self._last_save >= self.save_interval:
+            self.save()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.save()
+
+    def blob_path(self, sha256):
+        return os.path.join(self.blob_dir, sha256)
+
+    def stats(self):
+        """
+        Contadores de uso do cache desde a criação desta instância.
+        """
+        with self._lock:
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "revalidations": self.revalidations,
+                "evictions": self.evictions,
+                "bytes": sum(blob["size"] for blob in self.blobs.values()),
+                "blobs": len(self.blobs),
+            }
+
+    def _entry(self, key):
+        entry = self.entries.get(key)
+        if entry and os.path.exists(self.blob_path(entry["sha256"])):
+            return entry
+        return None
+
+    def get(self, key, count=True):
+        """
+        Caminho do blob guardado para `key`, ou None. Conta hit/miss.
+        """
+        with self._lock:
+            entry = self._entry(key)
+            if count:
+                self.count(hit=entry is not None)
+            if not entry:
+                return None
+            self._touch(entry["sha256"])
+            return self.blob_path(entry["sha256"])
+
+    def validators(self, key):
+        """
+        Cabeçalhos para uma requisição condicional de `key` (If-None-Match /
+        If-Modified-Since), vazio se o servidor não mandou ETag nem
+        Last-Modified na última vez.
+        """
+        with self._lock:
+            entry = self._entry(key)
+            headers = {}
+            if entry and entry.get("etag"):
+                headers["If-None-Match"] = entry["etag"]
+            if entry and entry.get("last_modified"):
+                headers["If-Modified-Since"] = entry["last_modified"]
+            return headers
+
+    def count(self, hit, revalidated=False):
+        """
+        Atualiza os contadores quando quem chama decide o resultado (ex.: o
+        downloader, depois de uma requisição condicional).
+        """
+        with self._lock:
+            if hit:
+                self.hits += 1
+            else:
+                self.misses += 1
+            if revalidated:
+                self.revalidations += 1
+
+    def _touch(self, sha256):
+        blob = self.blobs.get(sha256)
+        if blob:
+            blob["atime"] = time.time()
+            self._dirty = True
+
+    def put(self, key, data, etag=None, last_modified=None):
+        """
+        Guarda os bytes `data` sob `key` e retorna o caminho do blob.
+        """
+        sha256 = hashlib.sha256(data).hexdigest()
+        path = self.blob_path(sha256)
+        if not os.path.exists(path):
+            tmp_path = f"{path}.{threading.get_ident()}.tmp"
+            with open(tmp_path, "wb") as f:
+                f.write(data)
+            os.replace(tmp_path, path)
+        return self._register(key, sha256, len(data), etag, last_modified)
+
+    def put_file(self, key, file_path, etag=None, last_modified=None):
+        """
+        Guarda o conteúdo do arquivo `file_path` sob `key`.
+        """
+        with open(file_path, "rb") as f:
+            return self.put(key, f.read(), etag, last_modified)
+
+    def _register(self, key, sha256, size, etag, last_modified):
+        with self._lock:
+            self.entries[key] = {"sha256": sha256, "etag": etag, "last_modified": last_modified}
+            self.blobs[sha256] = {"size": size, "atime": time.time()}
+            self._evict()
+            self._changed()
+            return self.blob_path(sha256)
+
+    def _evict(self):
+        total = sum(blob["size"] for blob in self.blobs.values())
+        if total <= self.max_bytes:
+            return
+        for sha256, blob in sorted(self.blobs.items(), key=lambda item: item[1]["atime"]):
+            if total <= self.max_bytes:
+                break
+            try:
+                os.remove(self.blob_path(sha256))
+            except OSError:
+                pass
+            del self.blobs[sha256]
+            total -= blob["size"]
+            self.evictions += 1
+        self._drop_orphans()
+        self._dirty = True
+
+    def _drop_orphans(self):
+        self.entries = {k: v for k, v in self.entries.items() if v["sha256"] in self.blobs}
+        # Documento com camada de texto perdida sai inteiro: refazê-lo só
+        # com as imagens perderia o texto pesquisável
+        self.documents = {
+            url: pages for url, pages in self.documents.items()
+            if all(sha256 in self.blobs for sha256 in pages + self.document_text.get(url, []))
+        }
+        self.document_text = {url: layers for url, layers in self.document_text.items() if url in self.documents}
+
+    def copy_to(self, key, dest_path):
+        """
+        Copia o blob de `key` para `dest_path`. Retorna False se não houver.
+        """
+        path = self.get(key)
+        if path is None:
+            return False
+        shutil.copyfile(path, dest_path)
+        return True
+
+    def link_document(self, url, keys, text_keys=None):
+        """
+        Associa o documento `url` às páginas já guardadas sob `keys`, em
+        ordem (ex.: as URLs das imagens baixadas), e, com `text_keys`, às
+        camadas de texto dessas páginas.
+        """
+        with self._lock:
+            entries = [self._entry(key) for key in keys]
+            text_entries = [self._entry(key) for key in text_keys or ()]
+            if not all(entries) or not all(text_entries):
+                return False
+            self.documents[url] = [entry["sha256"] for entry in entries]
+            if text_keys:
+                self.document_text[url] = [entry["sha256"] for entry in text_entries]
+            else:
+                self.document_text.pop(url, None)
+            self._dirty = True
+        self.save()
+        return True
+
+    def document_pages(self, url):
+        """
+        Caminhos dos blobs das páginas de `url`, em ordem, ou None se o
+        documento não estiver completo no cache.
+        """
+        with self._lock:
+            pages = self.documents.get(url)
+            if not pages or not all(os.path.exists(self.blob_path(sha)) for sha in pages):
+                self.misses += 1
+                return None
+            self.hits += 1
+            for sha256 in pages:
+                self._touch(sha256)
+            return [self.blob_path(sha256) for sha256 in pages]
+
+    def document_text_layers(self, url):
+        """
+        Caminhos dos blobs com as camadas de texto (JSON) das páginas de
+        `url`, na ordem de `document_pages`, ou None se o documento não
+        tiver camada de texto no cache.
+        """
+        with self._lock:
+            layers = self.documents.get(url) and self.document_text.get(url)
+            if not layers or not all(os.path.exists(self.blob_path(sha)) for sha in layers):
+                return None
+            for sha256 in layers:
+                self._touch(sha256)
+            return [self.blob_path(sha256) for sha256 in layers]
+
+
+_default_cache = None
+_default_cache_lock = threading.Lock()
+
+
+def default_cache():
+    """
+    Instância compartilhada do cache, criada na primeira chamada. Os
+    trabalhos do lote chamam isto de várias threads ao mesmo tempo.
+    """
+    global _default_cache
+    with _default_cache_lock:
+        if _default_cache is None:
+            _default_cache = PageCache()
+            # O índice é gravado com intervalo mínimo; o que faltar sai no fim
+            atexit.register(_default_cache.save)
+        return _default_cache
@@ -0,0 +1,229 @@
+import io
+import os
+import struct
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+
+# Perfis de saída do PDF. `dpi` é a resolução máxima das imagens (as páginas
+# acima dela são reduzidas), `quality` a qualidade JPEG/JPEG 2000 inicial,
+# `format` o codec das páginas em tons de cinza ou coloridas ("jpeg" ou
+# "jpx"), `grayscale` permite gravar em cinza as páginas sem cor e `bilevel`
+# permite gravar em preto e branco (1 bit) as páginas de texto puro.
+COMPRESSION_PROFILES = {
+    "archive": {"dpi": 300, "quality": 90, "format": "jpeg", "grayscale": True, "bilevel": False},
+    "balanced": {"dpi": 200, "quality": 75, "format": "jpeg", "grayscale": True, "bilevel": False},
+    "small": {"dpi": 150, "quality": 60, "format": "jpeg", "grayscale": True, "bilevel": True},
+    "tiny": {"dpi": 110, "quality": 45, "format": "jpx", "grayscale": True, "bilevel": True},
+}
+
+# As capturas não trazem DPI: a página é tratada como A4/Carta, com o lado
+# menor medindo PAGE_SHORT_SIDE_IN polegadas
+PAGE_SHORT_SIDE_IN = 8.27
+
+# Limites da busca pelo tamanho alvo: abaixo deles a página fica ilegível
+MIN_QUALITY = 25
+MIN_DPI = 72
+
+# Pixels com diferença entre canais acima de COLOR_DELTA contam como cor;
+# a página é colorida se passarem de COLOR_FRACTION do total. A página é de
+# texto puro se os tons intermediários não passarem de MIDTONE_FRACTION.
+COLOR_DELTA = 32
+COLOR_FRACTION = 0.005
+MIDTONE_FRACTION = 0.04
+
+
+def get_profile(profile):
+    """
+    Configuração de um perfil pelo nome, ou o próprio dict se `profile` já
+    for uma configuração (chaves ausentes vêm do "balanced").
+    """
+    if profile is None or isinstance(profile, dict):
+        return None if profile is None else {**COMPRESSION_PROFILES["balanced"], **profile}
+    if profile not in COMPRESSION_PROFILES:
+        raise ValueError(f"Perfil de compressão desconhecido: {profile!r} "
+                         f"(disponíveis: {', '.join(COMPRESSION_PROFILES)})")
+    return COMPRESSION_PROFILES[profile]
+
+
+def classify_colors(img, grayscale=True, bilevel=True):
+    """
+    Retorna "bilevel", "gray" ou "color" conforme o conteúdo da imagem,
+    respeitando o que o perfil permite. Usa só histogramas, sem percorrer
+    os pixels em Python.
+    """
+    from PIL import ImageChops
+
+    if img.mode in ("RGB", "RGBA", "CMYK", "P"):
+        rgb = img.convert("RGB")
+        if not grayscale:
+            return "color"
+        r, g, b = rgb.split()
+        spread = ImageChops.lighter(ImageChops.lighter(ImageChops.difference(r, g), ImageChops.difference(g, b)),
+                                    ImageChops.difference(r, b))
+        histogram = spread.histogram()
+        if sum(histogram[COLOR_DELTA:]) > COLOR_FRACTION * rgb.width * rgb.height:
+            return "color"
+        gray = rgb.convert("L")
+    elif img.mode == "1":
+        return "bilevel"
+    else:
+        gray = img.convert("L")
+
+    if bilevel:
+        histogram = gray.histogram()
+        if sum(histogram[48:208]) <= MIDTONE_FRACTION * gray.width * gray.height:
+            return "bilevel"
+    return "gray"
+
+
+def _image_header(kind, width, height, filter_name):
+    header = f"/Type /XObject /Subtype /Image /Width {width} /Height {height}"
+    if filter_name == "/JPXDecode":
+        # O JPEG 2000 traz o espaço de cores no próprio arquivo
+        return f"{header} /Filter /JPXDecode"
+    colorspace = "/DeviceRGB" if kind == "color" else "/DeviceGray"
+    bits = 1 if kind == "bilevel" else 8
+    header += f" /ColorSpace {colorspace} /BitsPerComponent {bits} /Filter {filter_name}"
+    if filter_name == "/FlateDecode":
+        colors = 3 if kind == "color" else 1
+        header += f" /DecodeParms << /Predictor 15 /Colors {colors} /BitsPerComponent {bits} /Columns {width} >>"
+    return header
+
+
+def _png_flate(img):
+    """
+    Dados Flate com preditores PNG da imagem: os chunks IDAT de um PNG
+    gerado pelo Pillow, que o PDF lê direto com /Predictor 15.
+    """
+    buffer = io.BytesIO()
+    img.save(buffer, format="PNG")
+    png = buffer.getvalue()
+    data = []
+    pos = 8  # assinatura do PNG
+    while pos < len(png):
+        length, chunk_type = struct.unpack(">I4s", png[pos:pos + 8])
+        if chunk_type == b"IDAT":
+            data.append(png[pos + 8:pos + 8 + length])
+        pos += 12 + length
+    return b"".join(data)
+
+
+def _encode(img, kind, codec, quality, lossless=None):
+    """
+    Codifica `img` (já no tamanho final) e retorna (header, dados). Páginas
+    em preto e branco vão em 1 bit com Flate; as demais no codec com perda
+    do perfil ou sem perda (Flate), o que ficar menor: capturas de texto
+    costumam comprimir melhor sem perda. `lossless` reaproveita a versão
+    sem perda já calculada para esse tamanho.
+    """
+    if kind == "bilevel":
+        # Limiar fixo no meio da escala
+        bits = img.convert("L").point(lambda v: 255 if v >= 128 else 0).convert("1")
+        return _image_header(kind, *bits.size, "/FlateDecode"), _png_flate(bits)
+
+    img = img.convert("RGB" if kind == "color" else "L")
+    buffer = io.BytesIO()
+    if codec == "jpx":
+        # Qualidade 0-100 convertida numa meta de PSNR (qualidade 75 ~ 40 dB)
+        img.save(buffer, format="JPEG2000", quality_mode="dB", quality_layers=[25 + quality * 0.2])
+        lossy = _image_header(kind, *img.size, "/JPXDecode"), buffer.getvalue()
+    else:
+        img.save(buffer, format="JPEG", quality=quality, optimize=True)
+        lossy = _image_header(kind, *img.size, "/DCTDecode"), buffer.getvalue()
+    lossless = lossless or (_image_header(kind, *img.size, "/FlateDecode"), _png_flate(img))
+    return min(lossy, lossless, key=lambda encoded: len(encoded[1]))
+
+
+def compress_page(img_path, profile, target_bytes=None):
+    """
+    Recomprime a imagem de uma página conforme `profile` (nome ou dict, ver
+    COMPRESSION_PROFILES) e retorna um dict com o tamanho da página
+    (`width`, `height`, os da imagem original), o `header` e os `data` do
+    objeto de imagem do PDF, o tipo de cor (`kind`) e os bytes antes e
+    depois. Com `target_bytes`, a qualidade e depois a resolução caem até a
+    página caber nesse tamanho (ou chegar a MIN_QUALITY e MIN_DPI).
+    Roda nos processos do pool de `compress_pages`.
+    """
+    from PIL import Image, features
+
+    settings = get_profile(profile)
+    codec = settings["format"]
+    if codec == "jpx" and not features.check("jpg_2000"):
+        codec = "jpeg"  # Pillow sem OpenJPEG
+
+    original_bytes = os.path.getsize(img_path)
+    with Image.open(img_path) as img:
+        img.load()
+        width, height = img.size
+        source_mode = img.mode
+        with open(img_path, "rb") as f:
+            is_jpeg = f.read(2) == b"\xff\xd8"
+
+        kind = classify_colors(img, settings["grayscale"], settings["bilevel"])
+        source_dpi = min(width, height) / PAGE_SHORT_SIDE_IN
+        dpi = min(settings["dpi"], source_dpi)
+        quality = settings["quality"]
+        resized = lossless = None
+
+        while True:
+            scale = dpi / source_dpi
+            size = (max(1, round(width * scale)), max(1, round(height * scale)))
+            if resized is None or resized.size != size:
+                resized = img if size == img.size else img.resize(size, Image.LANCZOS)
+                lossless = None
+            header, data = _encode(resized, kind, codec, quality, lossless)
+            if not target_bytes or len(data) <= target_bytes:
+                break
+            if header.endswith(">>"):
+                lossless = header, data  # Flate não depende da qualidade
+            if kind != "bilevel" and quality > MIN_QUALITY:
+                quality = max(MIN_QUALITY, quality - 10)
+            elif dpi > MIN_DPI:
+                dpi = max(MIN_DPI, dpi * 0.8)
+            else:
+                break
+
+    # Um JPEG que já é menor que o resultado (e cabe no alvo) vai como está
+    if (is_jpeg and source_mode in ("L", "RGB") and original_bytes <= len(data)
+            and (not target_bytes or original_bytes <= target_bytes)):
+        with open(img_path, "rb") as f:
+            data = f.read()
+        kind = "gray" if source_mode == "L" else "color"
+        header = _image_header(kind, width, height, "/DCTDecode")
+
+    return {"width": width, "height": height, "header": header, "data": data, "kind": kind,
+            "bytes_in": original_bytes, "bytes_out": len(data)}
+
+
+def compress_pages(pages, profile, target_bytes=None, workers=None):
+    """
+    Recomprime em paralelo, num pool de processos, as páginas de `pages`
+    (iterável de (índice, caminho)) e gera (índice, caminho, resultado de
+    `compress_page`) na mesma ordem em que chegaram. No máximo 2 páginas
+    por processo ficam em andamento, para a memória não crescer com o
+    tamanho do documento.
+    """
+    workers = workers or os.cpu_count() or 1
+    in_flight = deque()
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        for i, img_path in pages:
+            in_flight.append((i, img_path, pool.submit(compress_page, img_path, profile, target_bytes)))
+            if len(in_flight) >= workers * 2:
+                i, img_path, future = in_flight.popleft()
+                yield i, img_path, future.result()
+        while in_flight:
+            i, img_path, future = in_flight.popleft()
+            yield i, img_path, future.result()
+
+
+def describe(stats, seconds=None):
+    """
+    Linha de resumo de uma compressão: bytes antes e depois e tipos de
+    página, a partir do dict acumulado pelo renderer.
+    """
+    before, after = stats["bytes_in"], stats["bytes_out"]
+    change = after / before - 1 if before else 0
+    kinds = ", ".join(f"{n} {kind}" for kind, n in sorted(stats["kinds"].items()))
+    elapsed = f" em {seconds:.1f}s" if seconds is not None else ""
+    return (f"{before / 1024 / 1024:.1f} MB -> {after / 1024 / 1024:.1f} MB ({change:+.0%}){elapsed}; "
+            f"páginas: {kinds}")
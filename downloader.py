@@ -0,0 +1,169 @@
+import os
+import shutil
+import threading
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from urllib.parse import urlsplit
+
+from metrics import bind, count, timed
+
+
+def create_session(workers=8, retries=3, backoff=0.5):
+    """
+    Cria uma requests.Session com pool de conexões dimensionado para
+    `workers` threads e retentativas com backoff exponencial para erros
+    de rede e respostas 429/5xx do CDN.
+    """
+    import requests
+    from requests.adapters import HTTPAdapter
+    from urllib3.util.retry import Retry
+
+    retry = Retry(
+        total=retries,
+        backoff_factor=backoff,
+        status_forcelist=(429, 500, 502, 503, 504),
+        allowed_methods=frozenset(["GET", "HEAD"]),
+        respect_retry_after_header=True,
+    )
+    adapter = HTTPAdapter(pool_connections=workers, pool_maxsize=workers, max_retries=retry)
+    session = requests.Session()
+    session.mount("http://", adapter)
+    session.mount("https://", adapter)
+    session.headers["User-Agent"] = "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36"
+    return session
+
+
+class PageDownloader:
+    """
+    Baixa as imagens das páginas em paralelo, reaproveitando conexões de uma
+    sessão compartilhada e limitando quantas requisições simultâneas vão para
+    o mesmo host. Os resultados voltam na ordem das URLs de entrada, então a
+    numeração das páginas não depende da ordem em que os downloads terminam.
+    """
+
+    def __init__(self, workers=8, per_host=4, retries=3, backoff=0.5, timeout=15, session=None, cache=None):
+        self.cache = cache
+        self.workers = max(1, workers)
+        self.per_host = max(1, per_host)
+        self.timeout = timeout
+        self.session = session or create_session(self.workers, retries, backoff)
+        self._host_limits = {}
+        self._lock = threading.Lock()
+
+    def _host_semaphore(self, url):
+        host = urlsplit(url).netloc
+        with self._lock:
+            if host not in self._host_limits:
+                self._host_limits[host] = threading.BoundedSemaphore(self.per_host)
+            return self._host_limits[host]
+
+    def fetch(self, url):
+        """
+        Baixa uma URL respeitando o limite por host e retorna os bytes.
+        """
+        with self._host_semaphore(url):
+            resp = self.session.get(url, timeout=self.timeout)
+            resp.raise_for_status()
+            return resp.content
+
+    def _fetch_cached(self, url):
+        """
+        Retorna o caminho do blob de `url` no cache, revalidando com
+        If-None-Match/If-Modified-Since quando o servidor fornece
+        validadores; sem validadores, o conteúdo em cache é usado direto.
+        """
+        cached = self.cache.get(url, count=False)
+        headers = self.cache.validators(url) if cached else {}
+        if cached and not headers:
+            self.cache.count(hit=True)
+            return cached
+        with self._host_semaphore(url):
+            resp = self.session.get(url, timeout=self.timeout, headers=headers)
+        if resp.status_code == 304:
+            self.cache.count(hit=True, revalidated=True)
+            return cached
+        resp.raise_for_status()
+        self.cache.count(hit=False)
+        return self.cache.put(url, resp.content,
+                              etag=resp.headers.get("ETag"),
+                              last_modified=resp.headers.get("Last-Modified"))
+
+    @timed("download", detail=True)
+    def _download_one(self, url, file_path):
+        if self.cache is not None:
+            shutil.copyfile(self._fetch_cached(url), file_path)
+            return file_path
+        data = self.fetch(url)
+        with open(file_path, "wb") as f:
+            f.write(data)
+        return file_path
+
+    def iter_download_pages(self, pages, output_folder, name_format="page_{:03}.jpg"):
+        """
+        Baixa as páginas `pages`, uma lista de tuplas (índice, url), para
+        `output_folder`, nomeando cada arquivo pelo índice, e gera tuplas
+        (índice, caminho) à medida que cada download termina (fora de ordem).
+        Páginas que falharem são registradas no log e não são geradas.
+        """
+        os.makedirs(output_folder, exist_ok=True)
+        total = len(pages)
+
+        with ThreadPoolExecutor(max_workers=self.workers) as pool:
+            futures = {}
+            for i, url in pages:
+                file_path = os.path.join(output_folder, name_format.format(i + 1))
+                futures[pool.submit(bind(self._download_one), url, file_path)] = i
+
+            done = 0
+            for future in as_completed(futures):
+                i = futures[future]
+                done += 1
+                try:
+                    file_path = future.result()
+                except Exception as e:
+                    count("download_failures")
+                    print(f"❌ Erro ao baixar página {i+1}: {e}")
+                    continue
+                count("pages_downloaded")
+                count("bytes_downloaded", os.path.getsize(file_path))
+                print(f"✅ Baixada página {i+1} ({done} de {total})")
+                yield i, file_path
+
+    def download_pages(self, pages, output_folder, name_format="page_{:03}.jpg", on_page=None):
+        """
+        Versão bloqueante de `iter_download_pages`. `on_page(índice,
+        caminho)` é chamado na thread de quem chamou a cada página concluída.
+        Retorna um dict índice -> caminho só com as páginas baixadas.
+        """
+        results = {}
+        for i, file_path in self.iter_download_pages(pages, output_folder, name_format):
+            results[i] = file_path
+            if on_page:
+                on_page(i, file_path)
+        return results
+
+    def download(self, urls, output_folder, name_format="page_{:03}.jpg"):
+        """
+        Baixa todas as `urls` para `output_folder` e retorna a lista de
+        caminhos na ordem original. Páginas que falharem mesmo após as
+        retentativas são registradas no log e ficam de fora da lista.
+        """
+        results = self.download_pages(list(enumerate(urls)), output_folder, name_format)
+        return [results[i] for i in sorted(results)]
+
+    def close(self):
+        self.session.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+
+
+def download_images(urls, output_folder, workers=8, per_host=4, retries=3, backoff=0.5, timeout=15):
+    """
+    Atalho para baixar uma lista de URLs com um PageDownloader temporário.
+    """
+    with PageDownloader(workers=workers, per_host=per_host, retries=retries,
+                        backoff=backoff, timeout=timeout) as downloader:
+        return downloader.download(urls, output_folder)
@@ -1,82 +1,21 @@
 import os
-import time
-import requests
-from selenium import webdriver
-from selenium.webdriver.edge.options import Options
-from selenium.webdriver.common.by import By
-from selenium.webdriver.edge.service import Service as EdgeService
-from webdriver_manager.microsoft import EdgeChromiumDriverManager
-
-def setup_driver():
-    """
-    Cria e retorna uma instância do Edge WebDriver com múltiplos fallbacks
-    para máxima compatibilidade em diferentes sistemas.
-    """
-    options = Options()
-    options.add_argument("--headless")
-    options.add_argument("--disable-gpu")
-    options.add_argument("--no-sandbox")
-    options.add_argument("--disable-dev-shm-usage")
-    options.add_argument("--disable-web-security")
-    options.add_argument("--allow-running-insecure-content")
-    options.add_argument("--disable-features=VizDisplayCompositor")
-    options.add_argument("--user-agent=Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36")
-    
-    print("🔧 Inicializando EdgeDriver...")
-    
-    # Múltiplos métodos de fallback
-    methods = [
-        ("WebDriver Manager (fresh)", lambda: EdgeService(EdgeChromiumDriverManager().install())),
-        ("Driver do sistema", lambda: EdgeService()),
-        ("Chrome como fallback", lambda: setup_chrome_fallback()),
-    ]
-    
-    for method_name, method_func in methods:
-        try:
-            print(f"🔄 Tentando: {method_name}")
-            service = method_func()
-            driver = webdriver.Edge(service=service, options=options)
-            driver.set_window_size(1920, 2000)
-            print(f"✅ EdgeDriver inicializado com sucesso via {method_name}")
-            return driver
-        except Exception as e:
-            print(f"❌ Falhou {method_name}: {str(e)[:100]}...")
-            continue
-    
-    raise RuntimeError("❌ Todos os métodos de inicialização falharam")
-
-def setup_chrome_fallback():
-    """
-    Fallback para Chrome se Edge não funcionar.
-    """
-    from selenium.webdriver.chrome.options import Options as ChromeOptions
-    from selenium.webdriver.chrome.service import Service as ChromeService
-    from webdriver_manager.chrome import ChromeDriverManager
-    
-    print("🔄 Tentando Chrome como fallback...")
-    chrome_options = ChromeOptions()
-    chrome_options.add_argument("--headless")
-    chrome_options.add_argument("--disable-gpu")
-    chrome_options.add_argument("--no-sandbox")
-    chrome_options.add_argument("--disable-dev-shm-usage")
-    
-    service = ChromeService(ChromeDriverManager().install())
-    driver = webdriver.Chrome(service=service, options=chrome_options)
-    return driver
-
-def scroll_page_smooth(driver, pause=0.2):
-    """
-    Faz scroll gradual até o fim da página para ativar lazy loading.
-    """
-    scroll_height = driver.execute_script("return document.body.scrollHeight")
-    current = 0
-    while current < scroll_height:
-        driver.execute_script(f"window.scrollTo(0, {current});")
-        current += 500
-        time.sleep(pause)
-        scroll_height = driver.execute_script("return document.body.scrollHeight")
-    driver.execute_script("window.scrollTo(0, document.body.scrollHeight);")
-    time.sleep(1)
+from contextlib import nullcontext
+from netcapture import NetworkRecorder
+from browser import setup_driver
+from blocking import apply_block_profile
+from lazyload import wait_for_pages, PAGE_SELECTOR
+from downloader import PageDownloader
+from manifest import Manifest
+from cache import default_cache
+from metrics import timed, span, count
+
+@timed("scroll")
+def scroll_page_smooth(driver, timeout=180):
+    """
+    Ativa o lazy loading de todas as páginas do Scribd e espera até que
+    cada uma tenha seu conteúdo carregado (ver lazyload.wait_for_pages).
+    """
+    return wait_for_pages(driver, timeout=timeout)
 
 def hardcore_block(driver):
     """
@@ -87,65 +26,216 @@ def hardcore_block(driver):
         document.querySelectorAll('script').forEach(e => e.remove());
         document.querySelectorAll('.overlay, .modal, .paywall, .popup, .login-prompt, .container-overlay').forEach(e => e.remove());
     """)
-    time.sleep(0.5)
 
-def extract_images(url, output_folder):
+def collect_image_urls(driver, page_range=None):
     """
-    Extrai todas as imagens <img.absimg> de um documento de scan no Scribd.
-    Salva em JPG na pasta especificada e retorna os caminhos.
+    Imagens <img.absimg> das páginas já carregadas, como dict índice ->
+    URL com o índice real do container de cada página (0-based). Com
+    `page_range` (início, fim), só dessas páginas. Páginas sem imagem
+    ficam com None, para serem cobradas como falha no download.
+    """
+    total = driver.execute_script("return document.querySelectorAll(arguments[0]).length", PAGE_SELECTOR)
+    start, end = page_range or (0, None)
+    indices = list(range(total)[start:end])
+    img_urls = collect_page_images(driver, indices)
+    return {i: img_urls.get(i) for i in indices}
+
+
+def collect_page_images(driver, pages):
+    """
+    Imagem de cada página da lista `pages` (índices 0-based), como dict
+    índice -> URL. Páginas sem imagem carregada ficam de fora.
+    """
+    srcs = driver.execute_script("""
+        const pages = Array.from(document.querySelectorAll(arguments[0]));
+        return arguments[1].map(i => {
+            const img = pages[i] && pages[i].querySelector('img.absimg');
+            return img ? img.src : null;
+        });
+    """, PAGE_SELECTOR, list(pages))
+    return {i: src for i, src in zip(pages, srcs) if src and src.startswith("http")}
+
+
+def iter_pages_resumable(url, img_urls, output_folder, workers=8, per_host=4, max_attempts=3, cache=None,
+                         recorder=None, refresh=False, complete=None, manifest=None):
+    """
+    Baixa `img_urls` para `output_folder` usando o manifest.json da pasta
+    para retomar execuções anteriores, gerando tuplas (índice, caminho) à
+    medida que cada página fica pronta (fora de ordem). Lança RuntimeError
+    se ainda faltarem páginas após `max_attempts` rodadas.
+
+    `img_urls` é a lista das imagens de todas as páginas, em ordem, ou um
+    dict índice -> URL (ver collect_image_urls e collect_page_images).
+    Páginas com URL None (sem imagem carregada) só são aceitas se o
+    manifesto já as tiver; as demais entram no RuntimeError. `complete`
+    diz se `img_urls` cobre o documento inteiro, para associá-lo no cache
+    (por padrão, só quando `img_urls` é uma lista). `manifest` permite
+    usar um Manifest já aberto (ex.: o da DocumentSession, compartilhado
+    com a nova captura de páginas suspeitas); ele não é salvo aqui.
+    Com `refresh`, essas páginas são baixadas de novo mesmo que o
+    manifesto ou o cache já as tenham.
+
+    Com um `recorder` (netcapture.NetworkRecorder), as imagens que o
+    navegador já recebeu são gravadas direto do buffer de rede dele; só o
+    que faltar é baixado de novo.
     """
-    driver = setup_driver()
+    if complete is None:
+        complete = not isinstance(img_urls, dict)
+    urls = img_urls if isinstance(img_urls, dict) else dict(enumerate(img_urls))
+    wanted = sorted(urls)
+    total = len(wanted)
+    count("pages_total", total)
+    print(f"🖼️ Encontradas {total} imagens. Baixando com {workers} conexões...")
+
+    if cache is None:
+        cache = default_cache()
+    with (nullcontext(manifest) if manifest else Manifest(output_folder, url)) as manifest, \
+            PageDownloader(workers=workers, per_host=per_host,
+                           cache=None if refresh else cache or None) as downloader:
+        if refresh:
+            manifest.forget(wanted)
+        # Quem consome pode apagar cada arquivo logo após usá-lo, por isso o
+        # que já foi entregue é controlado aqui e não pelo disco
+        delivered = set()
+        for i in wanted:
+            if manifest.is_valid(i, urls[i]):
+                delivered.add(i)
+                yield i, manifest.path_of(i)
+
+        if recorder is not None and recorder.enabled:
+            recorder.poll()
+            from_network = 0
+            for i in wanted:
+                if i in delivered or not urls[i]:
+                    continue
+                data = recorder.body(urls[i])
+                if not data:
+                    continue
+                path = os.path.join(output_folder, f"page_{i+1:03}.jpg")
+                with open(path, "wb") as f:
+                    f.write(data)
+                if cache:
+                    cache.put(urls[i], data)
+                manifest.record(i, path, urls[i])
+                delivered.add(i)
+                from_network += 1
+                count("pages_from_network")
+                count("bytes_from_network", len(data))
+                yield i, path
+            print(f"📡 {from_network} de {total} páginas gravadas direto da rede do navegador")
+
+        for attempt in range(1, max_attempts + 1):
+            missing = [i for i in wanted if i not in delivered and urls[i]]
+            if not missing:
+                break
+            if len(missing) < total:
+                print(f"🔁 Tentativa {attempt}: faltam {len(missing)} de {total} páginas")
+            if attempt > 1:
+                count("download_retries", len(missing))
+            for i, path in downloader.iter_download_pages([(i, urls[i]) for i in missing], output_folder):
+                manifest.record(i, path, urls[i])
+                delivered.add(i)
+                yield i, path
+
+        missing = [i for i in wanted if i not in delivered]
+        sem_imagem = [i + 1 for i in missing if not urls[i]]
+        if sem_imagem:
+            print(f"⚠️ Páginas sem imagem carregada: {', '.join(map(str, sem_imagem))}")
+        if missing:
+            faltando = ", ".join(str(i + 1) for i in missing)
+            raise RuntimeError(f"{len(missing)} páginas não puderam ser baixadas: {faltando}")
+
+        if cache and complete:
+            cache.link_document(url, [urls[i] for i in wanted])
+            print(f"🗄️ Cache: {cache.stats()}")
+
+
+def download_pages_resumable(url, img_urls, output_folder, **kwargs):
+    """
+    Versão bloqueante de `iter_pages_resumable`: retorna os caminhos em ordem.
+    """
+    pages = dict(iter_pages_resumable(url, img_urls, output_folder, **kwargs))
+    return [pages[i] for i in sorted(pages)]
+
+
+def iter_images(url, output_folder, driver=None, workers=8, per_host=4, max_attempts=3, cache=None,
+                recorder=None, from_network=True, pages=None, refresh=False, manifest=None):
+    """
+    Como `extract_images`, mas gera tuplas (índice, caminho) à medida que
+    cada página é baixada, para que o PDF possa ser montado em paralelo.
+    `manifest` é repassado a `iter_pages_resumable`.
+    """
+    own_driver = driver is None
+    if own_driver:
+        driver = setup_driver()
     try:
-        print(f"🌐 Tentando acessar: {url}")
-        driver.set_page_load_timeout(30)
-        driver.get(url)
-        print("✅ Página carregada com sucesso")
-
-        print("🔒 Limpando bloqueios e modais...")
-        hardcore_block(driver)
-
-        print("📜 Fazendo scroll para carregar todas as páginas...")
-        scroll_page_smooth(driver)
-
-        driver.execute_script("""
-            document.querySelectorAll('div.outer_page_container > div[id^="outer_page_"]').forEach(c => c.scrollIntoView());
-        """)
-        time.sleep(1)
-
-        document_container = driver.find_element(By.ID, "document_container")
-        pages = document_container.find_elements(By.CSS_SELECTOR, "div.outer_page_container > div[id^='outer_page_']")
-
-        img_urls = []
-        for page_div in pages:
-            imgs = page_div.find_elements(By.CSS_SELECTOR, "img.absimg")
-            for img in imgs:
-                src = img.get_attribute('src')
-                if src and src.startswith("http"):
-                    img_urls.append(src)
-
-        os.makedirs(output_folder, exist_ok=True)
-
-        images = []
-        total = len(img_urls)
-        print(f"🖼️ Encontradas {total} imagens. Baixando...")
-        for i, img_url in enumerate(img_urls):
-            try:
-                resp = requests.get(img_url, timeout=15)
-                resp.raise_for_status()
-                file_path = os.path.join(output_folder, f"page_{i+1:03}.jpg")
-                with open(file_path, "wb") as f:
-                    f.write(resp.content)
-                images.append(file_path)
-                print(f"✅ Baixada página {i+1} de {total}")
-            except Exception as e:
-                print(f"❌ Erro ao baixar página {i+1}: {e}")
-
-        return images
-        
+        if own_driver:
+            if from_network:
+                recorder = NetworkRecorder(driver).start()
+            apply_block_profile(driver, "scan")
+            print(f"🌐 Tentando acessar: {url}")
+            driver.set_page_load_timeout(30)
+            with span("page_load"):
+                driver.get(url)
+            print("✅ Página carregada com sucesso")
+
+            print("🔒 Limpando bloqueios e modais...")
+            hardcore_block(driver)
+
+            if pages is not None:
+                wait_for_pages(driver, pages=pages)
+            else:
+                print("📜 Fazendo scroll para carregar todas as páginas...")
+                scroll_page_smooth(driver)
+
+        if pages is None:
+            img_urls = collect_image_urls(driver)
+        else:
+            img_urls = collect_page_images(driver, pages)
+            img_urls = {i: img_urls.get(i) for i in pages}
+        yield from iter_pages_resumable(url, img_urls, output_folder, workers=workers, per_host=per_host,
+                                        max_attempts=max_attempts, cache=cache,
+                                        recorder=recorder if from_network else None, refresh=refresh,
+                                        complete=pages is None, manifest=manifest)
+
     except Exception as e:
         print(f"❌ Erro detalhado: {type(e).__name__}: {str(e)}")
         import traceback
         traceback.print_exc()
-        return []
+        raise
     finally:
-        driver.quit()
+        if own_driver:
+            driver.quit()
+
+
+def extract_images(url, output_folder, driver=None, workers=8, per_host=4, max_attempts=3, cache=None,
+                   recorder=None, from_network=True, pages=None, refresh=False):
+    """
+    Extrai todas as imagens <img.absimg> de um documento de scan no Scribd.
+    Salva em JPG na pasta especificada e retorna os caminhos.
+    Os downloads são feitos em paralelo por `workers` threads, com no
+    máximo `per_host` conexões simultâneas por host.
+
+    O progresso fica em manifest.json na pasta de saída: uma nova execução
+    só baixa as páginas ausentes ou corrompidas. Páginas que continuarem
+    faltando após `max_attempts` rodadas geram RuntimeError.
+
+    As imagens passam pelo cache de páginas (`cache`, por padrão o
+    cache.default_cache(); `False` desativa).
+
+    Com `from_network`, as imagens que o navegador já carregou são lidas
+    do buffer de rede dele (CDP Network.getResponseBody) em vez de serem
+    baixadas de novo; com um `driver` externo, é preciso passar o
+    `recorder` iniciado antes da navegação.
+
+    Com `pages` (lista de índices 0-based, ver pagerange.parse_pages), só
+    essas páginas são carregadas e baixadas; `refresh` as baixa de novo
+    mesmo que já estejam no manifesto ou no cache.
+
+    Se `driver` for informado (ex.: vindo de uma DocumentSession), a página
+    já deve estar carregada e rolada; o driver não é fechado ao final.
+    """
+    paths = dict(iter_images(url, output_folder, driver=driver, workers=workers, per_host=per_host,
+                             max_attempts=max_attempts, cache=cache, recorder=recorder,
+                             from_network=from_network, pages=pages, refresh=refresh))
+    return [paths[i] for i in sorted(paths)]
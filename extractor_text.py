@@ -1,92 +1,24 @@
+import io
 import os
-import time
+import json
 import base64
-import requests
-from selenium import webdriver
-from selenium.webdriver.edge.options import Options
-from selenium.webdriver.common.by import By
-from selenium.webdriver.edge.service import Service as EdgeService
-from webdriver_manager.microsoft import EdgeChromiumDriverManager
-
-
-def setup_driver():
+from contextlib import nullcontext
+from browser import setup_driver
+from blocking import apply_block_profile
+from lazyload import wait_for_pages, PAGE_SELECTOR
+from manifest import Manifest
+from cache import default_cache
+from metrics import timed, span, count
+from tiling import MAX_TILE_PIXELS, needs_tiling, capture_page_tiled, scale_for_dpi
+
+
+@timed("scroll")
+def scroll_page_smooth(driver, timeout=180):
     """
-    Cria e retorna uma instância do Edge WebDriver com múltiplos fallbacks
-    para máxima compatibilidade em diferentes sistemas.
+    Ativa o lazy loading de todas as páginas do Scribd e espera até que
+    cada uma tenha seu conteúdo carregado (ver lazyload.wait_for_pages).
     """
-    options = Options()
-    options.add_argument("--headless")
-    options.add_argument("--disable-gpu")
-    options.add_argument("--no-sandbox")
-    options.add_argument("--disable-dev-shm-usage")
-    options.add_argument("--disable-web-security")
-    options.add_argument("--allow-running-insecure-content")
-    options.add_argument("--disable-features=VizDisplayCompositor")
-    options.add_argument("--user-agent=Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36")
-    
-    print("🔧 Inicializando EdgeDriver...")
-    
-    # Múltiplos métodos de fallback
-    methods = [
-        ("WebDriver Manager (cache)", lambda: EdgeService(EdgeChromiumDriverManager(cache_valid_range=30).install())),
-        ("WebDriver Manager (fresh)", lambda: EdgeService(EdgeChromiumDriverManager().install())),
-        ("Driver do sistema", lambda: EdgeService()),
-        ("Chrome como fallback", lambda: setup_chrome_fallback()),
-    ]
-    
-    for method_name, method_func in methods:
-        try:
-            print(f"🔄 Tentando: {method_name}")
-            service = method_func()
-            driver = webdriver.Edge(service=service, options=options)
-            driver.set_window_size(1920, 2000)
-            print(f"✅ EdgeDriver inicializado com sucesso via {method_name}")
-            return driver
-        except Exception as e:
-            print(f"❌ Falhou {method_name}: {str(e)[:100]}...")
-            continue
-    
-    raise RuntimeError("❌ Todos os métodos de inicialização falharam")
-
-
-def setup_chrome_fallback():
-    """
-    Fallback para Chrome se Edge não funcionar.
-    """
-    from selenium.webdriver.chrome.options import Options as ChromeOptions
-    from selenium.webdriver.chrome.service import Service as ChromeService
-    from webdriver_manager.chrome import ChromeDriverManager
-    
-    print("🔄 Tentando Chrome como fallback...")
-    chrome_options = ChromeOptions()
-    chrome_options.add_argument("--headless")
-    chrome_options.add_argument("--disable-gpu")
-    chrome_options.add_argument("--no-sandbox")
-    chrome_options.add_argument("--disable-dev-shm-usage")
-    
-    service = ChromeService(ChromeDriverManager().install())
-    driver = webdriver.Chrome(service=service, options=chrome_options)
-    return driver
-
-
-def scroll_page_smooth(driver, pause=0.2):
-    """
-    Faz um scroll suave do topo ao fim da página, pulando 500px a cada passo
-    e aguardando `pause` segundos entre cada salto. Isso ativa o lazy loading
-    de todas as páginas do Scribd.
-    """
-    scroll_height = driver.execute_script("return document.body.scrollHeight")
-    current = 0
-
-    while current < scroll_height:
-        driver.execute_script(f"window.scrollTo(0, {current});")
-        current += 500
-        time.sleep(pause)
-        scroll_height = driver.execute_script("return document.body.scrollHeight")
-
-    # Garante que role até o fim
-    driver.execute_script("window.scrollTo(0, document.body.scrollHeight);")
-    time.sleep(1)  # aguarda um instante para carregar o final
+    return wait_for_pages(driver, timeout=timeout)
 
 
 def hardcore_block(driver):
@@ -99,7 +31,25 @@ def hardcore_block(driver):
         document.querySelectorAll('script').forEach(e => e.remove());
         document.querySelectorAll('.overlay, .modal, .paywall, .popup, .login-prompt, .container-overlay').forEach(e => e.remove());
     """)
-    time.sleep(0.5)  # aguarda JS residual ser interrompido
+
+
+def classify_document(driver):
+    """
+    Classifica o documento já carregado no driver a partir do DOM:
+    "text" se houver div.text_layer, "scan" se houver img.absimg,
+    "unknown" caso contrário.
+    """
+    has_text = driver.execute_script("return document.querySelectorAll('div.text_layer').length")
+    has_images = driver.execute_script("return document.querySelectorAll('img.absimg').length")
+
+    print(f"🔍 Elementos encontrados: {has_text} text_layer, {has_images} imagens")
+
+    if has_text > 0:
+        return "text"
+    elif has_images > 0:
+        return "scan"
+    else:
+        return "unknown"
 
 
 def detect_document_type(url):
@@ -109,24 +59,15 @@ def detect_document_type(url):
         
         # Adiciona timeout específico
         driver.set_page_load_timeout(30)
-        driver.get(url)
+        apply_block_profile(driver, "common")
+        with span("page_load"):
+            driver.get(url)
         print("✅ Página carregada com sucesso")
         
         hardcore_block(driver)
-        scroll_page_smooth(driver, pause=0.2)
-        time.sleep(1)
-        
-        has_text = driver.execute_script("return document.querySelectorAll('div.text_layer').length")
-        has_images = driver.execute_script("return document.querySelectorAll('img.absimg').length")
-        
-        print(f"🔍 Elementos encontrados: {has_text} text_layer, {has_images} imagens")
-        
-        if has_text > 0:
-            return "text"
-        elif has_images > 0:
-            return "scan"
-        else:
-            return "unknown"
+        scroll_page_smooth(driver)
+
+        return classify_document(driver)
             
     except Exception as e:
         print(f"❌ Erro detalhado: {type(e).__name__}: {str(e)}")
@@ -142,18 +83,15 @@ def extract_images(url, output_folder):
     Extrai as imagens (<img class="absimg">) de cada página do Scribd, salva em JPG
     dentro de output_folder e retorna a lista de caminhos completos desses arquivos.
     """
+    import requests
+    from selenium.webdriver.common.by import By
+
     driver = setup_driver()
     driver.get(url)
 
     hardcore_block(driver)
     scroll_page_smooth(driver)
 
-    # Força cada página a ficar visível
-    driver.execute_script("""
-        document.querySelectorAll('div.outer_page_container > div[id^="outer_page_"]').forEach(c => c.scrollIntoView());
-    """)
-    time.sleep(1)
-
     document_container = driver.find_element(By.ID, "document_container")
     pages = document_container.find_elements(By.CSS_SELECTOR, "div.outer_page_container > div[id^='outer_page_']")
 
@@ -183,17 +121,208 @@ def extract_images(url, output_folder):
     return images
 
 
-def extract_text(url):
+# Formatos aceitos pelo Page.captureScreenshot -> extensão do arquivo
+CAPTURE_FORMATS = {"png": "png", "jpeg": "jpg", "webp": "webp"}
+
+# Altura máxima (em pixels do dispositivo) de uma captura em lote
+MAX_CAPTURE_HEIGHT = 16000
+
+
+def _batch_pages(boxes, batch_size, scale, indices=None):
+    """
+    Agrupa índices de páginas consecutivas em lotes de até `batch_size`,
+    sem ultrapassar MAX_CAPTURE_HEIGHT nem tiling.MAX_TILE_PIXELS na
+    captura combinada. Se `indices` for informado, só essas páginas entram
+    nos lotes.
+    """
+    batch = []
+    top = 0
+    width = 0
+    for i in (range(len(boxes)) if indices is None else indices):
+        box = boxes[i]
+        height = (box["y"] + box["height"] - top) * scale
+        if batch and (len(batch) >= batch_size or i != batch[-1] + 1 or height > MAX_CAPTURE_HEIGHT
+                      or height * max(width, box["width"]) * scale > MAX_TILE_PIXELS):
+            yield batch
+            batch = []
+        if not batch:
+            top = box["y"]
+            width = 0
+        width = max(width, box["width"])
+        batch.append(i)
+    if batch:
+        yield batch
+
+
+def capture_pages(driver, boxes, batch, capture_format="png", quality=90, scale=1):
+    """
+    Captura um lote de páginas com um único Page.captureScreenshot usando
+    captureBeyondViewport (sem scroll) e recorta cada página localmente.
+    Gera tuplas (índice, bytes da imagem) no formato pedido.
+    """
+    from PIL import Image
+
+    left = min(boxes[i]["x"] for i in batch)
+    top = min(boxes[i]["y"] for i in batch)
+    right = max(boxes[i]["x"] + boxes[i]["width"] for i in batch)
+    bottom = max(boxes[i]["y"] + boxes[i]["height"] for i in batch)
+
+    params = {
+        "format": capture_format,
+        "fromSurface": True,
+        "captureBeyondViewport": True,
+        "clip": {"x": left, "y": top, "width": right - left, "height": bottom - top, "scale": scale},
+    }
+    if capture_format != "png":
+        params["quality"] = quality
+    result = driver.execute_cdp_cmd("Page.captureScreenshot", params)
+    data = base64.b64decode(result["data"])
+
+    if len(batch) == 1:
+        # Uma página só: o arquivo do CDP já é a página, sem recodificar
+        yield batch[0], data
+        return
+
+    with Image.open(io.BytesIO(data)) as strip:
+        strip.load()
+        for i in batch:
+            box = boxes[i]
+            crop = strip.crop((
+                round((box["x"] - left) * scale),
+                round((box["y"] - top) * scale),
+                round((box["x"] + box["width"] - left) * scale),
+                round((box["y"] + box["height"] - top) * scale),
+            ))
+            buffer = io.BytesIO()
+            if capture_format == "png":
+                crop.save(buffer, format="PNG")
+            else:
+                crop.save(buffer, format=capture_format.upper(), quality=quality)
+            yield i, buffer.getvalue()
+
+
+# Coleta os trechos de texto (posição e tamanho de fonte) do div.text_layer
+# das páginas pedidas, em pixels CSS relativos ao canto da página.
+TEXT_RUNS_SCRIPT = """
+    const pages = Array.from(document.querySelectorAll(arguments[0]));
+    return arguments[1].map(i => {
+        const page = pages[i];
+        const box = page.getBoundingClientRect();
+        const runs = [];
+        page.querySelectorAll('div.text_layer').forEach(layer => {
+            const walker = document.createTreeWalker(layer, NodeFilter.SHOW_TEXT);
+            const range = document.createRange();
+            let node;
+            while ((node = walker.nextNode())) {
+                const text = node.textContent.replace(/\\s+/g, ' ');
+                if (!text.trim()) continue;
+                range.selectNodeContents(node);
+                const r = range.getBoundingClientRect();
+                if (!r.width || !r.height) continue;
+                const style = window.getComputedStyle(node.parentElement);
+                runs.push({
+                    text: text,
+                    x: r.left - box.left,
+                    y: r.top - box.top,
+                    width: r.width,
+                    height: r.height,
+                    size: parseFloat(style.fontSize) || r.height
+                });
+            }
+        });
+        return {width: box.width, height: box.height, runs: runs};
+    });
+"""
+
+
+def text_layer_path(image_path):
+    """
+    Caminho do JSON com a camada de texto que acompanha uma página capturada.
+    """
+    return os.path.splitext(image_path)[0] + ".json"
+
+
+def _save_text_layers(driver, indices, paths):
+    layers = driver.execute_script(TEXT_RUNS_SCRIPT, PAGE_SELECTOR, indices)
+    for path, layer in zip(paths, layers):
+        with open(text_layer_path(path), "w", encoding="utf-8") as f:
+            json.dump(layer, f, ensure_ascii=False)
+
+
+def capture_settings(capture_format="png", quality=90, scale=1, collect_text=True, dpi=None):
+    """
+    Configurações de captura gravadas no manifesto (ver manifest.Manifest):
+    páginas capturadas com outras configurações são capturadas de novo.
+    """
+    return {
+        "format": capture_format,
+        "quality": quality if capture_format != "png" else None,
+        "scale": scale_for_dpi(dpi) if dpi else scale,
+        "text": collect_text,
+    }
+
+
+def page_cache_key(url, i, capture_format="png", scale=1):
+    """
+    Chave do screenshot da página `i` (0-based) no cache de páginas; a da
+    camada de texto é a mesma com "&text" no fim.
+    """
+    return f"{url}#page={i+1}&format={capture_format}&scale={scale}"
+
+
+def iter_text_pages(url, driver=None, capture_format="png", quality=90, scale=1, batch_size=4,
+                    collect_text=True, max_attempts=3, cache=None, output_folder="output",
+                    page_range=None, manifest=None, pages=None, refresh=False, dpi=None):
     """
     Captura screenshots das páginas de livros com texto renderizado no Scribd,
     usando CDP para "clipar" exatamente a bounding‐box de cada elemento.
-    Retorna lista de caminhos dos PNGs gerados.
+    Várias páginas são capturadas de uma vez (`batch_size`) além da área
+    visível e recortadas localmente. `capture_format` pode ser "png",
+    "jpeg" ou "webp" (`quality` vale para os dois últimos) e `scale` é o
+    fator de escala do dispositivo (ou `dpi`, em pixels por polegada CSS;
+    96 equivale à escala 1). Páginas maiores que a área visível ou que
+    passariam de tiling.MAX_TILE_PIXELS são capturadas em blocos e
+    costuradas direto num PNG (ver tiling.capture_page_tiled), o que
+    mantém a memória limitada em escalas altas. Com `collect_text`, o texto de cada
+    página é lido do DOM e salvo num JSON ao lado da imagem (ver
+    renderer.save_dom_text_to_pdf). Gera tuplas (índice, caminho) à medida
+    que cada página fica pronta, para que o PDF possa ser montado em paralelo.
+
+    As páginas são salvas em `output_folder`. O progresso fica em
+    manifest.json nessa pasta: uma nova execução só captura as páginas
+    ausentes ou corrompidas. Páginas que continuarem faltando após
+    `max_attempts` rodadas geram RuntimeError.
+
+    Screenshots e camadas de texto passam pelo cache de páginas (`cache`,
+    por padrão o cache.default_cache(); `False` desativa).
+
+    Com `page_range` (início, fim) em índices 0-based, fim exclusivo, só
+    essas páginas são capturadas e geradas; `manifest` permite que
+    várias chamadas em paralelo compartilhem o mesmo Manifest (criado com
+    as mesmas `capture_settings`). Com `pages`
+    (lista de índices 0-based, ver pagerange.parse_pages), só as páginas
+    da lista são carregadas e capturadas. `refresh` ignora o que o
+    manifesto e o cache já têm dessas páginas e as captura de novo.
+
+    Se `driver` for informado (ex.: vindo de uma DocumentSession), a página
+    já deve estar carregada e rolada; o driver não é fechado ao final.
     """
-    driver = setup_driver()
-    driver.get(url)
+    from selenium.webdriver.common.by import By
 
-    hardcore_block(driver)
-    scroll_page_smooth(driver, pause=0.2)
+    if dpi:
+        scale = scale_for_dpi(dpi)
+    own_driver = driver is None
+    if own_driver:
+        driver = setup_driver()
+        apply_block_profile(driver, "text")
+        with span("page_load"):
+            driver.get(url)
+
+        hardcore_block(driver)
+        if pages is not None:
+            wait_for_pages(driver, pages=pages)
+        else:
+            scroll_page_smooth(driver)
 
     # Remove banners, headers e elementos fixos incômodos
     driver.execute_script("""
@@ -211,72 +340,260 @@ def extract_text(url):
             }
         });
     """)
-    time.sleep(0.5)
-
-    # Garante que cada página esteja visível para lazy load
-    driver.execute_script("""
-        document.querySelectorAll('div.outer_page_container > div[id^="outer_page_"]').forEach(c => c.scrollIntoView());
-    """)
-    time.sleep(0.5)
 
     document_container = driver.find_element(By.ID, "document_container")
-    pages = document_container.find_elements(
+    page_divs = document_container.find_elements(
         By.CSS_SELECTOR,
         "div.outer_page_container > div[id^='outer_page_']"
     )
 
-    os.makedirs("output", exist_ok=True)
-    screenshots = []
-    total = len(pages)
+    os.makedirs(output_folder, exist_ok=True)
+    total = len(page_divs)
+    ext = CAPTURE_FORMATS[capture_format]
     print(f"📄 Documento de texto com {total} páginas. Salvando screenshots via CDP...")
 
-    for i, page_div in enumerate(pages):
-        try:
-            # 1) Medir a bounding‐box: x, y, width, height (pixels reais)
-            bbox = page_div.rect
-            x = int(bbox['x'])
-            y = int(bbox['y'])
-            width = int(bbox['width'])
-            height = int(bbox['height'])
-
-            # 2) ScrollIntoView (para garantir que o elemento não esteja parcialmente fora de tela)
-            driver.execute_script("arguments[0].scrollIntoView({block: 'start'});", page_div)
-            time.sleep(0.1)
-
-            # 3) Montar objeto "clip" para CDP, sem margem de zoom (scale = 1)
-            clip = {
-                "x": x,
-                "y": y,
-                "width": width,
-                "height": height,
-                "scale": 1
-            }
+    # Bounding‐boxes de todas as páginas em coordenadas do documento, numa só chamada
+    boxes = driver.execute_script("""
+        return Array.from(document.querySelectorAll(arguments[0])).map(el => {
+            const r = el.getBoundingClientRect();
+            return {x: r.left + window.scrollX, y: r.top + window.scrollY,
+                    width: r.width, height: r.height};
+        });
+    """, PAGE_SELECTOR)
+    viewport = driver.execute_script("return [window.innerWidth, window.innerHeight];")
+
+    if pages is not None:
+        wanted = [i for i in pages if i < total]
+        if len(wanted) < len(pages):
+            print(f"⚠️ O documento só tem {total} páginas; as excedentes foram ignoradas")
+    else:
+        wanted = range(*page_range) if page_range else range(total)
+    count("pages_total", len(wanted))
+
+    # Quem consome pode apagar cada arquivo logo após usá-lo, por isso o
+    # que já foi entregue é controlado aqui e não pelo disco
+    delivered = set()
+
+    def missing_pages():
+        return [i for i in wanted if i not in delivered]
+
+    def already_done(i):
+        # Página sem o JSON da camada de texto também precisa ser refeita
+        return manifest.is_valid(i, boxes[i]) and (
+            not collect_text or os.path.exists(text_layer_path(manifest.path_of(i))))
+
+    def cache_key(i):
+        return page_cache_key(url, i, capture_format, scale)
+
+    def store_page(i, file_path):
+        manifest.record(i, file_path, boxes[i])
+        delivered.add(i)
+        if cache:
+            cache.put_file(cache_key(i), file_path)
+            if collect_text:
+                cache.put_file(cache_key(i) + "&text", text_layer_path(file_path))
+
+    def restore_page(i):
+        file_path = os.path.join(output_folder, f"page_{i+1:03}.{ext}")
+        if not cache.copy_to(cache_key(i), file_path):
+            return False
+        if collect_text and not cache.copy_to(cache_key(i) + "&text", text_layer_path(file_path)):
+            return False
+        manifest.record(i, file_path, boxes[i])
+        delivered.add(i)
+        return True
+
+    if cache is None:
+        cache = default_cache()
 
-            # 4) Invocar Page.captureScreenshot via CDP
-            result = driver.execute_cdp_cmd("Page.captureScreenshot", {
-                "format": "png",
-                "fromSurface": True,
-                "clip": clip
-            })
+    try:
+        settings = capture_settings(capture_format, quality, scale, collect_text)
+        with (nullcontext(manifest) if manifest else Manifest(output_folder, url, settings)) as manifest:
+            if refresh:
+                manifest.forget(wanted)
+            for i in wanted:
+                if already_done(i):
+                    delivered.add(i)
+                    yield i, manifest.path_of(i)
+
+            if cache and not refresh:
+                restored = 0
+                for i in missing_pages():
+                    if restore_page(i):
+                        restored += 1
+                        yield i, manifest.path_of(i)
+                if restored:
+                    count("pages_cached", restored)
+                    print(f"♻️ {restored} páginas recuperadas do cache")
+
+            for attempt in range(1, max_attempts + 1):
+                missing = missing_pages()
+                if not missing:
+                    break
+                if len(missing) < len(wanted):
+                    print(f"🔁 Tentativa {attempt}: faltam {len(missing)} de {len(wanted)} páginas")
+                if attempt > 1:
+                    count("capture_retries", len(missing))
+
+                for i in [i for i in missing if needs_tiling(boxes[i], scale, viewport)]:
+                    try:
+                        file_path = os.path.join(output_folder, f"page_{i+1:03}.png")
+                        with span("capture", detail=True):
+                            size = capture_page_tiled(driver, boxes[i], file_path, scale, viewport)
+                            if collect_text:
+                                _save_text_layers(driver, [i], [file_path])
+                        count("pages_captured")
+                        count("pages_tiled")
+                        count("bytes_captured", size)
+                        print(f"📸 Screenshot página {i+1} de {total} salva (em blocos).")
+                        store_page(i, file_path)
+                        yield i, file_path
+                    except Exception as e:
+                        count("capture_failures")
+                        print(f"❌ Erro na página {i+1} (em blocos): {e}")
+
+                batched = [i for i in missing if not needs_tiling(boxes[i], scale, viewport)]
+                for batch in _batch_pages(boxes, batch_size, scale, batched):
+                    try:
+                        captured = []
+                        with span("capture", detail=True):
+                            for i, data in capture_pages(driver, boxes, batch, capture_format, quality, scale):
+                                file_path = os.path.join(output_folder, f"page_{i+1:03}.{ext}")
+                                with open(file_path, "wb") as f:
+                                    f.write(data)
+                                captured.append((i, file_path))
+                                count("pages_captured")
+                                count("bytes_captured", len(data))
+                                print(f"📸 Screenshot página {i+1} de {total} salva (via CDP).")
+                            if collect_text:
+                                _save_text_layers(driver, [i for i, _ in captured], [path for _, path in captured])
+                        for i, file_path in captured:
+                            store_page(i, file_path)
+                            yield i, file_path
+                    except Exception as e:
+                        count("capture_failures")
+                        print(f"❌ Erro nas páginas {batch[0]+1}-{batch[-1]+1}: {e}")
+
+                # Fallback para screenshot normal nas páginas em que o CDP falhou
+                for i in missing_pages():
+                    try:
+                        file_path = os.path.join(output_folder, f"page_{i+1:03}.png")
+                        page_divs[i].screenshot(file_path)
+                        if collect_text:
+                            _save_text_layers(driver, [i], [file_path])
+                        store_page(i, file_path)
+                        count("pages_captured")
+                        count("capture_fallbacks")
+                        print(f"📸 Screenshot página {i+1} de {total} salva (fallback).")
+                        yield i, file_path
+                    except Exception as e2:
+                        count("capture_failures")
+                        print(f"❌ Fallback também falhou para página {i+1}: {e2}")
+
+            missing = missing_pages()
+            if missing:
+                faltando = ", ".join(str(i + 1) for i in missing)
+                raise RuntimeError(f"{len(missing)} páginas não puderam ser capturadas: {faltando}")
+
+            if cache and page_range is None and pages is None:
+                cache.link_document(url, [cache_key(i) for i in wanted],
+                                    [cache_key(i) + "&text" for i in wanted] if collect_text else None)
+                print(f"🗄️ Cache: {cache.stats()}")
+    finally:
+        if own_driver:
+            driver.quit()
 
-            # 5) Decodificar base64 e salvar como PNG
-            png_data = base64.b64decode(result["data"])
-            file_path = os.path.join("output", f"page_{i+1:03}.png")
-            with open(file_path, "wb") as f:
-                f.write(png_data)
-            screenshots.append(file_path)
-            print(f"📸 Screenshot página {i+1} de {total} salva (via CDP).")
 
-        except Exception as e:
-            print(f"❌ Erro na página {i+1}: {e}")
-            # Fallback para screenshot normal se CDP falhar
-            try:
-                file_path = os.path.join("output", f"page_{i+1:03}.png")
-                page_div.screenshot(file_path)
-                screenshots.append(file_path)
-                print(f"📸 Screenshot página {i+1} de {total} salva (fallback).")
-            except Exception as e2:
-                print(f"❌ Fallback também falhou para página {i+1}: {e2}")
+def extract_text(url, driver=None, **kwargs):
+    """
+    Versão bloqueante de `iter_text_pages` (mesmos parâmetros): captura
+    todas as páginas e retorna a lista de caminhos em ordem.
+    """
+    pages = dict(iter_text_pages(url, driver=driver, **kwargs))
+    return [pages[i] for i in sorted(pages)]
 
-    driver.quit()
-    return screenshots
\ No newline at end of file
+
+def extract_text_pdf(url, output_path, driver=None):
+    """
+    Gera um PDF vetorial de um documento de texto via CDP Page.printToPDF:
+    mantém só os containers de página do #document_container, define um
+    tamanho de página (@page) igual à caixa de cada outer_page_* e grava o
+    resultado direto em `output_path`, sem screenshots nem OCR.
+
+    Se `driver` for informado, a página já deve estar carregada e rolada;
+    o driver não é fechado ao final.
+    """
+    own_driver = driver is None
+    if own_driver:
+        driver = setup_driver()
+        apply_block_profile(driver, "text")
+        with span("page_load"):
+            driver.get(url)
+
+        hardcore_block(driver)
+        scroll_page_smooth(driver)
+
+    try:
+        driver.execute_cdp_cmd("Emulation.setEmulatedMedia", {"media": "screen"})
+        total = driver.execute_script("""
+            const container = document.getElementById('document_container');
+            const pages = Array.from(container.querySelectorAll(arguments[0]));
+
+            // Mede antes de mexer no layout
+            const sizes = pages.map(p => {
+                const r = p.getBoundingClientRect();
+                return [Math.ceil(r.width), Math.ceil(r.height)];
+            });
+
+            // Deixa no body apenas o container do documento
+            document.body.replaceChildren(container);
+            Array.from(container.querySelectorAll('*')).forEach(el => {
+                if (!el.closest('div.outer_page_container') && !el.querySelector('div.outer_page_container')) {
+                    el.remove();
+                }
+            });
+
+            let css = '@page { margin: 0 } '
+                + 'html, body { margin: 0 !important; padding: 0 !important; background: #fff !important; } '
+                + '#document_container { margin: 0 !important; padding: 0 !important; transform: none !important; } '
+                + 'div.outer_page_container { margin: 0 !important; padding: 0 !important; } ';
+            const named = new Set();
+            pages.forEach((p, i) => {
+                const [w, h] = sizes[i];
+                const name = 'scribd_' + w + 'x' + h;
+                if (!named.has(name)) {
+                    named.add(name);
+                    css += '@page ' + name + ' { size: ' + w + 'px ' + h + 'px; margin: 0 } ';
+                }
+                p.style.page = name;
+                p.style.margin = '0';
+                p.style.breakInside = 'avoid';
+                p.style.breakAfter = i < pages.length - 1 ? 'page' : 'auto';
+            });
+
+            const style = document.createElement('style');
+            style.textContent = css;
+            document.head.appendChild(style);
+            return pages.length;
+        """, PAGE_SELECTOR)
+
+        print(f"🖨️ Gerando PDF vetorial com {total} páginas via CDP...")
+        with span("pdf"):
+            result = driver.execute_cdp_cmd("Page.printToPDF", {
+                "printBackground": True,
+                "preferCSSPageSize": True,
+                "marginTop": 0,
+                "marginBottom": 0,
+                "marginLeft": 0,
+                "marginRight": 0,
+            })
+            data = base64.b64decode(result["data"])
+            with open(output_path, "wb") as f:
+                f.write(data)
+        count("pdf_pages", total)
+        count("pdf_bytes", len(data))
+        print(f"📄 PDF vetorial salvo em {output_path}")
+        return output_path
+    finally:
+        if own_driver:
+            driver.quit()
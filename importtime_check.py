@@ -0,0 +1,91 @@
+import os
+import sys
+import argparse
+import subprocess
+
+# Tempo máximo de importação (ms) de cada ponto de entrada. O main inclui o
+# FreeSimpleGUI/tkinter, que é necessário para abrir a janela
+BUDGETS_MS = {"batch": 150, "main": 400}
+
+# Dependências pesadas que só devem ser carregadas quando um trabalho de
+# fato precisa delas (navegador, downloads, PDF, OCR)
+LAZY_MODULES = ["selenium", "webdriver_manager", "requests", "urllib3", "PIL", "pytesseract", "fitz", "pymupdf"]
+
+
+def import_times(module, python=sys.executable):
+    """
+    Importa `module` num processo novo com -X importtime e retorna uma
+    lista de (módulo, self µs, cumulativo µs, profundidade).
+    """
+    here = os.path.dirname(os.path.abspath(__file__))
+    proc = subprocess.run([python, "-X", "importtime", "-c", f"import {module}"],
+                          capture_output=True, text=True, cwd=here)
+    if proc.returncode != 0:
+        error = proc.stderr.strip().splitlines()[-1] if proc.stderr.strip() else "erro desconhecido"
+        raise RuntimeError(f"falha ao importar {module}: {error}")
+
+    entries = []
+    for line in proc.stderr.splitlines():
+        if not line.startswith("import time:") or "|" not in line:
+            continue
+        self_us, cumulative_us, name = line[len("import time:"):].split("|", 2)
+        if not self_us.strip().isdigit():
+            continue  # cabeçalho
+        depth = (len(name) - len(name.lstrip())) // 2
+        entries.append((name.strip(), int(self_us), int(cumulative_us), depth))
+    return entries
+
+
+def check_module(module, budget_ms, runs=3, top=10):
+    """
+    Mede a importação de `module` (melhor de `runs`, para reduzir ruído) e
+    retorna a lista de problemas: orçamento estourado ou dependência
+    pesada carregada na importação.
+    """
+    best = None
+    for _ in range(runs):
+        entries = import_times(module)
+        total = next(cumulative for name, _, cumulative, _ in reversed(entries) if name == module)
+        if best is None or total < best[0]:
+            best = (total, entries)
+    total, entries = best
+
+    print(f"📦 {module}: {total / 1000:.1f} ms (orçamento {budget_ms} ms)")
+    for name, self_us, _, _ in sorted(entries, key=lambda e: e[1], reverse=True)[:top]:
+        print(f"   {self_us / 1000:7.1f} ms  {name}")
+
+    problems = []
+    if total / 1000 > budget_ms:
+        problems.append(f"{module} leva {total / 1000:.1f} ms para importar (orçamento {budget_ms} ms)")
+    loaded = sorted({name.split(".")[0] for name, _, _, _ in entries} & set(LAZY_MODULES))
+    if loaded:
+        problems.append(f"{module} carrega na importação: {', '.join(loaded)}")
+    return problems
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(
+        description="Verifica se a importação dos pontos de entrada cabe no orçamento de tempo (-X importtime).")
+    parser.add_argument("modulos", nargs="*", default=list(BUDGETS_MS),
+                        help="módulos a verificar (padrão: %(default)s)")
+    parser.add_argument("--orcamento", type=float, help="orçamento em ms para todos os módulos informados")
+    parser.add_argument("--repeticoes", type=int, default=3, help="importações por módulo (vale a mais rápida)")
+    args = parser.parse_args(argv)
+
+    problems = []
+    for module in args.modulos:
+        budget = args.orcamento or BUDGETS_MS.get(module, 150)
+        try:
+            problems += check_module(module, budget, runs=args.repeticoes)
+        except RuntimeError as e:
+            problems.append(str(e))
+
+    for problem in problems:
+        print(f"❌ {problem}")
+    if not problems:
+        print("✅ Importações dentro do orçamento")
+    return 1 if problems else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
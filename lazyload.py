@@ -0,0 +1,154 @@
+import time
+
+PAGE_SELECTOR = "div.outer_page_container > div[id^='outer_page_']"
+
+# Tempo que uma página suspeita fica na área visível antes da nova captura,
+# para o lazy loading trocar o placeholder pelo conteúdo
+RELOAD_SETTLE = 1.0
+
+# Roda dentro da página como um único execute_async_script. Em vez de rolar
+# 500px por vez com sleeps fixos, salta direto para a primeira página ainda
+# não carregada e reage a eventos (IntersectionObserver, MutationObserver e
+# 'load' das imagens) até que todas as páginas tenham conteúdo.
+READINESS_SCRIPT = r"""
+const selector = arguments[0];
+const timeoutMs = arguments[1];
+const graceMs = arguments[2];
+const tickMs = arguments[3];
+const rangeStart = arguments[4];
+const rangeEnd = arguments[5];
+const wanted = arguments[6] ? new Set(arguments[6]) : null;
+const done = arguments[arguments.length - 1];
+
+const started = performance.now();
+const seenAt = new Map();
+const visible = new Set();
+let finished = false;
+let jumps = 0;
+
+function pages() {
+    const all = Array.from(document.querySelectorAll(selector));
+    if (wanted) return all.filter((_, i) => wanted.has(i));
+    return rangeEnd < 0 ? all.slice(rangeStart) : all.slice(rangeStart, rangeEnd);
+}
+
+function hasContent(page) {
+    const imgs = page.querySelectorAll('img.absimg');
+    if (imgs.length) {
+        return Array.from(imgs).every(img => img.complete && img.naturalWidth > 0);
+    }
+    return page.querySelector('div.text_layer') !== null;
+}
+
+function isReady(page) {
+    if (hasContent(page)) return true;
+    // Página em branco: já esteve visível por tempo suficiente e nada chegou
+    const since = seenAt.get(page);
+    return since !== undefined && performance.now() - since > graceMs;
+}
+
+const io = new IntersectionObserver(entries => {
+    for (const entry of entries) {
+        if (entry.isIntersecting) {
+            visible.add(entry.target);
+            if (!seenAt.has(entry.target)) seenAt.set(entry.target, performance.now());
+        } else {
+            visible.delete(entry.target);
+        }
+    }
+}, {rootMargin: '200px 0px'});
+
+const observed = new WeakSet();
+function observeAll() {
+    for (const page of pages()) {
+        if (!observed.has(page)) {
+            observed.add(page);
+            io.observe(page);
+        }
+    }
+}
+
+function finish(timedOut) {
+    if (finished) return;
+    finished = true;
+    io.disconnect();
+    mo.disconnect();
+    document.removeEventListener('load', onChange, true);
+    clearInterval(timer);
+    const all = pages();
+    const missing = all.filter(p => !hasContent(p)).map(p => p.id);
+    window.scrollTo(0, document.body.scrollHeight);
+    done({
+        total: all.length,
+        loaded: all.length - missing.length,
+        missing: missing,
+        timed_out: timedOut,
+        jumps: jumps,
+        elapsed_ms: Math.round(performance.now() - started)
+    });
+}
+
+let target = null;
+function step() {
+    if (finished) return;
+    if (performance.now() - started > timeoutMs) return finish(true);
+    observeAll();
+    const pending = pages().find(p => !isReady(p));
+    if (!pending) return finish(false);
+    // Salto adaptativo: só move a janela quando a página-alvo mudou
+    if (pending !== target) {
+        target = pending;
+        target.scrollIntoView({block: 'start'});
+        jumps++;
+    }
+}
+
+function onChange() { step(); }
+
+const mo = new MutationObserver(onChange);
+mo.observe(document.getElementById('document_container') || document.body,
+           {childList: true, subtree: true, attributes: true, attributeFilter: ['src', 'class']});
+document.addEventListener('load', onChange, true);
+const timer = setInterval(step, tickMs);
+step();
+"""
+
+
+def wait_for_pages(driver, timeout=180, grace=3.0, tick=0.05, page_range=None, pages=None):
+    """
+    Garante que todos os containers outer_page_* tenham seu img.absimg ou
+    text_layer carregado, numa única chamada assíncrona ao navegador.
+    Com `page_range` (início, fim) em índices 0-based, fim exclusivo, só
+    essas páginas são esperadas; com `pages` (lista de índices 0-based),
+    só as páginas da lista, saltando direto de uma para a outra.
+    Retorna o relatório do script (total, loaded, missing, timed_out, ...).
+    """
+    start, end = page_range or (0, -1)
+    driver.set_script_timeout(timeout + 10)
+    report = driver.execute_async_script(
+        READINESS_SCRIPT, PAGE_SELECTOR, int(timeout * 1000), int(grace * 1000), int(tick * 1000),
+        start, end, list(pages) if pages is not None else None
+    )
+    elapsed = report["elapsed_ms"] / 1000
+    if report["timed_out"]:
+        print(f"⚠️ Tempo esgotado: {report['loaded']} de {report['total']} páginas carregadas em {elapsed:.1f}s")
+    else:
+        print(f"✅ {report['total']} páginas carregadas em {elapsed:.1f}s ({report['jumps']} saltos)")
+    return report
+
+
+def reload_pages(driver, pages, settle=RELOAD_SETTLE, timeout=60):
+    """
+    Leva cada página de `pages` (índices 0-based) para a área visível e
+    espera `settle` segundos antes de seguir para a próxima, depois espera
+    o conteúdo delas como `wait_for_pages`. O wait_for_pages sozinho não
+    rola até páginas que já têm uma imagem ou text_layer (um placeholder em
+    branco, por exemplo), por isso a nova captura delas passa por aqui.
+    """
+    for i in pages:
+        driver.execute_script("""
+            const page = document.querySelectorAll(arguments[0])[arguments[1]];
+            if (page) page.scrollIntoView({block: 'start'});
+        """, PAGE_SELECTOR, i)
+        time.sleep(settle)
+    return wait_for_pages(driver, timeout=timeout, pages=pages)
@@ -1,11 +1,12 @@
 import os
 import sys
 import threading
+import multiprocessing
+from collections import deque
 import FreeSimpleGUI as sg
-from extractor_text import detect_document_type as detect_type
-from extractor_text import extract_text
-from extractor_scan import extract_images
-from renderer import save_images_to_pdf
+from session import process_document
+from metrics import Metrics, print_sink
+from compression import COMPRESSION_PROFILES
 
 output_folder = "output"
 os.makedirs(output_folder, exist_ok=True)
@@ -18,58 +19,101 @@ FONT_LABEL = ('Segoe UI', 11)
 FONT_INPUT = ('Segoe UI', 11)
 FONT_LOG = ('Consolas', 11)
 
+# O log da interface guarda só as últimas linhas e é atualizado no máximo
+# a cada LOG_FLUSH_MS, juntando tudo o que chegou nesse intervalo
+LOG_MAX_LINES = 1000
+LOG_FLUSH_MS = 100
+
 class GuiLogger:
-    def __init__(self, window):
-        self.window = window
+    """
+    Substitui o sys.stdout: repassa tudo ao console e acumula as mensagens
+    num buffer que a thread da interface esvazia periodicamente (`drain`),
+    em vez de gerar um evento por print.
+    """
+
+    def __init__(self):
         self._stdout = sys.stdout
+        self._pending = deque(maxlen=LOG_MAX_LINES * 2)
+        self._lock = threading.Lock()
 
     def write(self, message):
         self._stdout.write(message)
-        if message.strip():
-            self.window.write_event_value('-LOG-', message)
+        with self._lock:
+            self._pending.append(message)
 
     def flush(self):
         self._stdout.flush()
 
-def baixar_documento(window, values):
+    def drain(self):
+        with self._lock:
+            pending = ''.join(self._pending)
+            self._pending.clear()
+        return pending
+
+class LogView:
+    """
+    Mantém no Multiline só as últimas `max_lines` linhas, anexando o texto
+    novo ao final em vez de reescrever o conteúdo inteiro.
+    """
+
+    def __init__(self, element, max_lines=LOG_MAX_LINES):
+        self.element = element
+        self.max_lines = max_lines
+
+    def clear(self):
+        self.element.update('')
+
+    def append(self, text):
+        if not text:
+            return
+        self.element.update(text, append=True)
+        widget = self.element.Widget
+        excess = int(widget.index('end-1c').split('.')[0]) - self.max_lines
+        if excess > 0:
+            widget.configure(state='normal')
+            widget.delete('1.0', f'{excess + 1}.0')
+            widget.configure(state='disabled')
+
+class ProgressTracker:
+    """
+    Sink de métricas que acompanha quantas páginas do documento já foram
+    anexadas ao PDF, para a barra de progresso da interface.
+    """
+
+    def __init__(self):
+        self.total = 0
+        self.done = 0
+
+    def reset(self):
+        self.total = 0
+        self.done = 0
+
+    def __call__(self, event):
+        if event['type'] == 'counter' and event['name'] == 'pages_total':
+            self.total += event['value']
+        elif event['type'] == 'counter' and event['name'] == 'pages_dropped':
+            self.done += event['value']
+        elif event['type'] == 'span' and event['name'] in ('pdf_page', 'ocr_page'):
+            self.done += 1
+
+def baixar_documento(values, progress):
     try:
-        window['-LOG-'].update('')
         url = values['-LINK-'].strip()
         nome = values['-NOME-'].strip()
         pasta = values['-PASTA-'].strip()
         manter_png = values['-MANTERPNG-']
+        vetorial = values['-VETORIAL-']
+        paginas = values['-PAGINAS-'].strip() or None
+        perfil = values['-PERFIL-'] if values['-PERFIL-'] in COMPRESSION_PROFILES else None
+        verificar = 'drop' if values['-REMOVER-'] else 'flag'
 
         if not url:
             print("❌ Link não pode estar vazio.")
             return
 
-        print('🔍 Detectando tipo de documento...')
-        tipo = detect_type(url)
-
-        if tipo == 'text':
-            print("📘 Documento identificado como TEXTO.")
-            print('📥 Baixando páginas (texto)...')
-            imagens = extract_text(url)
-
-        elif tipo == 'scan':
-            print("📕 Documento identificado como SCAN.")
-            print('📥 Baixando imagens...')
-            imagens = extract_images(url, pasta)
-
-        else:
-            print("❌ Documento não reconhecido ou não suportado.")
-            return
-
-        print('🗜️ Gerando PDF...')
-        pdf_path = os.path.join(pasta, f'{nome}.pdf')
-        save_images_to_pdf(imagens, pdf_path)
-
-        if not manter_png:
-            for img in imagens:
-                os.remove(img)
-            print('🗑️ PNGs temporários removidos.')
-
-        print(f'✅ PDF salvo em {pdf_path}')
+        metrics = Metrics(job=nome, sinks=[print_sink, progress])
+        process_document(url, nome, pasta, manter_png=manter_png, vetorial=vetorial, metrics=metrics,
+                         paginas=paginas, perfil=perfil, verificar=verificar)
     except Exception as e:
         print(f'❌ Erro: {e}')
 
@@ -89,33 +133,60 @@ def main():
                     [sg.Input(output_folder, key='-PASTA-', size=(48,1), font=FONT_INPUT, readonly=True), 
                      sg.FolderBrowse(button_text='📁', font=FONT_LABEL, tooltip='Selecionar pasta')],
                     
-                    [sg.Checkbox('🖼️ Manter PNGs após gerar o PDF', key='-MANTERPNG-', font=FONT_LABEL, pad=((0,0),(20,10)))]
+                    [sg.Text('📑 Páginas (vazio = todas; ex.: 1-50,120):', font=FONT_LABEL, pad=((0,5), (15,2)))],
+                    [sg.Input('', key='-PAGINAS-', size=(60, 1), font=FONT_INPUT,
+                              tooltip='Se o PDF já existir, só essas páginas são trocadas ou acrescentadas')],
+
+                    [sg.Text('🗜️ Compressão das páginas:', font=FONT_LABEL, pad=((0,5), (15,2)))],
+                    [sg.Combo(['original'] + list(COMPRESSION_PROFILES), default_value='original', key='-PERFIL-',
+                              readonly=True, size=(20, 1), font=FONT_INPUT)],
+
+                    [sg.Checkbox('🖼️ Manter PNGs após gerar o PDF', key='-MANTERPNG-', font=FONT_LABEL, pad=((0,0),(20,0)))],
+                    [sg.Checkbox('🧹 Remover páginas em branco ou repetidas', key='-REMOVER-', font=FONT_LABEL, pad=((0,0),(5,0)))],
+                    [sg.Checkbox('📐 PDF vetorial para documentos de texto', key='-VETORIAL-', default=True, font=FONT_LABEL, pad=((0,0),(5,10)))]
                   ], element_justification='left', expand_x=True)],
 
         [sg.Button('📥 Baixar e gerar PDF', size=(40,1), font=FONT_LABEL)],
 
+        [sg.Text('', key='-PROGRESSO-TEXTO-', font=FONT_LABEL, size=(40,1), pad=((0,0),(15,5)))],
+        [sg.ProgressBar(1, orientation='h', size=(52, 20), key='-PROGRESSO-')],
+
         [sg.Text('📝 Log de Execução:', font=FONT_LABEL, pad=((0,0),(15,5)))],
         [sg.Multiline('', key='-LOG-', size=(80, 20), autoscroll=True, disabled=True, font=FONT_LOG)],
     ]
 
     window = sg.Window('Scribd Downloader', layout, finalize=True, resizable=False, element_justification='center')
 
-    sys.stdout = GuiLogger(window)
+    logger = GuiLogger()
+    sys.stdout = logger
+    log_view = LogView(window['-LOG-'])
+    progress = ProgressTracker()
+    shown = None
 
     while True:
-        event, values = window.read()
+        event, values = window.read(timeout=LOG_FLUSH_MS)
 
         if event == sg.WINDOW_CLOSED:
             break
 
         if event == '📥 Baixar e gerar PDF':
-            threading.Thread(target=baixar_documento, args=(window, values), daemon=True).start()
+            logger.drain()
+            log_view.clear()
+            progress.reset()
+            threading.Thread(target=baixar_documento, args=(values, progress), daemon=True).start()
+
+        log_view.append(logger.drain())
 
-        if event == '-LOG-':
-            current_log = window['-LOG-'].get()
-            window['-LOG-'].update(current_log + values[event])
+        state = (progress.done, progress.total)
+        if state != shown:
+            shown = state
+            done, total = state
+            window['-PROGRESSO-'].update(current_count=done, max=max(total, 1))
+            window['-PROGRESSO-TEXTO-'].update(f'📊 Página {done} de {total}' if total else '')
 
     window.close()
 
 if __name__ == '__main__':
+    # Necessário para o pool de processos do OCR no executável (PyInstaller)
+    multiprocessing.freeze_support()
     main()
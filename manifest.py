@@ -0,0 +1,162 @@
+import os
+import json
+import time
+import hashlib
+import threading
+
+MANIFEST_NAME = "manifest.json"
+
+# Diferença máxima (px CSS) entre bounding-boxes da mesma página em execuções
+# diferentes
+BOX_TOLERANCE = 1
+
+
+def file_sha256(path):
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(1 << 16), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def same_source(recorded, source):
+    """
+    True se `recorded` (do manifesto) e `source` são a mesma origem: a
+    mesma URL ou a mesma bounding-box, com até BOX_TOLERANCE px de
+    diferença por causa do arredondamento do layout.
+    """
+    if isinstance(recorded, dict) and isinstance(source, dict):
+        return recorded.keys() == source.keys() and all(
+            abs(recorded[k] - source[k]) <= BOX_TOLERANCE for k in recorded)
+    return recorded == source
+
+
+class Manifest:
+    """
+    Registro das páginas já extraídas de um documento, salvo em
+    manifest.json na pasta de saída. Guarda, por página, a origem (URL da
+    imagem ou bounding‐box), o arquivo, o tamanho e o SHA-256, para que uma
+    nova execução só busque as páginas ausentes ou corrompidas.
+
+    `settings` (dict com as configurações de captura, ex.: formato e
+    escala) fica no cabeçalho: um manifesto gravado com outras
+    configurações é descartado, já que as páginas dele não servem mais.
+    """
+
+    def __init__(self, folder, url, settings=None, save_interval=1.0):
+        self.folder = folder
+        self.url = url
+        self.settings = settings
+        self.path = os.path.join(folder, MANIFEST_NAME)
+        self.save_interval = save_interval
+        self.pages = {}
+        self._verified = set()
+        self._lock = threading.RLock()
+        self._last_save = 0.0
+        self._dirty = False
+        self._load()
+
+    def _load(self):
+        if not os.path.exists(self.path):
+            return
+        try:
+            with open(self.path, encoding="utf-8") as f:
+                data = json.load(f)
+        except (OSError, ValueError) as e:
+            print(f"⚠️ Manifesto ilegível, recomeçando do zero: {e}")
+            return
+        if data.get("url") != self.url:
+            print("⚠️ Manifesto é de outro documento, recomeçando do zero.")
+            return
+        if data.get("settings") != self.settings:
+            print(f"⚠️ Manifesto gravado com outras configurações de captura "
+                  f"({data.get('settings')} -> {self.settings}), recomeçando do zero.")
+            self._dirty = True
+            return
+        self.pages = {int(k): v for k, v in data.get("pages", {}).items()}
+        print(f"♻️ Manifesto encontrado com {len(self.pages)} páginas registradas.")
+
+    def is_valid(self, index, source=None):
+        """
+        True se a página `index` (0-based) está registrada e o arquivo em
+        disco ainda bate com o tamanho e o checksum gravados. Com `source`,
+        a origem registrada também precisa ser a mesma (ver `same_source`).
+        """
+        entry = self.pages.get(index)
+        if not entry:
+            return False
+        if source is not None and not same_source(entry["source"], source):
+            return False
+        path = entry["path"]
+        try:
+            if os.path.getsize(path) != entry["size"]:
+                return False
+        except OSError:
+            return False
+        if index not in self._verified:
+            if file_sha256(path) != entry["sha256"]:
+                return False
+            self._verified.add(index)
+        return True
+
+    def path_of(self, index):
+        return self.pages[index]["path"]
+
+    def missing(self, total, indices=None, sources=None):
+        """
+        Índices (0-based) das páginas ausentes ou corrompidas, entre as
+        `total` páginas ou só entre `indices`, se informado. `sources`
+        (índice -> origem) descarta também as páginas de outra origem.
+        """
+        sources = sources or {}
+        return [i for i in (range(total) if indices is None else indices)
+                if not self.is_valid(i, sources.get(i))]
+
+    def record(self, index, path, source):
+        entry = {
+            "page": index + 1,
+            "source": source,
+            "path": path,
+            "size": os.path.getsize(path),
+            "sha256": file_sha256(path),
+        }
+        with self._lock:
+            self.pages[index] = entry
+            self._verified.add(index)
+            self._dirty = True
+            if time.monotonic() - self._last_save >= self.save_interval:
+                self.save()
+
+    def forget(self, indices):
+        """
+        Descarta o registro das páginas `indices`, para que sejam extraídas
+        de novo mesmo que o arquivo em disco ainda esteja íntegro.
+        """
+        with self._lock:
+            for index in indices:
+                if self.pages.pop(index, None) is not None:
+                    self._dirty = True
+                self._verified.discard(index)
+
+    def save(self):
+        with self._lock:
+            if not self._dirty:
+                return
+            os.makedirs(self.folder, exist_ok=True)
+            data = {
+                "url": self.url,
+                "settings": self.settings,
+                "pages": {str(k): v for k, v in sorted(self.pages.items())},
+            }
+            tmp_path = self.path + ".tmp"
+            with open(tmp_path, "w", encoding="utf-8") as f:
+                json.dump(data, f, ensure_ascii=False, indent=1)
+            os.replace(tmp_path, self.path)
+            self._last_save = time.monotonic()
+            self._dirty = False
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.save()
@@ -0,0 +1,208 @@
+import os
+import json
+import time
+import functools
+import threading
+import contextvars
+from contextlib import contextmanager
+
+# Coletor do trabalho em andamento. Threads criadas pelo próprio trabalho
+# (downloads, faixas, montagem do PDF) herdam o coletor via `bind`.
+_current = contextvars.ContextVar("metrics", default=None)
+
+
+def print_sink(event):
+    """
+    Destino padrão dos eventos: mostra no log (e, pelo GuiLogger, na
+    interface) a duração de cada etapa e o resumo do trabalho.
+    """
+    if event["type"] == "span" and not event.get("detail"):
+        status = "" if event["ok"] else " (falhou)"
+        print(f"⏱️ {event['name']}: {event['seconds']:.2f}s{status}")
+    elif event["type"] == "summary":
+        counters = ", ".join(f"{k}={v}" for k, v in sorted(event["counters"].items()))
+        print(f"📈 {event['job'] or 'métricas'}: {counters or 'sem contadores'}")
+
+
+class Metrics:
+    """
+    Coleta a duração das etapas (spans) e contadores de um trabalho, como
+    páginas capturadas, bytes baixados, retentativas e falhas. Cada medida
+    também vira um evento enviado aos `sinks` (funções que recebem um dict),
+    e o total pode ser exportado em JSON ou no formato textfile do
+    Prometheus.
+    """
+
+    def __init__(self, job=None, sinks=None):
+        self.job = job
+        self.sinks = list(sinks or [])
+        self.spans = {}
+        self.counters = {}
+        self.started = time.time()
+        self._lock = threading.Lock()
+
+    def emit(self, event):
+        event.setdefault("job", self.job)
+        for sink in self.sinks:
+            try:
+                sink(event)
+            except Exception as e:
+                print(f"⚠️ Falha ao registrar métrica: {e}")
+
+    def observe(self, name, seconds, ok=True, detail=False):
+        with self._lock:
+            span = self.spans.setdefault(name, {"count": 0, "seconds": 0.0, "max": 0.0, "failures": 0})
+            span["count"] += 1
+            span["seconds"] += seconds
+            span["max"] = max(span["max"], seconds)
+            if not ok:
+                span["failures"] += 1
+        self.emit({"type": "span", "name": name, "seconds": seconds, "ok": ok, "detail": detail})
+
+    @contextmanager
+    def span(self, name, detail=False):
+        """
+        Mede o bloco como uma ocorrência da etapa `name`. Com `detail`, o
+        evento é de granularidade fina (ex.: um lote de capturas) e não é
+        mostrado individualmente pelo print_sink.
+        """
+        start = time.perf_counter()
+        ok = False
+        try:
+            yield
+            ok = True
+        finally:
+            self.observe(name, time.perf_counter() - start, ok=ok, detail=detail)
+
+    def count(self, name, value=1):
+        with self._lock:
+            self.counters[name] = self.counters.get(name, 0) + value
+        self.emit({"type": "counter", "name": name, "value": value})
+
+    @contextmanager
+    def activate(self):
+        """
+        Torna este coletor o atual (ver `current`) durante o bloco; ao sair,
+        envia o evento de resumo aos sinks.
+        """
+        token = _current.set(self)
+        try:
+            yield self
+        finally:
+            _current.reset(token)
+            self.emit({"type": "summary", "counters": dict(self.counters)})
+
+    def to_dict(self):
+        with self._lock:
+            return {
+                "job": self.job,
+                "started": self.started,
+                "seconds": round(time.time() - self.started, 3),
+                "spans": {name: dict(span) for name, span in self.spans.items()},
+                "counters": dict(self.counters),
+            }
+
+    def write_json(self, path):
+        _write_atomic(path, json.dumps(self.to_dict(), ensure_ascii=False, indent=2))
+
+
+_default = Metrics(sinks=[print_sink])
+
+
+def current():
+    """
+    Coletor ativo na thread atual ou, fora de um trabalho, o global.
+    """
+    return _current.get() or _default
+
+
+def span(name, detail=False):
+    return current().span(name, detail=detail)
+
+
+def count(name, value=1):
+    current().count(name, value)
+
+
+def timed(name, detail=False):
+    """
+    Decorador que mede cada chamada da função como a etapa `name`.
+    """
+    def decorator(func):
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            with span(name, detail=detail):
+                return func(*args, **kwargs)
+        return wrapper
+    return decorator
+
+
+def bind(func):
+    """
+    Prende `func` ao coletor atual para ser executada em outra thread.
+    Cada chamada roda numa cópia do contexto, então o resultado pode ser
+    usado por várias threads ao mesmo tempo (ex.: pool.map).
+    """
+    context = contextvars.copy_context()
+
+    @functools.wraps(func)
+    def wrapper(*args, **kwargs):
+        return context.copy().run(func, *args, **kwargs)
+    return wrapper
+
+
+def _escape_label(value):
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def prometheus_text(collectors, prefix="scribd"):
+    """
+    Métricas de vários coletores no formato de exposição do Prometheus,
+    com o nome do trabalho no rótulo `job_name`.
+    """
+    spans = {}
+    counters = {}
+    for metrics in collectors:
+        data = metrics.to_dict()
+        job = _escape_label(data["job"] or "")
+        for name, span_data in data["spans"].items():
+            spans.setdefault(name, []).append((job, span_data))
+        for name, value in data["counters"].items():
+            counters.setdefault(name, []).append((job, value))
+
+    lines = []
+    series = [
+        ("stage_seconds_total", "counter", "Tempo total gasto em cada etapa.", "seconds"),
+        ("stage_calls_total", "counter", "Execuções de cada etapa.", "count"),
+        ("stage_failures_total", "counter", "Execuções de cada etapa que falharam.", "failures"),
+        ("stage_max_seconds", "gauge", "Execução mais longa de cada etapa.", "max"),
+    ]
+    for metric, kind, help_text, field in series:
+        lines.append(f"# HELP {prefix}_{metric} {help_text}")
+        lines.append(f"# TYPE {prefix}_{metric} {kind}")
+        for name in sorted(spans):
+            for job, span_data in spans[name]:
+                lines.append(f'{prefix}_{metric}{{job_name="{job}",stage="{name}"}} {span_data[field]}')
+    for name in sorted(counters):
+        lines.append(f"# TYPE {prefix}_{name}_total counter")
+        for job, value in counters[name]:
+            lines.append(f'{prefix}_{name}_total{{job_name="{job}"}} {value}')
+    return "\n".join(lines) + "\n"
+
+
+def write_prometheus(path, collectors, prefix="scribd"):
+    """
+    Grava `collectors` num arquivo .prom para o textfile collector do
+    node_exporter. A escrita é atômica para não expor arquivo pela metade.
+    """
+    _write_atomic(path, prometheus_text(collectors, prefix))
+
+
+def _write_atomic(path, text):
+    folder = os.path.dirname(path)
+    if folder:
+        os.makedirs(folder, exist_ok=True)
+    tmp_path = path + ".tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        f.write(text)
+    os.replace(tmp_path, path)
@@ -0,0 +1,104 @@
+import json
+import base64
+
+# Limites do buffer de respostas do Chrome/Edge: sem isso corpos de imagens
+# antigas são descartados antes de serem lidos em documentos grandes
+MAX_TOTAL_BUFFER = 512 * 1024 * 1024
+MAX_RESOURCE_BUFFER = 32 * 1024 * 1024
+
+
+def enable_performance_log(options, vendor="ms"):
+    """
+    Liga o log de performance (eventos CDP de rede) nas opções do driver.
+    `vendor` é "ms" para o Edge e "goog" para o Chrome.
+    """
+    options.set_capability(f"{vendor}:loggingPrefs", {"performance": "ALL"})
+
+
+class NetworkRecorder:
+    """
+    Registra as respostas de imagem que o navegador recebe enquanto rola o
+    documento (eventos Network.* do log de performance) e permite ler o
+    corpo de cada uma com Network.getResponseBody, sem baixar de novo.
+    Também conta requisições feitas, bloqueadas e bytes recebidos.
+    Precisa ser iniciado antes do driver.get.
+    """
+
+    def __init__(self, driver):
+        self.driver = driver
+        self.enabled = False
+        self._requests = {}
+        self._finished = set()
+        self.requests_sent = 0
+        self.requests_blocked = 0
+        self.bytes_loaded = 0
+
+    def start(self):
+        try:
+            self.driver.execute_cdp_cmd("Network.enable", {
+                "maxTotalBufferSize": MAX_TOTAL_BUFFER,
+                "maxResourceBufferSize": MAX_RESOURCE_BUFFER,
+            })
+            # Descarta o que já estava no log antes da navegação
+            self.driver.get_log("performance")
+            self.enabled = True
+        except Exception as e:
+            print(f"⚠️ Captura pela rede indisponível: {str(e)[:100]}")
+        return self
+
+    def poll(self):
+        """
+        Lê os eventos acumulados no log de performance desde a última chamada.
+        """
+        if not self.enabled:
+            return
+        for entry in self.driver.get_log("performance"):
+            try:
+                message = json.loads(entry["message"])["message"]
+            except (KeyError, ValueError):
+                continue
+            method = message.get("method")
+            params = message.get("params", {})
+            if method == "Network.requestWillBeSent":
+                self.requests_sent += 1
+            elif method == "Network.responseReceived" and params.get("type") == "Image":
+                response = params["response"]
+                if 200 <= response.get("status", 0) < 300:
+                    self._requests[response["url"]] = params["requestId"]
+            elif method == "Network.loadingFinished":
+                self._finished.add(params["requestId"])
+                self.bytes_loaded += int(params.get("encodedDataLength", 0))
+            elif method == "Network.loadingFailed" and params.get("blockedReason"):
+                self.requests_blocked += 1
+
+    def stats(self):
+        """
+        Contadores de rede desde o início: requisições feitas, bloqueadas
+        (ver blocking.py) e bytes efetivamente recebidos.
+        """
+        self.poll()
+        return {
+            "requests": self.requests_sent,
+            "blocked": self.requests_blocked,
+            "bytes_loaded": self.bytes_loaded,
+        }
+
+    def body(self, url):
+        """
+        Bytes da resposta de `url` já recebida pelo navegador, ou None.
+        """
+        if not self.enabled:
+            return None
+        request_id = self._requests.get(url)
+        if request_id is None or request_id not in self._finished:
+            return None
+        try:
+            result = self.driver.execute_cdp_cmd("Network.getResponseBody", {"requestId": request_id})
+        except Exception:
+            return None
+        if result.get("base64Encoded"):
+            return base64.b64decode(result["body"])
+        return result["body"].encode("latin-1")
+
+    def __len__(self):
+        return len(self._requests)
@@ -0,0 +1,201 @@
+import os
+import metrics
+
+# Lado (px) da miniatura em tons de cinza usada em todas as medidas; abaixo
+# de 256 as linhas de texto de páginas diferentes ficam parecidas demais
+THUMB_SIZE = 256
+
+# dHash de HASH_SIZE x HASH_SIZE bits; páginas com até DUPLICATE_BITS bits
+# diferentes são candidatas a duplicata e só são confirmadas se menos de
+# DUPLICATE_CHANGED dos pixels das miniaturas mudarem mais de INK_DELTA tons
+HASH_SIZE = 16
+DUPLICATE_BITS = 48
+DUPLICATE_CHANGED = 0.001
+
+# Quantas páginas anteriores são comparadas com cada página nova: as
+# duplicatas do lazy loading aparecem sempre ao lado da original
+DUPLICATE_WINDOW = 2
+
+# Página em branco: menos de BLANK_INK dos pixels da miniatura se afastam
+# mais de INK_DELTA tons da cor de fundo
+INK_DELTA = 48
+BLANK_INK = 0.002
+
+CHECK_ACTIONS = ("flag", "drop", "recapture")
+
+
+def page_fingerprint(img_path):
+    """
+    Miniatura, dHash e fração de "tinta" de uma página. Tudo é calculado
+    com operações do Pillow sobre a imagem inteira (sem laços em Python
+    por pixel); JPEGs já são decodificados em escala reduzida (draft).
+    """
+    from PIL import Image, ImageChops
+
+    with Image.open(img_path) as img:
+        img.draft("L", (THUMB_SIZE * 2, THUMB_SIZE * 2))
+        thumb = img.convert("L")
+    thumb.thumbnail((THUMB_SIZE, THUMB_SIZE), Image.BILINEAR)
+
+    histogram = thumb.histogram()
+    pixels = thumb.width * thumb.height
+    background = max(range(256), key=histogram.__getitem__)
+    distance = ImageChops.difference(thumb, Image.new("L", thumb.size, background))
+    ink = sum(distance.histogram()[INK_DELTA:]) / pixels
+
+    # dHash: cada bit diz se o pixel é mais claro que o vizinho da esquerda
+    grid = thumb.resize((HASH_SIZE + 1, HASH_SIZE), Image.BOX)
+    brighter = ImageChops.subtract(grid.crop((1, 0, HASH_SIZE + 1, HASH_SIZE)),
+                                   grid.crop((0, 0, HASH_SIZE, HASH_SIZE)))
+    bits = brighter.point(lambda v: 1 if v else 0).tobytes()
+    dhash = int("".join("1" if b else "0" for b in bits), 2)
+
+    return {"thumb": thumb, "hash": dhash, "ink": ink, "blank": ink < BLANK_INK}
+
+
+def is_duplicate(a, b):
+    """
+    True se as impressões digitais `a` e `b` são da mesma página.
+    """
+    from PIL import ImageChops
+
+    if bin(a["hash"] ^ b["hash"]).count("1") > DUPLICATE_BITS:
+        return False
+    if a["thumb"].size != b["thumb"].size:
+        return False
+    changed = sum(ImageChops.difference(a["thumb"], b["thumb"]).histogram()[INK_DELTA:])
+    return changed < DUPLICATE_CHANGED * a["thumb"].width * a["thumb"].height
+
+
+class PageChecker:
+    """
+    Confere as páginas entre a extração e o renderer, atrás de páginas em
+    branco (placeholders do lazy loading) e duplicadas (a mesma página
+    capturada duas vezes), e aplica `action` a elas:
+
+    - "flag": mantém no PDF, só avisa e registra no relatório;
+    - "drop": tira do PDF;
+    - "recapture": extrai de novo na hora, com `recapture(indices)` (que
+      gera (índice, caminho)); o que continuar com problema é mantido e só
+      registrado.
+
+    Em todos os casos as páginas marcadas ficam em `skip_ocr`, já que o
+    OCR delas não acrescenta nada ao PDF.
+
+    Como a nova captura usa o navegador da extração, `filter` deve rodar
+    na mesma thread que consome o extrator (ver renderer.render_pages).
+    """
+
+    def __init__(self, action="flag", recapture=None):
+        if action not in CHECK_ACTIONS:
+            raise ValueError(f"Ação inválida para páginas suspeitas: {action!r} "
+                             f"(disponíveis: {', '.join(CHECK_ACTIONS)})")
+        self.action = action if action != "recapture" or recapture else "flag"
+        self.recapture = recapture
+        self.blank = []
+        self.duplicates = {}
+        self.dropped = {}
+        self.recaptured = []
+        self.skip_ocr = set()
+        self._recent = {}
+
+    def check(self, i, img_path):
+        """
+        Classifica a página `i` como "blank", "duplicate" ou None (ok),
+        comparando-a com as DUPLICATE_WINDOW páginas anteriores.
+        """
+        with metrics.span("page_check", detail=True):
+            fingerprint = page_fingerprint(img_path)
+            if fingerprint["blank"]:
+                return "blank", None
+            for j in range(i - 1, i - 1 - DUPLICATE_WINDOW, -1):
+                previous = self._recent.get(j)
+                if previous is not None and is_duplicate(fingerprint, previous):
+                    return "duplicate", j
+            self._recent[i] = fingerprint
+            self._recent.pop(i - DUPLICATE_WINDOW - 1, None)
+            return None, None
+
+    def _record(self, i, img_path, problem, original):
+        if problem == "blank":
+            self.blank.append(i)
+            metrics.count("pages_blank")
+            print(f"⬜ Página {i+1} parece em branco")
+        else:
+            self.duplicates[i] = original
+            metrics.count("pages_duplicate")
+            print(f"👯 Página {i+1} parece repetir a página {original+1}")
+        self.skip_ocr.add(i)
+
+    def filter(self, pages):
+        """
+        Gera as páginas de `pages` (tuplas (índice, caminho) em ordem) que
+        seguem para o PDF, também em ordem. Páginas descartadas saem como
+        (índice, None), para o renderer não ficar esperando por elas; com
+        "recapture", a página suspeita é capturada de novo antes de seguir,
+        sem segurar as seguintes.
+        """
+        for i, img_path in pages:
+            problem, original = self.check(i, img_path)
+            if problem is not None and self.action == "recapture":
+                img_path, problem, original = self._recapture(i, img_path, problem)
+            if problem is None:
+                yield i, img_path
+                continue
+            self._record(i, img_path, problem, original)
+            if self.action == "drop":
+                self.dropped[i] = img_path
+                metrics.count("pages_dropped")
+                yield i, None
+            else:
+                yield i, img_path
+
+    def _recapture(self, i, img_path, problem):
+        print(f"🔁 Página {i+1} suspeita ({'em branco' if problem == 'blank' else 'repetida'}), "
+              f"capturando de novo...")
+        retried = dict(self.recapture([i]))
+        if i in retried:
+            img_path = retried[i]
+            self.recaptured.append(i)
+            metrics.count("pages_recaptured")
+        # As páginas anteriores ainda estão na janela de comparação
+        problem, original = self.check(i, img_path)
+        if problem is None:
+            print(f"✅ Página {i+1} recuperada")
+        return img_path, problem, original
+
+    def report(self):
+        """
+        Resumo do que foi encontrado (índices a partir de 1), para o log e
+        para o relatório do lote.
+        """
+        return {
+            "acao": self.action,
+            "em_branco": [i + 1 for i in sorted(self.blank)],
+            "duplicadas": {i + 1: j + 1 for i, j in sorted(self.duplicates.items())},
+            "removidas": [i + 1 for i in sorted(self.dropped)],
+            "recapturadas": [i + 1 for i in sorted(self.recaptured)],
+        }
+
+    def print_report(self):
+        report = self.report()
+        if not report["em_branco"] and not report["duplicadas"] and not report["recapturadas"]:
+            print("✅ Nenhuma página em branco ou repetida")
+            return report
+        print(f"🧹 Verificação das páginas: {len(report['em_branco'])} em branco, "
+              f"{len(report['duplicadas'])} repetidas, {len(report['removidas'])} removidas, "
+              f"{len(report['recapturadas'])} capturadas de novo")
+        if report["em_branco"]:
+            print(f"   ⬜ Em branco: {', '.join(map(str, report['em_branco']))}")
+        for i, j in report["duplicadas"].items():
+            print(f"   👯 Página {i} = página {j}")
+        return report
+
+    def remove_dropped(self):
+        """
+        Apaga os arquivos das páginas descartadas (e suas camadas de texto).
+        """
+        for img_path in self.dropped.values():
+            for path in (img_path, os.path.splitext(img_path)[0] + ".json"):
+                if os.path.exists(path):
+                    os.remove(path)
@@ -0,0 +1,66 @@
+def parse_ranges(spec):
+    """
+    Valida uma seleção de páginas como "1-50,120,300-" e retorna seus
+    intervalos (início, fim), 1-based e inclusivos, com fim None nos
+    intervalos abertos. Não depende do total de páginas, então serve para
+    conferir a seleção antes de abrir o documento. Lança ValueError se a
+    seleção for inválida.
+    """
+    ranges = []
+    for part in str(spec).replace(" ", "").split(","):
+        if not part:
+            continue
+        first, sep, last = part.partition("-")
+        try:
+            start = int(first)
+            end = start if not sep else int(last) if last else None
+        except ValueError:
+            raise ValueError(f"Seleção de páginas inválida: {part!r}") from None
+        if start < 1 or (end is not None and end < start):
+            raise ValueError(f"Seleção de páginas inválida: {part!r}")
+        ranges.append((start, end))
+    return ranges
+
+
+def parse_pages(spec, total=None):
+    """
+    Converte uma seleção de páginas como "1-50,120" (1-based, intervalos
+    inclusivos) na lista ordenada de índices 0-based, sem repetições.
+    Intervalos abertos ("100-") vão até `total`, que também limita o
+    resultado quando informado. Lança ValueError se a seleção for inválida
+    ou tiver intervalo aberto sem `total`.
+    """
+    if isinstance(spec, (list, tuple, set, range)):
+        indices = set(spec)
+    else:
+        indices = set()
+        for start, end in parse_ranges(spec):
+            if end is None:
+                if total is None:
+                    raise ValueError(f"Seleção de páginas inválida: '{start}-' precisa do total de páginas")
+                end = total
+            indices.update(range(start - 1, end))
+    if total is not None:
+        indices = {i for i in indices if i < total}
+    return sorted(indices)
+
+
+def format_pages(indices):
+    """
+    Inverso de `parse_pages`: [0, 1, 2, 9] -> "1-3,10".
+    """
+    return ",".join(f"{start+1}" if end - start == 1 else f"{start+1}-{end}"
+                    for start, end in contiguous_ranges(indices))
+
+
+def contiguous_ranges(indices):
+    """
+    Agrupa índices ordenados em faixas contíguas (início, fim exclusivo).
+    """
+    ranges = []
+    for i in sorted(indices):
+        if ranges and ranges[-1][1] == i:
+            ranges[-1][1] = i + 1
+        else:
+            ranges.append([i, i + 1])
+    return [tuple(r) for r in ranges]
@@ -1,22 +1,163 @@
 import os
-from PIL import Image
-import pytesseract
-import fitz  # PyMuPDF
+import json
+import zlib
+import hashlib
+import queue
+import time
+import threading
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from itertools import repeat
+from cache import default_cache
+from compression import PAGE_SHORT_SIDE_IN, compress_pages, describe
+import metrics
 
+# PIL, pytesseract e fitz (PyMuPDF) são importados dentro das funções que
+# os usam, para não pesar na abertura da interface e dos workers do lote
 
 tesseract_path = os.path.join(os.getcwd(), "tesseract", "tesseract.exe")
-pytesseract.pytesseract.tesseract_cmd = tesseract_path
 
 
-def save_text_to_pdf(image_paths, output_path):
+OCR_CACHE_DIR = os.path.join(os.getcwd(), "cache", "ocr")
+
+# Resolução que o OCR deve receber; páginas capturadas abaixo dela são
+# ampliadas e as capturadas em alta resolução vão como estão
+OCR_TARGET_DPI = 200
+
+
+def ocr_scale(img_path, scale=None):
+    """
+    Fator de ampliação da página antes do OCR: `scale`, se informado, ou o
+    inteiro que leva a página mais perto de OCR_TARGET_DPI (1 para
+    capturas em alta resolução, 2 para as capturas em escala 1).
+    """
+    if scale is not None:
+        return scale
+    from PIL import Image
+
+    with Image.open(img_path) as img:
+        dpi = min(img.size) / PAGE_SHORT_SIDE_IN
+    return max(1, round(OCR_TARGET_DPI / dpi))
+
+
+def _ocr_cache_key(img_path, lang, scale):
+    """
+    Chave do cache de OCR: hash do conteúdo da imagem + idioma + escala.
+    """
+    digest = hashlib.sha256()
+    with open(img_path, "rb") as f:
+        for chunk in iter(lambda: f.read(1 << 16), b""):
+            digest.update(chunk)
+    digest.update(f"|{lang}|{scale}".encode())
+    return digest.hexdigest()
+
+
+def _write_ocr_cache(cache_path, ocr_pdf_bytes):
+    """
+    Grava a camada OCR no cache de forma atômica. O temporário leva o pid
+    e a thread, pois os trabalhos do lote rodam em threads do mesmo
+    processo e podem gravar a mesma página ao mesmo tempo.
+    """
+    tmp_path = f"{cache_path}.{os.getpid()}.{threading.get_ident()}.tmp"
+    with open(tmp_path, "wb") as f:
+        f.write(ocr_pdf_bytes)
+    os.replace(tmp_path, cache_path)
+
+
+def _ocr_page(img_path, lang, scale, tesseract_cmd):
+    """
+    Executa o OCR de uma página e retorna o PDF (bytes) gerado pelo tesseract.
+    Roda nos processos do pool, por isso recebe o caminho do executável.
+    """
+    import pytesseract
+    from PIL import Image
+
+    pytesseract.pytesseract.tesseract_cmd = tesseract_cmd
+    with Image.open(img_path) as img:
+        if scale != 1:
+            # Ajusta tamanho da imagem para garantir DPI adequado
+            img = img.resize((round(img.width * scale), round(img.height * scale)), Image.LANCZOS)
+        return pytesseract.image_to_pdf_or_hocr(img, extension='pdf', lang=lang)
+
+
+def _ocr_page_cached(img_path, lang, scale, tesseract_cmd, cache_dir):
+    """
+    Como `_ocr_page`, mas consultando e alimentando o cache de OCR em disco.
+    """
+    scale = ocr_scale(img_path, scale)
+    cache_path = os.path.join(cache_dir, f"{_ocr_cache_key(img_path, lang, scale)}.pdf")
+    if os.path.exists(cache_path):
+        with open(cache_path, "rb") as f:
+            return f.read()
+    ocr_pdf_bytes = _ocr_page(img_path, lang, scale, tesseract_cmd)
+    _write_ocr_cache(cache_path, ocr_pdf_bytes)
+    return ocr_pdf_bytes
+
+
+@metrics.timed("ocr")
+def ocr_pages(image_paths, lang='por+eng', scale=None, workers=None, cache_dir=OCR_CACHE_DIR):
+    """
+    Faz o OCR das páginas em paralelo num pool de processos e devolve, na
+    mesma ordem de `image_paths`, o PDF de cada camada OCR. Páginas cujo
+    conteúdo, idioma e escala já foram processados vêm do cache em disco.
+    Sem `scale`, cada página é ampliada só o necessário (ver `ocr_scale`).
+    """
+    os.makedirs(cache_dir, exist_ok=True)
+    results = [None] * len(image_paths)
+    pending = []
+
+    for i, img_path in enumerate(image_paths):
+        page_scale = ocr_scale(img_path, scale)
+        key = _ocr_cache_key(img_path, lang, page_scale)
+        cache_path = os.path.join(cache_dir, f"{key}.pdf")
+        if os.path.exists(cache_path):
+            with open(cache_path, "rb") as f:
+                results[i] = f.read()
+            metrics.count("ocr_cached")
+            print(f"♻️ OCR em cache para {os.path.basename(img_path)}")
+        else:
+            pending.append((i, img_path, cache_path, page_scale))
+
+    if pending:
+        workers = workers or os.cpu_count() or 1
+        print(f"🧠 Executando OCR em {len(pending)} páginas com {workers} processos...")
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            ocr_results = pool.map(
+                _ocr_page,
+                [img_path for _, img_path, _, _ in pending],
+                repeat(lang), [page_scale for _, _, _, page_scale in pending], repeat(tesseract_path),
+            )
+            for (i, img_path, cache_path, _), ocr_pdf_bytes in zip(pending, ocr_results):
+                _write_ocr_cache(cache_path, ocr_pdf_bytes)
+                results[i] = ocr_pdf_bytes
+                metrics.count("ocr_pages")
+                print(f"✅ OCR concluído na página {os.path.basename(img_path)}")
+
+    return results
+
+
+def save_text_to_pdf(image_paths, output_path, lang='por+eng', scale=None, workers=None, cache_dir=OCR_CACHE_DIR):
     """
     Gera um PDF visual (com as imagens) e embute texto OCR invisível.
+    O OCR roda em paralelo (ver `ocr_pages`) e as camadas são inseridas
+    no documento na ordem das páginas.
     """
+    ocr_layers = ocr_pages(image_paths, lang=lang, scale=scale, workers=workers, cache_dir=cache_dir)
+    with metrics.span("pdf"):
+        _insert_ocr_layers(image_paths, ocr_layers, output_path)
+    _count_pdf(output_path, len(image_paths))
+    print(f"📄 PDF com OCR salvo em {output_path}")
+
+
+def _insert_ocr_layers(image_paths, ocr_layers, output_path):
+    import fitz
+    from PIL import Image
+
     pdf = fitz.open()
 
-    for img_path in image_paths:
-        img = Image.open(img_path)
-        width, height = img.size
+    for img_path, ocr_pdf_bytes in zip(image_paths, ocr_layers):
+        with Image.open(img_path) as img:
+            width, height = img.size
 
         # Cria uma nova página no tamanho da imagem
         page = pdf.new_page(width=width, height=height)
@@ -25,30 +166,603 @@ def save_text_to_pdf(image_paths, output_path):
         img_rect = fitz.Rect(0, 0, width, height)
         page.insert_image(img_rect, filename=img_path)
 
-        # OCR na imagem
-        print(f"🧠 Executando OCR na página {os.path.basename(img_path)}...")
-        # Ajusta tamanho da imagem para garantir DPI adequado
-        ocr_pdf_bytes = pytesseract.image_to_pdf_or_hocr(
-            img.resize((img.width * 2, img.height * 2), Image.LANCZOS),
-            extension='pdf',
-            lang='por+eng'
-        )
-        ocr_pdf = fitz.open("pdf", ocr_pdf_bytes)
-
         # Copia a camada OCR para o PDF principal
+        ocr_pdf = fitz.open("pdf", ocr_pdf_bytes)
         page.show_pdf_page(img_rect, ocr_pdf, 0)
+        ocr_pdf.close()
 
         print(f"✅ OCR embutido na página {os.path.basename(img_path)}")
 
     pdf.save(output_path)
     pdf.close()
-    print(f"📄 PDF com OCR salvo em {output_path}")
 
 
-def save_images_to_pdf(image_paths, output_path):
+def _count_pdf(output_path, pages):
+    metrics.count("pdf_pages", pages)
+    metrics.count("pdf_bytes", os.path.getsize(output_path))
+
+
+def text_layer_content(layer, width, height):
+    """
+    Operadores PDF que escrevem os trechos de texto do DOM como texto
+    invisível (modo 3 Tr) sobre a imagem, convertendo de pixels CSS para
+    o tamanho da imagem e esticando cada trecho (Tz) para ocupar a mesma
+    largura do original. Usa a Helvetica padrão com WinAnsiEncoding.
+    """
+    import fitz
+
+    sx = width / layer["width"] if layer.get("width") else 1
+    sy = height / layer["height"] if layer.get("height") else 1
+
+    ops = ["BT 3 Tr"]
+    for run in layer["runs"]:
+        fontsize = run["size"] * sy
+        if fontsize <= 0:
+            continue
+        text = run["text"].encode("cp1252", errors="replace")
+        text_width = fitz.get_text_length(text.decode("cp1252"), fontname="helv", fontsize=fontsize)
+        if text_width <= 0:
+            continue
+        # Linha de base aproximada: 80% da altura da caixa do trecho
+        x = run["x"] * sx
+        y = height - (run["y"] + run["height"] * 0.8) * sy
+        stretch = 100 * run["width"] * sx / text_width
+        escaped = text.replace(b"\\", b"\\\\").replace(b"(", b"\\(").replace(b")", b"\\)")
+        ops.append(f"/F1 {fontsize:.2f} Tf {stretch:.2f} Tz 1 0 0 1 {x:.2f} {y:.2f} Tm ("
+                   + escaped.decode("latin-1") + ") Tj")
+    ops.append("ET")
+    return "\n".join(ops).encode("latin-1")
+
+
+def load_text_layer(img_path):
+    """
+    Camada de texto (JSON gerado pelo extract_text) de uma página, ou None.
+    """
+    layer_path = os.path.splitext(img_path)[0] + ".json"
+    if not os.path.exists(layer_path):
+        return None
+    with open(layer_path, encoding="utf-8") as f:
+        return json.load(f)
+
+
+@metrics.timed("pdf")
+def save_dom_text_to_pdf(image_paths, output_path):
+    """
+    Gera um PDF visual (com as imagens) e embute como texto invisível a
+    camada de texto lida do DOM pelo extract_text, sem OCR. Páginas sem
+    o JSON da camada de texto entram só com a imagem.
+    """
+    with StreamingPdfWriter(output_path) as writer:
+        for img_path in image_paths:
+            layer = load_text_layer(img_path)
+            writer.add_image(img_path, text_layer=layer)
+            if layer is None:
+                print(f"⚠️ Sem camada de texto para {os.path.basename(img_path)}")
+            else:
+                print(f"✅ Texto embutido na página {os.path.basename(img_path)}")
+    _count_pdf(output_path, writer.page_count)
+
+    print(f"📄 PDF com texto pesquisável salvo em {output_path}")
+
+
+class StreamingPdfWriter:
+    """
+    Escreve um PDF de imagens página a página direto no disco, mantendo em
+    memória apenas a página atual. JPEGs são embutidos como estão
+    (DCTDecode, sem decodificar e recodificar); os demais formatos (PNGs
+    dos screenshots) são convertidos e recomprimidos com Flate.
+    Cada imagem vira uma página do mesmo tamanho, 1px = 1pt.
+    """
+
+    def __init__(self, output_path):
+        self.output_path = output_path
+        self._file = open(output_path, "wb")
+        self._offsets = {}
+        self._page_ids = []
+        self._font = None
+        # 1 = Catalog e 2 = Pages são escritos no fechamento
+        self._next_id = 3
+        self._file.write(b"%PDF-1.4\n%\xe2\xe3\xcf\xd3\n")
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+
+    @property
+    def page_count(self):
+        return len(self._page_ids)
+
+    def _new_id(self):
+        obj_id = self._next_id
+        self._next_id += 1
+        return obj_id
+
+    def _begin_object(self, obj_id):
+        self._offsets[obj_id] = self._file.tell()
+        self._file.write(f"{obj_id} 0 obj\n".encode())
+
+    def _write_object(self, obj_id, body):
+        self._begin_object(obj_id)
+        self._file.write(body.encode() + b"\nendobj\n")
+
+    def _write_stream(self, obj_id, header, chunks):
+        """
+        Escreve um objeto stream a partir de um iterável de blocos de bytes.
+        O /Length é calculado enquanto os blocos são gravados.
+        """
+        length_id = self._new_id()
+        self._begin_object(obj_id)
+        self._file.write(f"<< {header} /Length {length_id} 0 R >>\nstream\n".encode())
+        length = 0
+        for chunk in chunks:
+            self._file.write(chunk)
+            length += len(chunk)
+        self._file.write(b"\nendstream\nendobj\n")
+        self._write_object(length_id, str(length))
+
+    def add_image(self, img_path, text_layer=None):
+        """
+        Acrescenta uma página com a imagem `img_path` e, opcionalmente, a
+        camada de texto invisível `text_layer` (ver text_layer_content).
+        """
+        from PIL import Image
+
+        with open(img_path, "rb") as f:
+            is_jpeg = f.read(2) == b"\xff\xd8"
+
+        with Image.open(img_path) as img:
+            width, height = img.size
+            if is_jpeg and img.mode in ("L", "RGB", "CMYK"):
+                header = self._jpeg_header(img.mode, width, height)
+                chunks = _read_chunks(img_path)
+            else:
+                header, chunks = self._flate_image(img, width, height)
+
+            image_id = self._new_id()
+            self._write_stream(image_id, header, chunks)
+
+        self._add_page(image_id, width, height, text_layer)
+
+    def add_compressed(self, page, text_layer=None):
+        """
+        Como `add_image`, mas com a imagem já codificada por
+        compression.compress_page; a página mantém o tamanho da original.
+        """
+        image_id = self._new_id()
+        self._write_stream(image_id, page["header"], [page["data"]])
+        self._add_page(image_id, page["width"], page["height"], text_layer)
+
+    def _add_page(self, image_id, width, height, text_layer):
+        content = f"q {width} 0 0 {height} 0 0 cm /Im0 Do Q".encode()
+        fonts = ""
+        if text_layer and text_layer.get("runs"):
+            content += b"\n" + text_layer_content(text_layer, width, height)
+            fonts = f" /Font << /F1 {self._font_id()} 0 R >>"
+        content_id = self._new_id()
+        self._write_stream(content_id, "", [content])
+
+        page_id = self._new_id()
+        self._write_object(page_id, (
+            f"<< /Type /Page /Parent 2 0 R /MediaBox [0 0 {width} {height}] "
+            f"/Resources << /XObject << /Im0 {image_id} 0 R >>{fonts} >> /Contents {content_id} 0 R >>"
+        ))
+        self._page_ids.append(page_id)
+
+    def _font_id(self):
+        # A fonte da camada de texto é escrita uma única vez e compartilhada
+        if self._font is None:
+            self._font = self._new_id()
+            self._write_object(self._font, "<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica "
+                                           "/Encoding /WinAnsiEncoding >>")
+        return self._font
+
+    @staticmethod
+    def _jpeg_header(mode, width, height):
+        colorspace = {"L": "/DeviceGray", "RGB": "/DeviceRGB", "CMYK": "/DeviceCMYK"}[mode]
+        header = (f"/Type /XObject /Subtype /Image /Width {width} /Height {height} "
+                  f"/ColorSpace {colorspace} /BitsPerComponent 8 /Filter /DCTDecode")
+        if mode == "CMYK":
+            # JPEGs CMYK do Photoshop/Adobe vêm com os canais invertidos
+            header += " /Decode [1 0 1 0 1 0 1 0]"
+        return header
+
+    @staticmethod
+    def _flate_image(img, width, height):
+        if img.mode not in ("L", "RGB"):
+            img = img.convert("RGB")
+        colorspace = "/DeviceGray" if img.mode == "L" else "/DeviceRGB"
+        header = (f"/Type /XObject /Subtype /Image /Width {width} /Height {height} "
+                  f"/ColorSpace {colorspace} /BitsPerComponent 8 /Filter /FlateDecode")
+        compressor = zlib.compressobj(6)
+        data = compressor.compress(img.tobytes()) + compressor.flush()
+        return header, [data]
+
+    def close(self):
+        if self._file.closed:
+            return
+        kids = " ".join(f"{page_id} 0 R" for page_id in self._page_ids)
+        self._write_object(2, f"<< /Type /Pages /Kids [{kids}] /Count {len(self._page_ids)} >>")
+        self._write_object(1, "<< /Type /Catalog /Pages 2 0 R >>")
+
+        xref_offset = self._file.tell()
+        size = self._next_id
+        self._file.write(f"xref\n0 {size}\n".encode())
+        self._file.write(b"0000000000 65535 f \n")
+        for obj_id in range(1, size):
+            self._file.write(f"{self._offsets[obj_id]:010d} 00000 n \n".encode())
+        self._file.write(f"trailer\n<< /Size {size} /Root 1 0 R >>\nstartxref\n{xref_offset}\n%%EOF\n".encode())
+        self._file.close()
+
+
+def _read_chunks(path, chunk_size=1 << 16):
+    with open(path, "rb") as f:
+        while True:
+            chunk = f.read(chunk_size)
+            if not chunk:
+                break
+            yield chunk
+
+
+def _prepared_pages(pages, profile, page_budget=None, workers=None):
+    """
+    Gera (índice, caminho, página recomprimida ou None) para cada item de
+    `pages`; sem `profile` as imagens vão para o PDF como estão.
+    """
+    if profile is None:
+        for i, img_path in pages:
+            yield i, img_path, None
+    else:
+        yield from compress_pages(pages, profile, target_bytes=page_budget, workers=workers)
+
+
+def _add_page(writer, img_path, compressed, text_layer, stats):
+    if compressed is None:
+        writer.add_image(img_path, text_layer=text_layer)
+        return
+    writer.add_compressed(compressed, text_layer=text_layer)
+    stats["bytes_in"] += compressed["bytes_in"]
+    stats["bytes_out"] += compressed["bytes_out"]
+    stats["kinds"][compressed["kind"]] = stats["kinds"].get(compressed["kind"], 0) + 1
+
+
+def _compression_stats():
+    return {"bytes_in": 0, "bytes_out": 0, "kinds": {}, "started": time.perf_counter()}
+
+
+def _report_compression(profile, stats):
+    if profile is None or not stats["kinds"]:
+        return
+    metrics.count("compress_bytes_in", stats["bytes_in"])
+    metrics.count("compress_bytes_out", stats["bytes_out"])
+    name = profile if isinstance(profile, str) else "personalizado"
+    print(f"🗜️ Perfil {name}: {describe(stats, time.perf_counter() - stats['started'])}")
+
+
+@metrics.timed("pdf")
+def save_images_to_pdf(image_paths, output_path, profile=None, target_bytes=None, workers=None):
+    """
+    Gera um PDF visual somente com imagens (sem OCR), uma página por vez,
+    sem manter todas as imagens decodificadas em memória.
+
+    Com `profile` (ver compression.COMPRESSION_PROFILES), as páginas são
+    recomprimidas em paralelo antes de entrar no PDF; `target_bytes` é o
+    tamanho desejado para o PDF inteiro, dividido igualmente entre as
+    páginas.
+    """
+    page_budget = target_bytes // max(1, len(image_paths)) if target_bytes else None
+    stats = _compression_stats()
+    with StreamingPdfWriter(output_path) as writer:
+        for _, img_path, compressed in _prepared_pages(enumerate(image_paths), profile, page_budget, workers):
+            _add_page(writer, img_path, compressed, None, stats)
+    _count_pdf(output_path, writer.page_count)
+    _report_compression(profile, stats)
+    print(f"📄 PDF de imagens salvo em {output_path}")
+
+
+def rebuild_pdf_from_cache(url, output_path, cache=None, profile=None, target_bytes=None, workers=None):
+    """
+    Refaz o PDF de um documento já extraído usando só as páginas guardadas
+    no cache (sem navegador nem rede), com a camada de texto do DOM quando
+    o cache a tiver. `profile` e `target_bytes` são os de
+    save_images_to_pdf. Retorna False se o documento não estiver completo
+    no cache.
+    """
+    cache = cache or default_cache()
+    image_paths = cache.document_pages(url)
+    if image_paths is None:
+        print(f"❌ Documento não encontrado no cache: {url}")
+        return False
+    layer_paths = cache.document_text_layers(url) or [None] * len(image_paths)
+
+    page_budget = target_bytes // max(1, len(image_paths)) if target_bytes else None
+    stats = _compression_stats()
+    part_path = output_path + ".part"
+    try:
+        with StreamingPdfWriter(part_path) as writer:
+            for i, img_path, compressed in _prepared_pages(enumerate(image_paths), profile, page_budget, workers):
+                layer = None
+                if layer_paths[i]:
+                    with open(layer_paths[i], encoding="utf-8") as f:
+                        layer = json.load(f)
+                _add_page(writer, img_path, compressed, layer, stats)
+        os.replace(part_path, output_path)
+    finally:
+        if os.path.exists(part_path):
+            os.remove(part_path)
+    _count_pdf(output_path, writer.page_count)
+    _report_compression(profile, stats)
+    print(f"📄 PDF refeito do cache em {output_path}")
+    return True
+
+
+def _in_order(pages, start=0):
+    """
+    Reordena tuplas (índice, caminho) que chegam fora de ordem, liberando
+    cada página assim que todas as anteriores já foram liberadas.
+    """
+    pending = {}
+    next_index = start
+    for i, path in pages:
+        pending[i] = path
+        while next_index in pending:
+            yield next_index, pending.pop(next_index)
+            next_index += 1
+    # Sobras (índices com buraco antes deles) saem em ordem no final
+    for i in sorted(pending):
+        yield i, pending[i]
+
+
+def _remove_page_files(img_path):
+    os.remove(img_path)
+    layer_path = os.path.splitext(img_path)[0] + ".json"
+    if os.path.exists(layer_path):
+        os.remove(layer_path)
+
+
+def render_pages(pages, output_path, text_layers=False, ocr=False, delete=False, queue_size=8, start=0,
+                 lang='por+eng', scale=None, workers=None, cache_dir=OCR_CACHE_DIR, profile=None, page_budget=None,
+                 check=None):
+    """
+    Monta o PDF enquanto as páginas ainda estão sendo capturadas/baixadas.
+    `pages` é um iterável de (índice, caminho), possivelmente fora de ordem
+    (ex.: extractor_scan.iter_images ou extractor_text.iter_text_pages),
+    consumido numa thread produtora e entregue por uma fila limitada a
+    `queue_size` itens. Cada página é anexada ao PDF na ordem dos índices
+    e, com `delete`, seu arquivo temporário é apagado logo em seguida. O
+    PDF é escrito em `output_path + ".part"` e só é renomeado para
+    `output_path` se todas as páginas chegarem sem erro.
+
+    Sem `ocr`, o PDF é escrito em streaming (StreamingPdfWriter), com a
+    camada de texto do DOM se `text_layers`. Com `ocr`, cada página vai
+    para o pool de OCR assim que chega e as camadas são inseridas em ordem.
+    Retorna o número de páginas escritas.
+
+    `profile` recomprime as páginas (sem `ocr`) num pool de `workers`
+    processos, com até `page_budget` bytes por página (ver
+    compression.compress_page).
+
+    `check` (um pagecheck.PageChecker) confere cada página, na ordem,
+    antes de ela entrar no PDF: páginas em branco ou repetidas são
+    descartadas, capturadas de novo ou só marcadas, e não passam pelo OCR.
+    """
+    page_queue = queue.Queue(maxsize=queue_size)
+    end_marker = object()
+    stop = threading.Event()
+    errors = []
+
+    def offer(item):
+        # Não bloqueia para sempre se o consumidor parou com erro
+        while not stop.is_set():
+            try:
+                page_queue.put(item, timeout=0.1)
+                return True
+            except queue.Full:
+                pass
+        return False
+
+    source = pages
+    if check is not None:
+        # A verificação roda na thread produtora porque a nova captura das
+        # páginas suspeitas usa o mesmo navegador do extrator; as páginas
+        # descartadas chegam sem caminho
+        source = check.filter(_in_order(pages, start))
+
+    def produce():
+        try:
+            for item in source:
+                if not offer(item):
+                    break
+        except BaseException as e:
+            errors.append(e)
+        finally:
+            if stop.is_set():
+                for generator in (source, pages):
+                    if hasattr(generator, "close"):
+                        generator.close()
+            offer(end_marker)
+
+    def arrivals():
+        while True:
+            item = page_queue.get()
+            if item is end_marker:
+                return
+            yield item
+
+    producer = threading.Thread(target=metrics.bind(produce), daemon=True)
+    producer.start()
+
+    # O PDF só ganha o nome final quando todas as páginas foram escritas
+    # sem erro; as páginas já anexadas são apagadas mesmo assim, e uma nova
+    # execução as recupera pelo manifesto ou pelo cache
+    part_path = output_path + ".part"
+    try:
+        ordered = _in_order(arrivals(), start)
+        if check is not None:
+            ordered = ((i, img_path) for i, img_path in ordered if img_path is not None)
+
+        if ocr:
+            count = _render_ocr_pages(ordered, part_path, delete, lang, scale, workers, cache_dir,
+                                      skip=check.skip_ocr if check is not None else ())
+        else:
+            count = 0
+            stats = _compression_stats()
+            with StreamingPdfWriter(part_path) as writer:
+                for i, img_path, compressed in _prepared_pages(ordered, profile, page_budget, workers):
+                    with metrics.span("pdf_page", detail=True):
+                        _add_page(writer, img_path, compressed,
+                                  load_text_layer(img_path) if text_layers else None, stats)
+                    if delete:
+                        _remove_page_files(img_path)
+                    count += 1
+                    print(f"🧩 Página {i+1} anexada ao PDF")
+
+        producer.join()
+        if errors:
+            raise errors[0]
+        os.replace(part_path, output_path)
+    finally:
+        stop.set()
+        while True:
+            try:
+                page_queue.get_nowait()
+            except queue.Empty:
+                break
+        producer.join()
+        if os.path.exists(part_path):
+            os.remove(part_path)
+
+    if check is not None:
+        if delete:
+            check.remove_dropped()
+        check.print_report()
+    if not ocr:
+        _report_compression(profile, stats)
+    _count_pdf(output_path, count)
+    print(f"📄 PDF salvo em {output_path} ({count} páginas)")
+    return count
+
+
+@metrics.timed("pdf")
+def update_pdf(pdf_path, pages, text_layers=False, ocr=False, delete=False,
+               lang='por+eng', scale=None, workers=None, cache_dir=OCR_CACHE_DIR, profile=None, page_budget=None,
+               check=None):
     """
-    Gera um PDF visual somente com imagens (sem OCR).
+    Substitui ou acrescenta páginas num PDF já existente, sem reescrevê-lo:
+    `pages` é um iterável de (índice, caminho) como o de `render_pages`;
+    índices que já existem no PDF têm a página trocada e os seguintes ao
+    fim são acrescentados. As páginas novas são montadas como no
+    `render_pages` (camada de texto do DOM ou OCR, `profile`) e gravadas com o
+    salvamento incremental do fitz, que só anexa as mudanças ao arquivo.
+    Com `check`, páginas descartadas por ele mantêm a versão que já estava
+    no PDF. Retorna o número de páginas alteradas.
     """
-    images = [Image.open(img).convert('RGB') for img in image_paths]
-    images[0].save(output_path, save_all=True, append_images=images[1:])
-    print(f"📄 PDF de imagens salvo em {output_path}")
\ No newline at end of file
+    import fitz
+
+    ordered = sorted(dict(pages).items())
+    if check is not None:
+        ordered = sorted((i, path) for i, path in check.filter(ordered) if path is not None)
+        if delete:
+            check.remove_dropped()
+        check.print_report()
+    if not ordered:
+        print("⚠️ Nenhuma página para atualizar")
+        return 0
+    indices = [i for i, _ in ordered]
+    image_paths = [path for _, path in ordered]
+
+    doc = fitz.open(pdf_path)
+    tmp_path = pdf_path + ".paginas.tmp"
+    rewritten = False
+    try:
+        existing = doc.page_count
+        appended = [i for i in indices if i >= existing]
+        if appended != list(range(existing, existing + len(appended))):
+            raise ValueError(f"O PDF tem {existing} páginas; a página {appended[0] + 1} deixaria um buraco")
+
+        if ocr:
+            layers = ocr_pages(image_paths, lang=lang, scale=scale, workers=workers, cache_dir=cache_dir)
+            _insert_ocr_layers(image_paths, layers, tmp_path)
+        else:
+            stats = _compression_stats()
+            with StreamingPdfWriter(tmp_path) as writer:
+                for _, img_path, compressed in _prepared_pages(ordered, profile, page_budget, workers):
+                    _add_page(writer, img_path, compressed,
+                              load_text_layer(img_path) if text_layers else None, stats)
+            _report_compression(profile, stats)
+
+        with fitz.open(tmp_path) as new_pages:
+            for j, i in enumerate(indices):
+                with metrics.span("pdf_page", detail=True):
+                    if i < existing:
+                        doc.delete_page(i)
+                    doc.insert_pdf(new_pages, from_page=j, to_page=j, start_at=i)
+
+        if doc.can_save_incrementally():
+            doc.saveIncr()
+        else:
+            # Arquivos reparados pelo fitz ao abrir não aceitam salvamento
+            # incremental; nesse caso o PDF é regravado por inteiro
+            doc.save(tmp_path + ".pdf", garbage=1)
+            rewritten = True
+    finally:
+        doc.close()
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+    if rewritten:
+        os.replace(tmp_path + ".pdf", pdf_path)
+
+    if delete:
+        for img_path in image_paths:
+            _remove_page_files(img_path)
+    metrics.count("pdf_pages", len(indices))
+    print(f"📄 PDF atualizado em {pdf_path}: {len(indices) - len(appended)} páginas substituídas, "
+          f"{len(appended)} acrescentadas")
+    return len(indices)
+
+
+def _render_ocr_pages(ordered, output_path, delete, lang, scale, workers, cache_dir, skip=()):
+    os.makedirs(cache_dir, exist_ok=True)
+    import fitz
+    from PIL import Image
+
+    workers = workers or os.cpu_count() or 1
+    pdf = fitz.open()
+    in_flight = deque()
+
+    @metrics.timed("ocr_page", detail=True)
+    def insert_next():
+        i, img_path, future = in_flight.popleft()
+        with Image.open(img_path) as img:
+            width, height = img.size
+        page = pdf.new_page(width=width, height=height)
+        img_rect = fitz.Rect(0, 0, width, height)
+        page.insert_image(img_rect, filename=img_path)
+        if future is not None:
+            ocr_pdf = fitz.open("pdf", future.result())
+            page.show_pdf_page(img_rect, ocr_pdf, 0)
+            ocr_pdf.close()
+            metrics.count("ocr_pages")
+            print(f"✅ OCR embutido na página {i+1}")
+        else:
+            print(f"⏭️ Página {i+1} anexada sem OCR")
+        if delete:
+            _remove_page_files(img_path)
+
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        for i, img_path in ordered:
+            future = None if i in skip else pool.submit(_ocr_page_cached, img_path, lang, scale,
+                                                        tesseract_path, cache_dir)
+            in_flight.append((i, img_path, future))
+            # Mantém no máximo ~2 páginas por processo aguardando na page_queue
+            while len(in_flight) > workers * 2 or (in_flight and (in_flight[0][2] is None
+                                                                  or in_flight[0][2].done())):
+                insert_next()
+        while in_flight:
+            insert_next()
+
+    count = pdf.page_count
+    pdf.save(output_path)
+    pdf.close()
+    return count
@@ -0,0 +1,338 @@
+import os
+from extractor_text import setup_driver, hardcore_block, scroll_page_smooth, classify_document
+from extractor_text import extract_text, extract_text_pdf, iter_text_pages, capture_settings
+from extractor_scan import extract_images, iter_images
+from manifest import MANIFEST_NAME, Manifest
+from netcapture import NetworkRecorder
+from blocking import BLOCK_PRESETS, apply_block_profile
+from lazyload import PAGE_SELECTOR, wait_for_pages, reload_pages
+from sharding import extract_text_sharded, extract_images_sharded
+from renderer import render_pages, update_pdf
+from pagerange import parse_pages, parse_ranges, format_pages
+from pagecheck import PageChecker
+from metrics import Metrics, print_sink, span, count
+
+
+class DocumentSession:
+    """
+    Abre o navegador uma única vez para um documento do Scribd: carrega a
+    página, limpa bloqueios e faz o scroll completo. A detecção do tipo é
+    feita sobre o DOM já carregado e o mesmo driver é repassado ao extrator
+    correspondente, evitando um segundo carregamento e scroll.
+
+    Se `driver` for informado (ex.: de um pool de navegadores), ele é usado
+    no lugar de um novo e não é fechado ao final da sessão.
+
+    Com `shards` > 1, só a primeira página é carregada na abertura e a
+    extração é dividida em faixas de páginas, cada uma no seu navegador
+    (ver sharding.py).
+
+    `block_profile` define as requisições bloqueadas antes da navegação
+    (ver blocking.py): "auto" bloqueia o perfil "common" e, depois de
+    classificar a primeira página, o perfil do tipo; None não bloqueia.
+
+    Com `pages` (índices a partir de 0 ou uma seleção como "1-50,120-",
+    ver pagerange.py), só essas páginas são carregadas e extraídas, sempre
+    de novo, ignorando o cache; a divisão em `shards` não se aplica. Uma
+    seleção em texto é resolvida na abertura, quando o total de páginas
+    do documento é conhecido.
+
+    `capture_scale` é o fator de escala das capturas dos documentos de
+    texto (2 = 192 DPI; ver extractor_text.iter_text_pages).
+    """
+
+    def __init__(self, url, driver=None, shards=1, block_profile="auto", pages=None, capture_scale=1):
+        self.url = url
+        self.capture_scale = capture_scale
+        self.page_spec = pages if isinstance(pages, str) else None
+        self.pages = sorted(pages) if pages is not None and self.page_spec is None else None
+        self.shards = 1 if pages is not None else shards
+        self.block_profile = block_profile
+        self.driver = driver
+        self.own_driver = driver is None
+        self.doc_type = None
+        self.recorder = None
+        self._manifests = {}
+
+    def __enter__(self):
+        self.open()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+
+    def open(self):
+        if self.driver is None:
+            self.driver = setup_driver()
+        try:
+            # Registra as imagens recebidas para não baixá-las de novo
+            self.recorder = NetworkRecorder(self.driver).start()
+            auto_block = self.block_profile == "auto"
+            if self.block_profile:
+                apply_block_profile(self.driver, "common" if auto_block else self.block_profile)
+            print(f"🌐 Tentando acessar: {self.url}")
+            self.driver.set_page_load_timeout(30)
+            with span("page_load"):
+                self.driver.get(self.url)
+            print("✅ Página carregada com sucesso")
+
+            print("🔒 Limpando bloqueios e modais...")
+            hardcore_block(self.driver)
+
+            if self.page_spec is not None:
+                total = self.page_count()
+                self.pages = parse_pages(self.page_spec, total=total)
+                if not self.pages:
+                    raise ValueError(f"Nenhuma página de {self.page_spec!r} existe no documento ({total} páginas)")
+
+            first = self.pages[:1] if self.pages else None
+            if auto_block:
+                # O tipo só é conhecido com a primeira página no DOM; o perfil
+                # dele vale para o restante do carregamento
+                wait_for_pages(self.driver, page_range=None if first else (0, 1), pages=first)
+                tipo = self.detect_type()
+                if tipo in BLOCK_PRESETS:
+                    apply_block_profile(self.driver, tipo)
+
+            if self.pages is not None:
+                # Com o driver da sessão os extratores não esperam de novo:
+                # todas as páginas escolhidas são carregadas aqui
+                wait_for_pages(self.driver, pages=self.pages)
+            elif self.shards > 1:
+                # O restante das páginas é carregado por faixa na extração
+                wait_for_pages(self.driver, page_range=(0, 1))
+            else:
+                print("📜 Fazendo scroll para carregar todas as páginas...")
+                scroll_page_smooth(self.driver)
+            self.report_network()
+        except Exception:
+            self.close()
+            raise
+
+    def report_network(self):
+        """
+        Mostra quantas requisições foram feitas, quantas o perfil de
+        bloqueio barrou e quantos bytes chegaram de fato pela rede.
+        """
+        if self.recorder is None or not self.recorder.enabled:
+            return None
+        stats = self.recorder.stats()
+        count("network_requests", stats["requests"])
+        count("network_blocked", stats["blocked"])
+        count("network_bytes", stats["bytes_loaded"])
+        print(f"🚫 {stats['blocked']} de {stats['requests']} requisições bloqueadas, "
+              f"{stats['bytes_loaded'] / 1024 / 1024:.1f} MB baixados")
+        return stats
+
+    def detect_type(self):
+        """
+        Retorna "text", "scan" ou "unknown" a partir do DOM já carregado.
+        """
+        if self.doc_type is None:
+            self.doc_type = classify_document(self.driver)
+        return self.doc_type
+
+    def extract(self, output_folder):
+        """
+        Extrai as páginas com o extrator adequado ao tipo detectado,
+        reaproveitando o driver da sessão. Retorna a lista de arquivos.
+        """
+        tipo = self.detect_type()
+        if self.shards > 1 and tipo == "text":
+            return extract_text_sharded(self.url, self.shards, driver=self.driver, output_folder=output_folder,
+                                        scale=self.capture_scale)
+        elif self.shards > 1 and tipo == "scan":
+            return extract_images_sharded(self.url, output_folder, self.shards, driver=self.driver)
+        elif tipo == "text":
+            return extract_text(self.url, driver=self.driver, output_folder=output_folder, scale=self.capture_scale)
+        elif tipo == "scan":
+            return extract_images(self.url, output_folder, driver=self.driver, recorder=self.recorder)
+        return []
+
+    def iter_pages(self, output_folder):
+        """
+        Como `extract`, mas gera tuplas (índice, caminho) à medida que cada
+        página fica pronta, para o renderer montar o PDF em paralelo.
+        """
+        tipo = self.detect_type()
+        if self.shards > 1:
+            yield from enumerate(self.extract(output_folder))
+        elif tipo == "text":
+            yield from iter_text_pages(self.url, driver=self.driver, output_folder=output_folder,
+                                       pages=self.pages, refresh=self.pages is not None, scale=self.capture_scale,
+                                       manifest=self.manifest(output_folder))
+        elif tipo == "scan":
+            yield from iter_images(self.url, output_folder, driver=self.driver, recorder=self.recorder,
+                                   pages=self.pages, refresh=self.pages is not None,
+                                   manifest=self.manifest(output_folder))
+
+    def manifest(self, output_folder):
+        """
+        Manifest da pasta `output_folder`, um só por sessão: a extração e a
+        nova captura das páginas suspeitas atualizam o mesmo registro em
+        memória, em vez de um sobrescrever o outro no disco. É salvo no
+        `close`.
+        """
+        if output_folder not in self._manifests:
+            settings = capture_settings(scale=self.capture_scale) if self.detect_type() == "text" else None
+            self._manifests[output_folder] = Manifest(output_folder, self.url, settings)
+        return self._manifests[output_folder]
+
+    def recapture(self, output_folder, indices):
+        """
+        Extrai de novo as páginas `indices`, ignorando o cache, e gera
+        (índice, caminho) como `iter_pages`. Usado pelo PageChecker para
+        páginas em branco ou repetidas. As páginas são levadas de novo à
+        área visível antes, para o lazy loading carregar o conteúdo que
+        faltou na primeira vez.
+        """
+        tipo = self.detect_type()
+        reload_pages(self.driver, indices)
+        if tipo == "text":
+            yield from iter_text_pages(self.url, driver=self.driver, output_folder=output_folder,
+                                       pages=indices, refresh=True, scale=self.capture_scale,
+                                       manifest=self.manifest(output_folder))
+        elif tipo == "scan":
+            yield from iter_images(self.url, output_folder, driver=self.driver, recorder=self.recorder,
+                                   pages=indices, refresh=True, manifest=self.manifest(output_folder))
+
+    def page_count(self):
+        """
+        Número de páginas do documento (ou da seleção), contado nos
+        contêineres de página que o Scribd põe no DOM desde o início.
+        """
+        if self.pages is not None:
+            return len(self.pages)
+        return self.driver.execute_script(f"return document.querySelectorAll({PAGE_SELECTOR!r}).length;")
+
+    def save_vector_pdf(self, output_path):
+        """
+        Para documentos de texto, gera o PDF vetorial direto do navegador
+        (Page.printToPDF), sem screenshots nem OCR.
+        """
+        if self.detect_type() != "text":
+            raise ValueError("PDF vetorial só é suportado para documentos de texto")
+        if self.shards > 1:
+            scroll_page_smooth(self.driver)
+        return extract_text_pdf(self.url, output_path, driver=self.driver)
+
+    def close(self):
+        for manifest in self._manifests.values():
+            manifest.save()
+        self._manifests.clear()
+        if self.driver is not None and self.own_driver:
+            self.driver.quit()
+        self.driver = None
+
+
+def remove_manifest(pasta_paginas):
+    manifesto = os.path.join(pasta_paginas, MANIFEST_NAME)
+    if os.path.exists(manifesto):
+        os.remove(manifesto)
+
+
+def process_document(url, nome, pasta, manter_png=False, vetorial=True, driver=None, pasta_paginas=None,
+                     shards=1, metrics=None, paginas=None, perfil=None, tamanho_alvo_mb=None, verificar="flag",
+                     escala=1):
+    """
+    Fluxo completo de um documento: detecta o tipo, extrai as páginas e
+    gera o PDF em `pasta`/`nome`.pdf. As páginas temporárias ficam em
+    `pasta_paginas` (por padrão a própria `pasta`). `shards` divide a
+    extração entre vários navegadores (ver DocumentSession). Retorna um
+    dict com tipo, caminho do PDF e número de páginas; lança exceção em
+    caso de erro.
+
+    Tempos das etapas e contadores vão para `metrics` (um
+    metrics.Metrics; por padrão um novo, que só imprime no log).
+
+    `paginas` (ex.: "1-50,120") limita o trabalho a essas páginas,
+    numeradas a partir de 1: se o PDF já existe, elas são substituídas ou
+    acrescentadas nele com salvamento incremental (para corrigir uma
+    página ruim ou pegar páginas novas sem baixar o resto); senão o PDF
+    é gerado só com elas. Nesse modo o PDF é sempre montado a partir das
+    capturas, mesmo com `vetorial`.
+
+    `perfil` recomprime as páginas capturadas/baixadas (ver
+    compression.COMPRESSION_PROFILES) e `tamanho_alvo_mb` limita o PDF a
+    esse tamanho, dividido igualmente entre as páginas. O PDF vetorial não
+    é afetado.
+
+    `verificar` define o que fazer com páginas em branco ou repetidas (ver
+    pagecheck.PageChecker): "flag" só registra, "drop" tira do PDF,
+    "recapture" captura de novo e None desliga a verificação. O que foi
+    encontrado volta em "verificacao".
+
+    `escala` é o fator de escala das capturas de documentos de texto no
+    modo raster: 2 ou 3 deixam o PDF nítido na impressão (o OCR passa a
+    usar os pixels capturados sem ampliar).
+    """
+    if metrics is None:
+        metrics = Metrics(job=nome, sinks=[print_sink])
+    if isinstance(paginas, str):
+        # Confere a sintaxe antes de abrir o navegador; os intervalos abertos
+        # só são resolvidos com o total de páginas, já com o documento aberto
+        parse_ranges(paginas)
+    with metrics.activate(), span("document"):
+        return _process_document(url, nome, pasta, manter_png, vetorial, driver, pasta_paginas, shards, paginas,
+                                 perfil, tamanho_alvo_mb, verificar, escala)
+
+
+def _process_document(url, nome, pasta, manter_png, vetorial, driver, pasta_paginas, shards, paginas=None,
+                      perfil=None, tamanho_alvo_mb=None, verificar="flag", escala=1):
+    pdf_path = os.path.join(pasta, f'{nome}.pdf')
+    os.makedirs(pasta, exist_ok=True)
+
+    with DocumentSession(url, driver=driver, shards=shards, pages=paginas or None, capture_scale=escala) as sessao:
+        selecao = sessao.pages
+        if selecao is not None:
+            print(f"📑 Páginas selecionadas: {format_pages(selecao)}")
+        print('🔍 Detectando tipo de documento...')
+        tipo = sessao.detect_type()
+
+        if tipo == 'text' and vetorial and selecao is None:
+            print("📘 Documento identificado como TEXTO.")
+            sessao.save_vector_pdf(pdf_path)
+            print(f'✅ PDF salvo em {pdf_path}')
+            return {"tipo": tipo, "pdf": pdf_path, "paginas": None, "verificacao": None}
+
+        elif tipo == 'text':
+            print("📘 Documento identificado como TEXTO.")
+            print('📥 Baixando páginas (texto)...')
+
+        elif tipo == 'scan':
+            print("📕 Documento identificado como SCAN.")
+            print('📥 Baixando imagens...')
+
+        else:
+            raise RuntimeError("Documento não reconhecido ou não suportado.")
+
+        pasta_trabalho = pasta_paginas or pasta
+        verificacao = None
+        if verificar:
+            verificacao = PageChecker(verificar, recapture=lambda indices: sessao.recapture(pasta_trabalho, indices))
+
+        orcamento = None
+        if tamanho_alvo_mb:
+            perfil = perfil or "balanced"
+            orcamento = int(tamanho_alvo_mb * 1024 * 1024) // max(1, sessao.page_count())
+
+        if selecao is not None and os.path.exists(pdf_path):
+            print('🩹 Atualizando páginas do PDF existente...')
+            paginas = update_pdf(pdf_path, sessao.iter_pages(pasta_trabalho),
+                                 text_layers=(tipo == 'text'), delete=not manter_png,
+                                 profile=perfil, page_budget=orcamento, check=verificacao)
+        else:
+            # Captura/download e montagem do PDF acontecem ao mesmo tempo
+            print('🗜️ Gerando PDF conforme as páginas chegam...')
+            paginas = render_pages(sessao.iter_pages(pasta_trabalho), pdf_path,
+                                   text_layers=(tipo == 'text'), delete=not manter_png,
+                                   start=selecao[0] if selecao else 0,
+                                   profile=perfil, page_budget=orcamento, check=verificacao)
+
+    if not manter_png:
+        remove_manifest(pasta_paginas or pasta)
+        print('🗑️ PNGs temporários removidos.')
+
+    print(f'✅ PDF salvo em {pdf_path}')
+    return {"tipo": tipo, "pdf": pdf_path, "paginas": paginas,
+            "verificacao": verificacao.report() if verificacao is not None else None}
@@ -0,0 +1,137 @@
+from concurrent.futures import ThreadPoolExecutor
+
+from extractor_text import setup_driver, hardcore_block, extract_text, capture_settings, page_cache_key
+from blocking import apply_block_profile
+from extractor_scan import collect_image_urls, download_pages_resumable
+from lazyload import wait_for_pages, PAGE_SELECTOR
+from manifest import Manifest
+from cache import default_cache
+from metrics import bind
+
+
+def split_ranges(total, shards):
+    """
+    Divide `total` páginas em até `shards` faixas contíguas (início, fim),
+    fim exclusivo, de tamanhos o mais parecidos possível.
+    """
+    shards = max(1, min(shards, total))
+    size, extra = divmod(total, shards)
+    ranges = []
+    start = 0
+    for k in range(shards):
+        end = start + size + (1 if k < extra else 0)
+        ranges.append((start, end))
+        start = end
+    return ranges
+
+
+def count_pages(driver):
+    return driver.execute_script("return document.querySelectorAll(arguments[0]).length", PAGE_SELECTOR)
+
+
+def open_shard_driver(url, page_range=None, block_profile="common"):
+    """
+    Abre um navegador próprio para uma faixa de páginas: carrega o
+    documento e espera o lazy loading só das páginas da faixa (nenhuma,
+    se `page_range` for None). `block_profile` é o perfil de bloqueio de
+    requisições aplicado antes da navegação (ver blocking.py).
+    """
+    driver = setup_driver()
+    try:
+        driver.set_page_load_timeout(30)
+        if block_profile:
+            apply_block_profile(driver, block_profile)
+        driver.get(url)
+        hardcore_block(driver)
+        if page_range is not None:
+            wait_for_pages(driver, page_range=page_range)
+        return driver
+    except Exception:
+        driver.quit()
+        raise
+
+
+def run_sharded(url, total, shards, work, driver=None, block_profile="common"):
+    """
+    Executa `work(driver, page_range)` para cada faixa de páginas em
+    paralelo, cada uma com seu navegador. A primeira faixa reaproveita
+    `driver`, que já deve estar com o documento aberto.
+    Retorna os resultados na ordem das faixas.
+    """
+    ranges = split_ranges(total, shards)
+    print(f"🧩 Dividindo {total} páginas em {len(ranges)} faixas: "
+          + ", ".join(f"{start+1}-{end}" for start, end in ranges))
+
+    def run(k):
+        page_range = ranges[k]
+        own = not (k == 0 and driver is not None)
+        if own:
+            shard_driver = open_shard_driver(url, page_range, block_profile)
+        else:
+            shard_driver = driver
+            wait_for_pages(shard_driver, page_range=page_range)
+        try:
+            return work(shard_driver, page_range)
+        finally:
+            if own:
+                shard_driver.quit()
+
+    with ThreadPoolExecutor(max_workers=len(ranges)) as pool:
+        return list(pool.map(bind(run), range(len(ranges))))
+
+
+def extract_text_sharded(url, shards, driver=None, output_folder="output", cache=None, **kwargs):
+    """
+    Como extractor_text.extract_text, mas com as páginas divididas entre
+    `shards` navegadores em paralelo. Retorna os caminhos em ordem.
+    """
+    if driver is None:
+        driver = open_shard_driver(url, block_profile="text")
+        own_driver = True
+    else:
+        own_driver = False
+    try:
+        total = count_pages(driver)
+        if cache is None:
+            cache = default_cache()
+        settings = capture_settings(**{k: kwargs[k] for k in ("capture_format", "quality", "scale",
+                                                              "collect_text", "dpi") if k in kwargs})
+        with Manifest(output_folder, url, settings) as manifest:
+            results = run_sharded(url, total, shards, lambda d, page_range: extract_text(
+                url, driver=d, output_folder=output_folder, cache=cache,
+                page_range=page_range, manifest=manifest, **kwargs
+            ), driver=driver, block_profile="text")
+        screenshots = [path for shard in results for path in shard]
+        if cache:
+            # Cada faixa já guardou suas páginas; o documento só é associado
+            # às mesmas chaves, como no extractor_text sem faixas
+            keys = [page_cache_key(url, i, settings["format"], settings["scale"]) for i in range(total)]
+            cache.link_document(url, keys, [key + "&text" for key in keys] if settings["text"] else None)
+            print(f"🗄️ Cache: {cache.stats()}")
+        return screenshots
+    finally:
+        if own_driver:
+            driver.quit()
+
+
+def extract_images_sharded(url, output_folder, shards, driver=None, **kwargs):
+    """
+    Como extractor_scan.extract_images, mas o lazy loading e a coleta das
+    URLs são divididos entre `shards` navegadores em paralelo. As URLs,
+    indexadas pela página de origem, são juntadas e baixadas de uma vez (ver
+    extractor_scan.download_pages_resumable).
+    """
+    if driver is None:
+        driver = open_shard_driver(url, block_profile="scan")
+        own_driver = True
+    else:
+        own_driver = False
+    try:
+        total = count_pages(driver)
+        results = run_sharded(url, total, shards, collect_image_urls, driver=driver,
+                              block_profile="scan")
+        img_urls = {i: src for shard in results for i, src in shard.items()}
+        return download_pages_resumable(url, img_urls, output_folder, complete=True, **kwargs)
+    finally:
+        if own_driver:
+            driver.quit()
@@ -0,0 +1,58 @@
+import os
+
+import pytest
+
+import batch
+
+
+class FakeDriver:
+    def __init__(self):
+        self.quit_calls = 0
+
+    def quit(self):
+        self.quit_calls += 1
+
+
+@pytest.fixture
+def pool(monkeypatch):
+    monkeypatch.setattr(batch, "setup_driver", FakeDriver)
+    return batch.DriverPool(2)
+
+
+def test_navegador_que_nao_reinicia_encolhe_o_pool(pool, monkeypatch):
+    def broken():
+        raise OSError("chromedriver sumiu")
+
+    monkeypatch.setattr(batch, "setup_driver", broken)
+    first, second = pool.acquire(), pool.acquire()
+    pool.release(first, healthy=False)
+    assert pool.size == 1
+    pool.release(second, healthy=False)
+    assert pool.size == 0
+
+    # Sem navegadores, os trabalhos seguintes viram erro em vez de travar
+    result = batch.run_job(pool, {"url": "http://doc", "nome": "doc"}, "output", timeout=60)
+    assert result["status"] == "erro"
+    assert "Nenhum navegador" in result["erro"]
+
+
+@pytest.mark.parametrize("manter_png, manifesto, sobra", [
+    (False, False, False),
+    (True, False, True),
+    (False, True, True),
+])
+def test_pasta_de_paginas_de_trabalho_com_erro(pool, monkeypatch, tmp_path, manter_png, manifesto, sobra):
+    pasta_paginas = tmp_path / ".doc_paginas"
+
+    def failing(url, nome, pasta, pasta_paginas=None, **kwargs):
+        os.makedirs(pasta_paginas)
+        open(os.path.join(pasta_paginas, "page_001.png"), "wb").close()
+        if manifesto:
+            open(os.path.join(pasta_paginas, batch.MANIFEST_NAME), "w").close()
+        raise RuntimeError("captura falhou")
+
+    monkeypatch.setattr(batch, "process_document", failing)
+    result = batch.run_job(pool, {"url": "http://doc", "nome": "doc"}, str(tmp_path), timeout=60,
+                           manter_png=manter_png)
+    assert result["status"] == "erro"
+    assert pasta_paginas.exists() == sobra
@@ -0,0 +1,70 @@
+import time
+from fnmatch import fnmatchcase
+
+import pytest
+
+from benchmark import THIRD_PARTY, FixtureServer
+from blocking import block_patterns
+from browser import BROWSER_COMMANDS, browser_installed
+
+
+def blocked(url, patterns):
+    # Network.setBlockedURLs só conhece o curinga "*", que o fnmatch trata igual
+    return any(fnmatchcase(url, pattern) for pattern in patterns)
+
+
+@pytest.fixture(scope="module")
+def server():
+    with FixtureServer(latency=0, third_party_latency=0) as server:
+        yield server
+
+
+def page_assets(server):
+    return [server.url("scan", 3), server.url("text", 3), f"{server.base_url}/img/1.jpg",
+            f"{server.base_url}/layer/1"]
+
+
+@pytest.mark.parametrize("profile", ["scan", "text"])
+def test_perfil_bloqueia_terceiros_e_nao_o_documento(server, profile):
+    patterns = block_patterns(profile)
+    trackers = [server.base_url + path for tag, path in THIRD_PARTY if "fonts" not in path]
+    assert all(blocked(url, patterns) for url in trackers)
+    assert not any(blocked(url, patterns) for url in page_assets(server))
+
+
+def test_fontes_so_sao_bloqueadas_no_perfil_scan(server):
+    fonts = [server.base_url + path for tag, path in THIRD_PARTY if "fonts" in path]
+    assert fonts and all(blocked(url, block_patterns("scan")) for url in fonts)
+    assert not any(blocked(url, block_patterns("text")) for url in fonts)
+
+
+def test_sem_perfil_nada_e_bloqueado(server):
+    assert block_patterns(None) == []
+
+
+@pytest.mark.skipif(not any(browser_installed(b) for b in BROWSER_COMMANDS),
+                    reason="nenhum navegador instalado")
+def test_navegador_conta_requisicoes_bloqueadas(server):
+    pytest.importorskip("selenium")
+    from blocking import apply_block_profile
+    from browser import setup_driver
+    from netcapture import NetworkRecorder
+
+    expected = sum(blocked(server.base_url + path, block_patterns("scan")) for _, path in THIRD_PARTY)
+    driver = setup_driver()
+    try:
+        recorder = NetworkRecorder(driver).start()
+        if not recorder.enabled:
+            pytest.skip("log de performance indisponível neste navegador")
+        assert apply_block_profile(driver, "scan")
+        driver.get(server.url("scan", 3))
+        deadline = time.monotonic() + 10
+        stats = recorder.stats()
+        while stats["blocked"] < expected and time.monotonic() < deadline:
+            time.sleep(0.2)
+            stats = recorder.stats()
+    finally:
+        driver.quit()
+
+    assert stats["blocked"] == expected
+    assert stats["requests"] >= expected + 1
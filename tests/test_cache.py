@@ -0,0 +1,67 @@
+import json
+import os
+
+from cache import PageCache
+
+
+def test_indice_gravado_depois_do_put(tmp_path):
+    cache = PageCache(str(tmp_path), save_interval=0)
+    cache.put("http://cdn/1.jpg", b"page-1")
+
+    # Outra instância (ex.: depois de o processo morrer) já enxerga a página
+    reopened = PageCache(str(tmp_path))
+    assert reopened.get("http://cdn/1.jpg") is not None
+
+
+def test_gravacao_do_indice_respeita_o_intervalo(tmp_path):
+    cache = PageCache(str(tmp_path), save_interval=3600)
+    cache.put("http://cdn/1.jpg", b"page-1")
+    cache.put("http://cdn/2.jpg", b"page-2")
+    assert not os.path.exists(os.path.join(str(tmp_path), "index.json"))
+
+    cache.save()
+    with open(os.path.join(str(tmp_path), "index.json"), encoding="utf-8") as f:
+        assert len(json.load(f)["entries"]) == 2
+
+
+def test_remocao_lru_persistida(tmp_path):
+    cache = PageCache(str(tmp_path), max_bytes=12, save_interval=0)
+    cache.put("http://cdn/1.jpg", b"page-1")
+    cache.put("http://cdn/2.jpg", b"page-2")
+    cache.get("http://cdn/1.jpg")
+    cache.put("http://cdn/3.jpg", b"page-3")
+
+    reopened = PageCache(str(tmp_path), max_bytes=12)
+    assert reopened.get("http://cdn/2.jpg") is None
+    assert reopened.get("http://cdn/1.jpg") is not None
+    assert reopened.get("http://cdn/3.jpg") is not None
+    assert reopened.stats()["blobs"] == 2
+
+
+def test_blobs_fora_do_indice_sao_reincorporados(tmp_path):
+    cache = PageCache(str(tmp_path), max_bytes=12, save_interval=3600)
+    cache.put("http://cdn/1.jpg", b"page-1")
+    cache.put("http://cdn/2.jpg", b"page-2")
+    assert not os.path.exists(os.path.join(str(tmp_path), "index.json"))
+
+    # Sem índice, os blobs continuam contando para o limite de tamanho
+    reopened = PageCache(str(tmp_path), max_bytes=12)
+    assert reopened.stats()["bytes"] == 12
+    assert reopened.stats()["blobs"] == 2
+    reopened.put("http://cdn/3.jpg", b"page-3")
+    assert reopened.stats()["blobs"] == 2
+
+
+def test_documento_sem_camada_de_texto_sai_do_indice(tmp_path):
+    cache = PageCache(str(tmp_path), max_bytes=13, save_interval=0)
+    cache.put("http://doc#page=1", b"page-1")
+    cache.put("http://doc#page=1&text", b"{}")
+    assert cache.link_document("http://doc", ["http://doc#page=1"], ["http://doc#page=1&text"])
+    assert len(cache.document_text_layers("http://doc")) == 1
+
+    # A camada de texto é removida pelo LRU: o documento não pode mais ser
+    # refeito com texto, então deixa de constar como completo
+    cache.get("http://doc#page=1")
+    cache.put("http://cdn/2.jpg", b"page-2")
+    assert cache.document_pages("http://doc") is None
+    assert cache.document_text_layers("http://doc") is None
@@ -0,0 +1,122 @@
+import os
+import re
+import threading
+import time
+from collections import Counter
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+
+from downloader import PageDownloader
+from extractor_scan import download_pages_resumable
+
+
+class FlakyCdn:
+    """
+    Servidor local no lugar do CDN: /img/<n>.jpg responde com o corpo
+    b"page-<n>" depois de `latency[n]` segundos, falha com 503 as primeiras
+    `unavailable[n]` vezes e responde 404 para os `n` em `not_found`.
+    Registra quantas vezes cada página foi pedida e o pico de requisições
+    simultâneas.
+    """
+
+    def __init__(self, latency=None, unavailable=None, not_found=()):
+        self.latency = latency or {}
+        self.unavailable = Counter(unavailable or {})
+        self.not_found = set(not_found)
+        self.hits = Counter()
+        self.active = 0
+        self.peak = 0
+        self._lock = threading.Lock()
+        cdn = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def log_message(self, *args):
+                pass
+
+            def do_GET(self):
+                cdn.handle(self)
+
+        self.httpd = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+        self.httpd.daemon_threads = True
+
+    def __enter__(self):
+        threading.Thread(target=self.httpd.serve_forever, daemon=True).start()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.httpd.shutdown()
+        self.httpd.server_close()
+
+    def url(self, n):
+        host, port = self.httpd.server_address[:2]
+        return f"http://{host}:{port}/img/{n}.jpg"
+
+    def handle(self, request):
+        n = int(re.match(r"/img/(\d+)\.jpg", request.path).group(1))
+        with self._lock:
+            self.hits[n] += 1
+            self.active += 1
+            self.peak = max(self.peak, self.active)
+            fail = self.unavailable[n] > 0
+            if fail:
+                self.unavailable[n] -= 1
+        try:
+            time.sleep(self.latency.get(n, 0.02))
+            if n in self.not_found or fail:
+                status, body = (404 if n in self.not_found else 503), b""
+            else:
+                status, body = 200, f"page-{n}".encode()
+        finally:
+            with self._lock:
+                self.active -= 1
+        request.send_response(status)
+        request.send_header("Content-Length", str(len(body)))
+        request.end_headers()
+        request.wfile.write(body)
+
+
+def _read(path):
+    with open(path, "rb") as f:
+        return f.read()
+
+
+def test_ordem_preservada_com_downloads_fora_de_ordem(tmp_path):
+    # As primeiras páginas são as mais lentas e terminam por último
+    with FlakyCdn(latency={n: 0.02 * (8 - n) for n in range(8)}) as cdn, \
+            PageDownloader(workers=8, per_host=8, backoff=0) as downloader:
+        paths = downloader.download([cdn.url(n) for n in range(8)], str(tmp_path))
+
+    assert [os.path.basename(p) for p in paths] == [f"page_{n+1:03}.jpg" for n in range(8)]
+    assert [_read(p) for p in paths] == [f"page-{n}".encode() for n in range(8)]
+
+
+def test_503_e_tentado_de_novo(tmp_path):
+    with FlakyCdn(unavailable={2: 2}) as cdn, \
+            PageDownloader(workers=4, retries=3, backoff=0) as downloader:
+        paths = downloader.download([cdn.url(n) for n in range(4)], str(tmp_path))
+
+    assert len(paths) == 4
+    assert _read(paths[2]) == b"page-2"
+    assert cdn.hits[2] == 3
+
+
+def test_limite_de_conexoes_por_host(tmp_path):
+    with FlakyCdn(latency={n: 0.05 for n in range(12)}) as cdn, \
+            PageDownloader(workers=8, per_host=2, backoff=0) as downloader:
+        paths = downloader.download([cdn.url(n) for n in range(12)], str(tmp_path))
+
+    assert len(paths) == 12
+    assert cdn.peak == 2
+
+
+def test_404_falha_nomeando_a_pagina(tmp_path):
+    with FlakyCdn(not_found={2}) as cdn:
+        urls = [cdn.url(n) for n in range(4)]
+        with pytest.raises(RuntimeError, match=r"1 páginas não puderam ser baixadas: 3$"):
+            download_pages_resumable("http://doc", urls, str(tmp_path), workers=4, max_attempts=2,
+                                     cache=False)
+
+    # Só a página que falhou foi pedida de novo na segunda rodada
+    assert cdn.hits[2] == 2
+    assert all(cdn.hits[n] == 1 for n in (0, 1, 3))
@@ -0,0 +1,68 @@
+import os
+
+import pytest
+
+from benchmark import FixtureServer
+from extractor_scan import download_pages_resumable
+
+
+class PageDriver:
+    """
+    Driver falso para collect_image_urls: `srcs` é a imagem de cada
+    container de página (None para as que ainda não carregaram).
+    """
+
+    def __init__(self, srcs):
+        self.srcs = srcs
+
+    def execute_script(self, script, selector, pages=None):
+        if pages is None:
+            return len(self.srcs)
+        return [self.srcs[i] if i < len(self.srcs) else None for i in pages]
+
+
+def test_urls_indexadas_pela_pagina_de_origem():
+    from extractor_scan import collect_image_urls
+
+    driver = PageDriver(["http://cdn/1.jpg", None, "http://cdn/3.jpg", "http://cdn/4.jpg"])
+    assert collect_image_urls(driver) == {0: "http://cdn/1.jpg", 1: None, 2: "http://cdn/3.jpg",
+                                          3: "http://cdn/4.jpg"}
+    assert collect_image_urls(driver, (2, 4)) == {2: "http://cdn/3.jpg", 3: "http://cdn/4.jpg"}
+
+
+def test_pagina_sem_imagem_e_cobrada_como_falha(tmp_path):
+    with FixtureServer(latency=0) as server:
+        urls = {0: f"{server.base_url}/img/0.jpg", 1: None, 2: f"{server.base_url}/img/2.jpg"}
+        with pytest.raises(RuntimeError, match=r"1 páginas não puderam ser baixadas: 2$"):
+            download_pages_resumable("http://doc", urls, str(tmp_path), max_attempts=1, cache=False)
+
+    # As outras páginas ficam no manifesto com o nome da página certa
+    assert os.path.exists(tmp_path / "page_001.jpg")
+    assert os.path.exists(tmp_path / "page_003.jpg")
+    assert not os.path.exists(tmp_path / "page_002.jpg")
+
+
+def test_nova_captura_atualiza_o_manifesto_compartilhado(tmp_path):
+    from extractor_scan import iter_pages_resumable
+    from manifest import Manifest, file_sha256
+
+    folder = str(tmp_path)
+    with FixtureServer(latency=0) as server:
+        urls = [f"{server.base_url}/img/{n}.jpg" for n in range(3)]
+        retry_url = f"{server.base_url}/img/7.jpg"
+        with Manifest(folder, "http://doc") as manifest:
+            outer = iter_pages_resumable("http://doc", urls, folder, cache=False, manifest=manifest)
+            seen = set()
+            for i, _ in outer:
+                seen.add(i)
+                if 1 in seen:
+                    break
+            # Página 2 capturada de novo enquanto a extração ainda está aberta
+            assert dict(iter_pages_resumable("http://doc", {1: retry_url}, folder, cache=False,
+                                             refresh=True, manifest=manifest))
+            list(outer)
+
+    reloaded = Manifest(folder, "http://doc")
+    assert reloaded.is_valid(1, retry_url)
+    assert reloaded.pages[1]["sha256"] == file_sha256(reloaded.path_of(1))
+    assert all(reloaded.is_valid(i, urls[i]) for i in (0, 2))
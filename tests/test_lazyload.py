@@ -0,0 +1,24 @@
+import lazyload
+
+
+class FakeDriver:
+    def __init__(self):
+        self.calls = []
+
+    def execute_script(self, script, selector, i):
+        self.calls.append(("scroll", i))
+
+    def set_script_timeout(self, seconds):
+        pass
+
+    def execute_async_script(self, script, *args):
+        self.calls.append(("wait", args[-1]))
+        return {"total": len(args[-1]), "loaded": len(args[-1]), "missing": [], "timed_out": False,
+                "jumps": 0, "elapsed_ms": 5}
+
+
+def test_reload_rola_ate_cada_pagina_antes_de_esperar():
+    driver = FakeDriver()
+    report = lazyload.reload_pages(driver, [4, 9], settle=0)
+    assert driver.calls == [("scroll", 4), ("scroll", 9), ("wait", [4, 9])]
+    assert report["loaded"] == 2
@@ -0,0 +1,48 @@
+from manifest import Manifest
+
+
+def _page(folder, name, data):
+    path = folder / name
+    path.write_bytes(data)
+    return str(path)
+
+
+def test_pagina_valida_so_com_a_mesma_origem(tmp_path):
+    path = _page(tmp_path, "page_001.jpg", b"page-1")
+    with Manifest(str(tmp_path), "http://doc") as manifest:
+        manifest.record(0, path, "http://cdn/1.jpg")
+
+    manifest = Manifest(str(tmp_path), "http://doc")
+    assert manifest.is_valid(0, "http://cdn/1.jpg")
+    assert not manifest.is_valid(0, "http://cdn/outra.jpg")
+    assert manifest.missing(1, sources={0: "http://cdn/outra.jpg"}) == [0]
+
+
+def test_bounding_box_tolera_arredondamento(tmp_path):
+    path = _page(tmp_path, "page_001.png", b"page-1")
+    box = {"x": 10, "y": 20.5, "width": 600, "height": 800}
+    with Manifest(str(tmp_path), "http://doc") as manifest:
+        manifest.record(0, path, box)
+
+    manifest = Manifest(str(tmp_path), "http://doc")
+    assert manifest.is_valid(0, {**box, "y": 21})
+    assert not manifest.is_valid(0, {**box, "y": 820.5})
+
+
+def test_outras_configuracoes_descartam_o_manifesto(tmp_path):
+    path = _page(tmp_path, "page_001.png", b"page-1")
+    settings = {"format": "png", "quality": None, "scale": 1, "text": True}
+    with Manifest(str(tmp_path), "http://doc", settings) as manifest:
+        manifest.record(0, path, "box")
+
+    assert Manifest(str(tmp_path), "http://doc", settings).is_valid(0)
+    assert not Manifest(str(tmp_path), "http://doc", {**settings, "scale": 2}).is_valid(0)
+
+
+def test_arquivo_corrompido_invalida_a_pagina(tmp_path):
+    path = _page(tmp_path, "page_001.jpg", b"page-1")
+    with Manifest(str(tmp_path), "http://doc") as manifest:
+        manifest.record(0, path, "http://cdn/1.jpg")
+    _page(tmp_path, "page_001.jpg", b"page-X")
+
+    assert not Manifest(str(tmp_path), "http://doc").is_valid(0)
@@ -0,0 +1,138 @@
+import os
+import sys
+import textwrap
+import importlib
+
+import pytest
+from PIL import Image
+
+import renderer
+
+# pytesseract falso: devolve um PDF com texto invisível "ocr-<vermelho do
+# primeiro pixel>-<idioma>" e registra cada chamada num arquivo, para que
+# as chamadas feitas nos processos do pool também sejam contadas
+FAKE_PYTESSERACT = textwrap.dedent('''
+    import os
+    import fitz
+
+
+    class pytesseract:
+        tesseract_cmd = None
+
+
+    def image_to_pdf_or_hocr(img, extension="pdf", lang=None, **kwargs):
+        with open(os.environ["FAKE_TESSERACT_LOG"], "a") as f:
+            f.write(f"{lang} {img.width}x{img.height}\\n")
+        doc = fitz.open()
+        page = doc.new_page(width=img.width, height=img.height)
+        red = img.convert("RGB").getpixel((0, 0))[0]
+        page.insert_text((5, 20), f"ocr-{red}-{lang}", fontsize=8, render_mode=3)
+        return doc.tobytes()
+''')
+
+
+@pytest.fixture
+def tesseract(tmp_path, monkeypatch):
+    """
+    Instala o pytesseract falso em sys.modules (e em sys.path, para pools
+    que não usam fork) e retorna uma função com as chamadas feitas até ali.
+    """
+    fake_dir = tmp_path / "fake"
+    fake_dir.mkdir()
+    (fake_dir / "pytesseract.py").write_text(FAKE_PYTESSERACT)
+    log = tmp_path / "tesseract.log"
+    log.write_text("")
+    monkeypatch.setenv("FAKE_TESSERACT_LOG", str(log))
+    monkeypatch.syspath_prepend(str(fake_dir))
+    monkeypatch.delitem(sys.modules, "pytesseract", raising=False)
+    importlib.import_module("pytesseract")
+    return lambda: log.read_text().splitlines()
+
+
+@pytest.fixture
+def pages(tmp_path):
+    folder = tmp_path / "pages"
+    folder.mkdir()
+    paths = []
+    for i in range(4):
+        path = str(folder / f"page_{i+1:03d}.png")
+        Image.new("RGB", (80, 100), (10 * (i + 1), 200, 200)).save(path)
+        paths.append(path)
+    return paths
+
+
+def _text(pdf_bytes):
+    import fitz
+
+    with fitz.open("pdf", pdf_bytes) as doc:
+        return doc[0].get_text().strip()
+
+
+def test_ordem_preservada(tesseract, pages, tmp_path):
+    layers = renderer.ocr_pages(pages, lang="por", scale=1, workers=2, cache_dir=str(tmp_path / "cache"))
+    assert [_text(layer) for layer in layers] == ["ocr-10-por", "ocr-20-por", "ocr-30-por", "ocr-40-por"]
+    assert len(tesseract()) == 4
+
+
+def test_segunda_execucao_vem_do_cache(tesseract, pages, tmp_path):
+    cache_dir = str(tmp_path / "cache")
+    first = renderer.ocr_pages(pages, lang="por", scale=1, workers=2, cache_dir=cache_dir)
+    second = renderer.ocr_pages(pages, lang="por", scale=1, workers=2, cache_dir=cache_dir)
+    assert second == first
+    assert len(tesseract()) == 4
+
+
+def test_documentos_em_threads_compartilham_o_cache(tesseract, pages, tmp_path):
+    import threading
+
+    # Os trabalhos do lote rodam em threads do mesmo processo: gravar a
+    # mesma página no cache ao mesmo tempo não pode disputar o temporário
+    cache_dir = str(tmp_path / "cache")
+    results, errors = [], []
+
+    def run():
+        try:
+            results.append(renderer.ocr_pages(pages, lang="por", scale=1, workers=2, cache_dir=cache_dir))
+        except Exception as e:
+            errors.append(e)
+
+    threads = [threading.Thread(target=run) for _ in range(2)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert not errors
+    assert [[_text(layer) for layer in layers] for layers in results] == [
+        [_text(layer) for layer in results[0]]] * 2
+    assert not any(name.endswith(".tmp") for name in os.listdir(cache_dir))
+
+
+def test_chave_do_cache_depende_do_idioma_e_da_escala(tesseract, pages, tmp_path):
+    key = renderer._ocr_cache_key(pages[0], "por", 1)
+    assert renderer._ocr_cache_key(pages[0], "eng", 1) != key
+    assert renderer._ocr_cache_key(pages[0], "por", 2) != key
+    assert renderer._ocr_cache_key(pages[1], "por", 1) != key
+
+    cache_dir = str(tmp_path / "cache")
+    renderer.ocr_pages(pages, lang="por", scale=1, workers=2, cache_dir=cache_dir)
+    layers = renderer.ocr_pages(pages, lang="eng", scale=1, workers=2, cache_dir=cache_dir)
+    renderer.ocr_pages(pages, lang="por", scale=2, workers=2, cache_dir=cache_dir)
+    assert _text(layers[0]) == "ocr-10-eng"
+    calls = tesseract()
+    assert len(calls) == 12
+    assert calls.count("por 160x200") == 4
+
+
+def test_render_pages_com_ocr_tem_camada_de_texto(tesseract, pages, tmp_path):
+    import fitz
+
+    output = str(tmp_path / "doc.pdf")
+    arrivals = [(3, pages[3]), (1, pages[1]), (0, pages[0]), (2, pages[2])]
+    count = renderer.render_pages(iter(arrivals), output, ocr=True, lang="por", scale=1, workers=2,
+                                  cache_dir=str(tmp_path / "cache"))
+    assert count == 4
+    with fitz.open(output) as doc:
+        assert [page.get_text().strip() for page in doc] == ["ocr-10-por", "ocr-20-por", "ocr-30-por",
+                                                             "ocr-40-por"]
+        assert all(page.get_images() for page in doc)
+    assert all(os.path.exists(path) for path in pages)
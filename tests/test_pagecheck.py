@@ -0,0 +1,80 @@
+import os
+
+import pytest
+from PIL import Image
+
+from pagecheck import PageChecker
+
+
+def _page(folder, name, blank=False):
+    path = str(folder / name)
+    if blank:
+        Image.new("L", (200, 260), 255).save(path)
+    else:
+        Image.frombytes("L", (200, 260), os.urandom(200 * 260)).save(path)
+    return path
+
+
+@pytest.fixture
+def document(tmp_path):
+    # Página 2 em branco (placeholder) e página 4 repetindo a 3
+    paths = [_page(tmp_path, "page_001.png"), _page(tmp_path, "page_002.png", blank=True),
+             _page(tmp_path, "page_003.png")]
+    duplicate = str(tmp_path / "page_004.png")
+    with open(paths[2], "rb") as src, open(duplicate, "wb") as dst:
+        dst.write(src.read())
+    return paths + [duplicate, _page(tmp_path, "page_005.png")]
+
+
+def test_flag_mantem_e_registra(document):
+    checker = PageChecker("flag")
+    assert list(checker.filter(enumerate(document))) == list(enumerate(document))
+    report = checker.report()
+    assert report["em_branco"] == [2]
+    assert report["duplicadas"] == {4: 3}
+    assert checker.skip_ocr == {1, 3}
+
+
+def test_drop_tira_do_pdf(document):
+    checker = PageChecker("drop")
+    result = list(checker.filter(enumerate(document)))
+    assert [i for i, path in result if path is None] == [1, 3]
+    assert checker.report()["removidas"] == [2, 4]
+
+
+def test_recapture_na_hora_sem_segurar_as_seguintes(document, tmp_path):
+    events = []
+
+    def pages():
+        for i, path in enumerate(document):
+            events.append(("lida", i))
+            yield i, path
+
+    def recapture(indices):
+        events.append(("recapturada", indices))
+        for i in indices:
+            yield i, _page(tmp_path, f"new_{i+1:03d}.png")
+
+    checker = PageChecker("recapture", recapture=recapture)
+    result = []
+    for i, path in checker.filter(pages()):
+        events.append(("saiu", i))
+        result.append((i, path))
+
+    assert [i for i, _ in result] == [0, 1, 2, 3, 4]
+    assert all(path is not None for _, path in result)
+    assert os.path.basename(result[1][1]) == "new_002.png"
+    assert os.path.basename(result[3][1]) == "new_004.png"
+    # A página 2 é capturada de novo e sai antes de a 3 ser lida
+    assert events[:5] == [("lida", 0), ("saiu", 0), ("lida", 1), ("recapturada", [1]), ("saiu", 1)]
+    report = checker.report()
+    assert report["recapturadas"] == [2, 4]
+    assert report["em_branco"] == [] and report["duplicadas"] == {}
+
+
+def test_recapture_que_continua_ruim_fica_marcada(document):
+    checker = PageChecker("recapture", recapture=lambda indices: iter(()))
+    result = list(checker.filter(enumerate(document)))
+    assert result == list(enumerate(document))
+    assert checker.report()["em_branco"] == [2]
+    assert checker.report()["duplicadas"] == {4: 3}
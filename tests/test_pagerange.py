@@ -0,0 +1,75 @@
+from types import SimpleNamespace
+
+import pytest
+
+import session
+from pagerange import format_pages, parse_pages, parse_ranges
+
+
+def test_selecao_com_intervalos_abertos():
+    assert parse_pages("1-3,10", total=20) == [0, 1, 2, 9]
+    assert parse_pages("18-", total=20) == [17, 18, 19]
+    assert parse_pages("5,30-", total=20) == [4]
+    assert format_pages(parse_pages("1-3,5-", total=6)) == "1-3,5-6"
+
+
+def test_intervalo_aberto_precisa_do_total():
+    assert parse_ranges("1-3,100-") == [(1, 3), (100, None)]
+    with pytest.raises(ValueError):
+        parse_pages("100-")
+
+
+@pytest.mark.parametrize("spec", ["0", "3-1", "a-", "1,,x"])
+def test_selecao_invalida(spec):
+    with pytest.raises(ValueError):
+        parse_ranges(spec)
+
+
+class FakeDriver:
+    def __init__(self, pages):
+        self.pages = pages
+
+    def set_page_load_timeout(self, seconds):
+        pass
+
+    def get(self, url):
+        pass
+
+    def execute_script(self, script, *args):
+        return self.pages
+
+
+@pytest.fixture
+def waited(monkeypatch):
+    """
+    Sessão sem navegador: o que seria esperado pelo lazyload.wait_for_pages
+    fica registrado na lista retornada.
+    """
+    waited = []
+    monkeypatch.setattr(session, "NetworkRecorder",
+                        lambda driver: SimpleNamespace(start=lambda: SimpleNamespace(enabled=False)))
+    monkeypatch.setattr(session, "apply_block_profile", lambda driver, profile: [])
+    monkeypatch.setattr(session, "hardcore_block", lambda driver: None)
+    monkeypatch.setattr(session, "classify_document", lambda driver: "scan")
+    monkeypatch.setattr(session, "wait_for_pages", lambda driver, **kwargs: waited.append(kwargs))
+    return waited
+
+
+def test_sessao_espera_por_todas_as_paginas_selecionadas(waited):
+    session.DocumentSession("http://doc", driver=FakeDriver(200), pages="1-50,120").open()
+    selected = list(range(50)) + [119]
+    assert {i for call in waited for i in (call.get("pages") or [])} == set(selected)
+    assert waited[-1]["pages"] == selected
+
+
+def test_sessao_resolve_a_selecao_com_o_total_do_documento(waited):
+    sessao = session.DocumentSession("http://doc", driver=FakeDriver(120), pages="100-")
+    sessao.open()
+    assert sessao.pages == list(range(99, 120))
+    assert sessao.page_count() == 21
+    assert waited[0]["pages"] == [99]
+    # Todas as páginas da seleção são carregadas, não só a primeira
+    assert waited[-1]["pages"] == list(range(99, 120))
+
+    with pytest.raises(ValueError, match="120 páginas"):
+        session.DocumentSession("http://doc", driver=FakeDriver(120), pages="130-").open()
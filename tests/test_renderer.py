@@ -0,0 +1,227 @@
+import os
+import threading
+
+import pytest
+from PIL import Image
+
+import renderer
+
+
+def _write_pages(folder, count):
+    paths = []
+    for i in range(count):
+        path = os.path.join(folder, f"page_{i+1:03d}.png")
+        Image.new("RGB", (60, 80), (255, 255 - i * 20, 255)).save(path)
+        paths.append(path)
+    return paths
+
+
+def test_render_pages_reordera_e_apaga_depois_do_pdf(tmp_path):
+    import fitz
+
+    paths = _write_pages(tmp_path, 4)
+    output = str(tmp_path / "doc.pdf")
+    arrivals = [(2, paths[2]), (0, paths[0]), (3, paths[3]), (1, paths[1])]
+
+    assert renderer.render_pages(iter(arrivals), output, delete=True, queue_size=1) == 4
+    with fitz.open(output) as doc:
+        assert doc.page_count == 4
+    assert not any(os.path.exists(path) for path in paths)
+    assert not os.path.exists(output + ".part")
+
+
+def test_render_pages_erro_do_produtor_nao_deixa_pdf(tmp_path):
+    paths = _write_pages(tmp_path, 3)
+    output = str(tmp_path / "doc.pdf")
+
+    def pages():
+        yield 0, paths[0]
+        yield 1, paths[1]
+        raise TimeoutError("driver caiu")
+
+    with pytest.raises(TimeoutError):
+        renderer.render_pages(pages(), output, delete=True)
+    assert not os.path.exists(output)
+    assert not os.path.exists(output + ".part")
+    # As páginas anexadas já saíram do disco; a que não chegou fica
+    assert [os.path.exists(path) for path in paths] == [False, False, True]
+
+
+def test_render_pages_apaga_cada_pagina_logo_depois_de_anexar(tmp_path):
+    paths = _write_pages(tmp_path, 4)
+    output = str(tmp_path / "doc.pdf")
+    on_disk = []
+
+    def pages():
+        for i, path in enumerate(paths):
+            on_disk.append(sum(os.path.exists(p) for p in paths[:i]))
+            yield i, path
+
+    renderer.render_pages(pages(), output, delete=True, queue_size=1)
+    # Quando a página i é gerada, as anteriores já foram (quase todas)
+    # apagadas: no máximo as que estão na fila e a que está sendo escrita
+    assert max(on_disk) <= 2
+
+
+def test_render_pages_erro_do_consumidor_libera_o_produtor(tmp_path):
+    paths = _write_pages(tmp_path, 1)
+    output = str(tmp_path / "doc.pdf")
+    closed = threading.Event()
+
+    def pages():
+        try:
+            yield 0, paths[0]
+            yield 1, str(tmp_path / "nao_existe.png")
+            for i in range(2, 1000):
+                yield i, paths[0]
+        finally:
+            closed.set()
+
+    with pytest.raises(FileNotFoundError):
+        renderer.render_pages(pages(), output, queue_size=1)
+    assert closed.wait(5)
+    assert not os.path.exists(output)
+    assert not os.path.exists(output + ".part")
+
+
+def test_render_pages_com_verificacao_tira_paginas_descartadas(tmp_path):
+    import fitz
+    from pagecheck import PageChecker
+
+    paths = []
+    for i in range(3):
+        path = str(tmp_path / f"page_{i+1:03d}.png")
+        if i == 1:
+            Image.new("L", (200, 260), 255).save(path)
+        else:
+            Image.frombytes("L", (200, 260), os.urandom(200 * 260)).save(path)
+        paths.append(path)
+    output = str(tmp_path / "doc.pdf")
+    checker = PageChecker("drop")
+
+    arrivals = [(2, paths[2]), (0, paths[0]), (1, paths[1])]
+    assert renderer.render_pages(iter(arrivals), output, delete=True, check=checker) == 2
+    with fitz.open(output) as doc:
+        assert doc.page_count == 2
+    assert checker.report()["removidas"] == [2]
+    assert not any(os.path.exists(path) for path in paths)
+
+
+def test_pdf_refeito_do_cache_mantem_a_camada_de_texto(tmp_path):
+    import json
+    import fitz
+    from cache import PageCache
+
+    cache = PageCache(str(tmp_path / "cache"))
+    paths = _write_pages(tmp_path, 2)
+    for i, path in enumerate(paths):
+        cache.put_file(f"http://doc#page={i+1}", path)
+        layer = {"width": 60, "height": 80,
+                 "runs": [{"text": f"pagina {i+1}", "x": 5, "y": 10, "width": 50, "height": 12, "size": 10}]}
+        cache.put(f"http://doc#page={i+1}&text", json.dumps(layer).encode())
+    assert cache.link_document("http://doc", ["http://doc#page=1", "http://doc#page=2"],
+                               ["http://doc#page=1&text", "http://doc#page=2&text"])
+
+    output = str(tmp_path / "doc.pdf")
+    assert renderer.rebuild_pdf_from_cache("http://doc", output, cache=cache)
+    with fitz.open(output) as doc:
+        assert [page.get_text().strip() for page in doc] == ["pagina 1", "pagina 2"]
+    assert not renderer.rebuild_pdf_from_cache("http://outro", str(tmp_path / "outro.pdf"), cache=cache)
+
+
+def _write_synthetic(folder):
+    """
+    Uma página colorida, uma em tons de cinza e uma de texto puro (preto
+    sobre branco), como as que os extratores geram.
+    """
+    from PIL import ImageDraw
+
+    color = Image.new("RGB", (120, 160))
+    color.putdata([(x * 2, y, (x + y) % 256) for y in range(160) for x in range(120)])
+    gray = Image.new("L", (120, 160))
+    gray.putdata([(x + y) % 256 for y in range(160) for x in range(120)])
+    text = Image.new("RGB", (120, 160), "white")
+    draw = ImageDraw.Draw(text)
+    for top in range(10, 150, 20):
+        draw.rectangle((10, top, 100, top + 8), fill="black")
+
+    paths = []
+    for name, img in (("color", color), ("gray", gray), ("text", text)):
+        path = os.path.join(folder, f"{name}.png")
+        img.save(path)
+        paths.append(path)
+    return paths
+
+
+@pytest.mark.parametrize("profile", [None, "archive", "balanced", "small", "tiny"])
+def test_cada_perfil_gera_pdf_valido(tmp_path, profile):
+    import fitz
+
+    paths = _write_synthetic(str(tmp_path))
+    output = str(tmp_path / "doc.pdf")
+    renderer.save_images_to_pdf(paths, output, profile=profile, workers=1)
+    with fitz.open(output) as doc:
+        assert doc.page_count == 3
+        for page in doc:
+            assert (page.rect.width, page.rect.height) == (120, 160)
+            # A imagem de cada página decodifica sem erro
+            assert page.get_pixmap().width == 120
+
+
+def test_pagina_de_texto_puro_vai_em_1_bit_com_preditor_png(tmp_path):
+    import fitz
+    from compression import compress_page
+
+    text_path = _write_synthetic(str(tmp_path))[2]
+    page = compress_page(text_path, "small")
+    assert page["kind"] == "bilevel"
+    assert "/BitsPerComponent 1" in page["header"] and "/Predictor 15" in page["header"]
+
+    output = str(tmp_path / "doc.pdf")
+    renderer.save_images_to_pdf([text_path], output, profile="small", workers=1)
+    with fitz.open(output) as doc:
+        pixmap = doc[0].get_pixmap()
+    # Preto dentro das barras, branco entre elas
+    assert pixmap.pixel(50, 14) == (0, 0, 0)
+    assert pixmap.pixel(50, 24) == (255, 255, 255)
+
+
+def test_update_pdf_troca_e_acrescenta_paginas(tmp_path):
+    import fitz
+
+    paths = _write_pages(tmp_path, 3)
+    output = str(tmp_path / "doc.pdf")
+    renderer.save_images_to_pdf(paths, output)
+
+    updates = []
+    for i in (1, 3):
+        path = str(tmp_path / f"new_{i}.png")
+        Image.new("RGB", (90, 50), "black").save(path)
+        updates.append((i, path))
+
+    assert renderer.update_pdf(output, iter(updates)) == 2
+    with fitz.open(output) as doc:
+        sizes = [(page.rect.width, page.rect.height) for page in doc]
+    assert sizes == [(60, 80), (90, 50), (60, 80), (90, 50)]
+
+    with pytest.raises(ValueError, match="buraco"):
+        renderer.update_pdf(output, [(6, updates[0][1])])
+
+
+def test_camada_de_texto_do_dom_fica_pesquisavel(tmp_path):
+    import json
+    import fitz
+
+    paths = _write_pages(tmp_path, 2)
+    layer = {"width": 30, "height": 40,
+             "runs": [{"text": "Capítulo um", "x": 2, "y": 5, "width": 25, "height": 6, "size": 5}]}
+    with open(os.path.splitext(paths[0])[0] + ".json", "w", encoding="utf-8") as f:
+        json.dump(layer, f)
+
+    output = str(tmp_path / "doc.pdf")
+    renderer.render_pages(enumerate(paths), output, text_layers=True)
+    with fitz.open(output) as doc:
+        assert doc[0].get_text().strip() == "Capítulo um"
+        # Posição convertida de pixels CSS para o tamanho da imagem (2x)
+        assert doc[0].get_text("words")[0][0] == pytest.approx(4, abs=1)
+        assert doc[1].get_text().strip() == ""
@@ -0,0 +1,40 @@
+import sharding
+from cache import PageCache
+from extractor_text import page_cache_key
+from sharding import split_ranges
+
+
+def test_faixas_cobrem_todas_as_paginas():
+    assert split_ranges(10, 3) == [(0, 4), (4, 7), (7, 10)]
+    assert split_ranges(2, 5) == [(0, 1), (1, 2)]
+
+
+def test_documento_fragmentado_usa_as_chaves_do_extractor_text(tmp_path, monkeypatch):
+    cache = PageCache(str(tmp_path / "cache"))
+
+    def fake_extract_text(url, driver=None, output_folder="output", cache=None, page_range=None,
+                          manifest=None, capture_format="png", scale=1, **kwargs):
+        # Guarda as páginas como iter_text_pages faz
+        paths = []
+        for i in range(*page_range):
+            path = tmp_path / f"page_{i+1:03}.{capture_format}"
+            path.write_bytes(f"page-{i}".encode())
+            cache.put_file(page_cache_key(url, i, capture_format, scale), str(path))
+            cache.put(page_cache_key(url, i, capture_format, scale) + "&text", f"layer-{i}".encode())
+            paths.append(str(path))
+        return paths
+
+    monkeypatch.setattr(sharding, "count_pages", lambda driver: 5)
+    monkeypatch.setattr(sharding, "extract_text", fake_extract_text)
+    monkeypatch.setattr(sharding, "run_sharded", lambda url, total, shards, work, **kwargs: [
+        work(None, page_range) for page_range in split_ranges(total, shards)])
+
+    paths = sharding.extract_text_sharded("http://doc", 2, driver=object(), output_folder=str(tmp_path),
+                                          cache=cache, capture_format="jpeg", scale=2)
+    assert len(paths) == 5
+    blobs = cache.document_pages("http://doc")
+    assert [open(blob, "rb").read() for blob in blobs] == [f"page-{i}".encode() for i in range(5)]
+    # Nenhuma cópia extra com as chaves antigas (url#page=N)
+    assert not any(key.endswith("#page=1") for key in cache.entries)
+    layers = cache.document_text_layers("http://doc")
+    assert [open(blob, "rb").read() for blob in layers] == [f"layer-{i}".encode() for i in range(5)]
@@ -0,0 +1,97 @@
+import base64
+import io
+import os
+
+import pytest
+from PIL import Image
+
+import tiling
+from tiling import StreamingPngWriter, capture_page_tiled, needs_tiling, plan_tiles
+
+# Documento de 700 x 1200 px CSS com ruído, para que qualquer bloco fora do
+# lugar apareça na comparação
+DOC_SIZE = (700, 1200)
+BOX = {"x": 40, "y": 120, "width": 600, "height": 1000}
+VIEWPORT = (250, 400)
+
+
+class FakeCdpDriver:
+    """
+    Responde ao Page.captureScreenshot recortando o documento já
+    "renderizado" em `scale` (a imagem `rendered`), como o navegador faz
+    com o clip em pixels CSS.
+    """
+
+    def __init__(self, rendered, scale):
+        self.rendered = rendered
+        self.scale = scale
+        self.clips = []
+
+    def execute_cdp_cmd(self, cmd, params):
+        assert cmd == "Page.captureScreenshot"
+        clip = params["clip"]
+        assert clip["scale"] == self.scale
+        self.clips.append(clip)
+        left, top = round(clip["x"] * self.scale), round(clip["y"] * self.scale)
+        width, height = round(clip["width"] * self.scale), round(clip["height"] * self.scale)
+        tile = self.rendered.crop((left, top, left + width, top + height))
+        buffer = io.BytesIO()
+        tile.save(buffer, format="PNG")
+        return {"data": base64.b64encode(buffer.getvalue()).decode()}
+
+
+def render(scale):
+    width, height = round(DOC_SIZE[0] * scale), round(DOC_SIZE[1] * scale)
+    return Image.frombytes("RGB", (width, height), os.urandom(width * height * 3))
+
+
+# Janela mais estreita que a página (vários blocos por faixa) e mais larga
+# (um bloco por faixa, que vira a própria faixa)
+@pytest.mark.parametrize("viewport", [VIEWPORT, (800, 400)])
+@pytest.mark.parametrize("scale", [1, 1.5, 2, 3])
+def test_pagina_costurada_igual_a_captura_inteira(tmp_path, scale, viewport):
+    rendered = render(scale)
+    driver = FakeCdpDriver(rendered, scale)
+    path = str(tmp_path / "page.png")
+
+    assert needs_tiling(BOX, scale, viewport)
+    size = capture_page_tiled(driver, BOX, path, scale, viewport)
+
+    left, top = round(BOX["x"] * scale), round(BOX["y"] * scale)
+    expected = rendered.crop((left, top, left + round(BOX["width"] * scale), top + round(BOX["height"] * scale)))
+    with Image.open(path) as stitched:
+        assert stitched.size == expected.size
+        assert stitched.convert("RGB").tobytes() == expected.tobytes()
+    assert size == os.path.getsize(path)
+    assert len(driver.clips) > 1
+
+
+def test_faixas_respeitam_o_limite_de_pixels(tmp_path, monkeypatch):
+    monkeypatch.setattr(tiling, "MAX_TILE_PIXELS", 200_000)
+    scale = 3
+    width, height, bands = plan_tiles(BOX, scale, VIEWPORT)
+    assert all(width * rows <= tiling.MAX_TILE_PIXELS for _, rows, _ in bands)
+    assert sum(rows for _, rows, _ in bands) == height
+
+    rendered = render(scale)
+    path = str(tmp_path / "page.png")
+    capture_page_tiled(FakeCdpDriver(rendered, scale), BOX, path, scale, VIEWPORT)
+    left, top = BOX["x"] * scale, BOX["y"] * scale
+    with Image.open(path) as stitched:
+        assert stitched.convert("RGB").tobytes() == rendered.crop((left, top, left + width, top + height)).tobytes()
+
+
+def test_png_incompleto_gera_erro(tmp_path):
+    writer = StreamingPngWriter(str(tmp_path / "page.png"), 10, 20)
+    writer.add_band(Image.new("RGB", (10, 5), "white"))
+    with pytest.raises(ValueError):
+        writer.close()
+
+
+def test_erro_durante_a_costura_apaga_o_png_parcial(tmp_path):
+    path = tmp_path / "page.png"
+    with pytest.raises(RuntimeError, match="captura falhou"):
+        with StreamingPngWriter(str(path), 10, 20) as writer:
+            writer.add_band(Image.new("RGB", (10, 5), "white"))
+            raise RuntimeError("captura falhou")
+    assert not path.exists()
@@ -0,0 +1,168 @@
+import io
+import os
+import zlib
+import struct
+import base64
+
+# Resolução de referência do CSS: 96 px por polegada em escala 1
+CSS_DPI = 96
+
+# Máximo de pixels do dispositivo decodificados de uma vez na captura (uma
+# faixa de página ou um lote de páginas): ~24 MB em RGB
+MAX_TILE_PIXELS = 8_000_000
+
+
+def scale_for_dpi(dpi):
+    """
+    Fator de escala do dispositivo que dá `dpi` pixels por polegada CSS.
+    """
+    return dpi / CSS_DPI
+
+
+def needs_tiling(box, scale, viewport):
+    """
+    True se a página `box` (pixels CSS) passa da área visível `viewport`
+    (largura, altura) ou, em pixels do dispositivo, de MAX_TILE_PIXELS.
+    """
+    return (box["width"] > viewport[0] or box["height"] > viewport[1]
+            or box["width"] * box["height"] * scale * scale > MAX_TILE_PIXELS)
+
+
+def plan_tiles(box, scale, viewport):
+    """
+    Divide a página `box` em faixas horizontais e cada faixa em colunas do
+    tamanho da área visível. Retorna (largura, altura) da página em pixels
+    do dispositivo e a lista de faixas, cada uma como (linha inicial, número
+    de linhas, [(coluna inicial, número de colunas), ...]). As faixas
+    ocupam no máximo MAX_TILE_PIXELS, para que cada uma caiba na memória.
+    """
+    width = max(1, round(box["width"] * scale))
+    height = max(1, round(box["height"] * scale))
+    tile_width = max(1, min(width, int(viewport[0] * scale)))
+    band_height = max(1, min(int(viewport[1] * scale), MAX_TILE_PIXELS // width))
+
+    columns = [(x, min(tile_width, width - x)) for x in range(0, width, tile_width)]
+    bands = [(y, min(band_height, height - y), columns) for y in range(0, height, band_height)]
+    return width, height, bands
+
+
+class StreamingPngWriter:
+    """
+    Escreve um PNG RGB faixa por faixa: as linhas de cada faixa são
+    comprimidas e gravadas assim que chegam, sem montar a imagem inteira
+    na memória. Se o bloco `with` termina com uma exceção, o arquivo
+    parcial é apagado.
+    """
+
+    def __init__(self, path, width, height, chunk_size=1 << 16):
+        self.path = path
+        self.width = width
+        self.height = height
+        self.rows = 0
+        self._chunk_size = chunk_size
+        self._compressor = zlib.compressobj(6)
+        self._pending = b""
+        self._file = open(path, "wb")
+        self._file.write(b"\x89PNG\r\n\x1a\n")
+        # 8 bits por canal, RGB, sem entrelaçamento
+        self._chunk(b"IHDR", struct.pack(">IIBBBBB", width, height, 8, 2, 0, 0, 0))
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        if exc_type is None:
+            self.close()
+        else:
+            # Não mascara a exceção original com o erro de linhas faltando
+            self.abort()
+
+    def _chunk(self, kind, data):
+        self._file.write(struct.pack(">I", len(data)) + kind + data)
+        self._file.write(struct.pack(">I", zlib.crc32(kind + data) & 0xFFFFFFFF))
+
+    def _emit(self, compressed):
+        self._pending += compressed
+        if len(self._pending) >= self._chunk_size:
+            self._chunk(b"IDAT", self._pending)
+            self._pending = b""
+
+    def add_band(self, band):
+        """
+        Acrescenta as linhas da imagem `band` (largura igual à do PNG). Os
+        pixels são copiados em blocos de ~1 MB, e não a faixa inteira.
+        """
+        if band.mode != "RGB":
+            band = band.convert("RGB")
+        stride = self.width * 3
+        rows_per_chunk = max(1, (1 << 20) // stride)
+        for top in range(0, band.height, rows_per_chunk):
+            data = band.crop((0, top, self.width, min(band.height, top + rows_per_chunk))).tobytes()
+            for offset in range(0, len(data), stride):
+                # Filtro 0 (nenhum) em cada linha
+                self._emit(self._compressor.compress(b"\x00" + data[offset:offset + stride]))
+        self.rows += band.height
+
+    def close(self):
+        if self._file.closed:
+            return
+        self._emit(self._compressor.flush())
+        if self._pending:
+            self._chunk(b"IDAT", self._pending)
+        self._chunk(b"IEND", b"")
+        self._file.close()
+        if self.rows != self.height:
+            raise ValueError(f"PNG com {self.rows} linhas, esperado {self.height}")
+
+    def abort(self):
+        """
+        Fecha o arquivo sem terminar o PNG e o apaga.
+        """
+        if not self._file.closed:
+            self._file.close()
+        if os.path.exists(self.path):
+            os.remove(self.path)
+
+
+def _capture_tile(driver, x, y, width, height, scale):
+    from PIL import Image
+
+    result = driver.execute_cdp_cmd("Page.captureScreenshot", {
+        "format": "png",
+        "fromSurface": True,
+        "captureBeyondViewport": True,
+        "clip": {"x": x, "y": y, "width": width, "height": height, "scale": scale},
+    })
+    tile = Image.open(io.BytesIO(base64.b64decode(result["data"])))
+    tile.load()
+    return tile
+
+
+def capture_page_tiled(driver, box, file_path, scale, viewport):
+    """
+    Captura a página `box` (pixels CSS, coordenadas do documento) em
+    blocos do tamanho da área visível e os costura direto num PNG em
+    `file_path`, uma faixa por vez. Retorna o número de bytes gravados.
+    """
+    from PIL import Image
+
+    width, height, bands = plan_tiles(box, scale, viewport)
+    with StreamingPngWriter(file_path, width, height) as writer:
+        for top, rows, columns in bands:
+            tiles = [(left, _capture_tile(driver, box["x"] + left / scale, box["y"] + top / scale,
+                                          cols / scale, rows / scale, scale))
+                     for left, cols in columns]
+            if len(tiles) == 1 and tiles[0][1].size == (width, rows):
+                # Caso comum (página mais estreita que a janela): o bloco já é a faixa
+                band = tiles[0][1]
+            else:
+                # O arredondamento do navegador pode sobrar ou faltar um
+                # pixel; o paste corta o que passa da faixa e o bloco
+                # seguinte cobre o que passa do anterior
+                band = Image.new("RGB", (width, rows), "white")
+                for left, tile in tiles:
+                    band.paste(tile, (left, 0))
+                    tile.close()
+            writer.add_band(band)
+            band.close()
+    return os.path.getsize(file_path)